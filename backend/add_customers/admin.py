@@ -1,3 +1,12 @@
 from django.contrib import admin
+from core.admin_tools import LargeTableAdmin
+from .models import AddCustomer
 
-# Register your models here.
+@admin.register(AddCustomer)
+class AddCustomerAdmin(LargeTableAdmin):
+    list_display = ('name', 'email', 'phone_number', 'country')
+    list_filter = ('country',)
+    # Prefix and exact matches can use the indexes; icontains cannot.
+    search_fields = ('^name', '=email', '=phone_number')
+    ordering = ('-id',)
+    export_fields = ('id', 'name', 'email', 'phone_number', 'address', 'country')
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.1 on 2026-10-19 01:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('add_customers', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='addcustomer',
+            index=models.Index(fields=['name'], name='add_custome_name_7dfab2_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='addcustomer',
+            index=models.Index(fields=['email'], name='add_custome_email_047b33_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='addcustomer',
+            index=models.Index(fields=['country'], name='add_custome_country_2d6faa_idx'),
+        ),
+    ]
@@ -7,5 +7,12 @@ class AddCustomer(models.Model):
     address = models.TextField()
     country = models.CharField(max_length=100)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['name']),
+            models.Index(fields=['email']),
+            models.Index(fields=['country']),
+        ]
+
     def __str__(self):
         return self.name
\ No newline at end of file
@@ -1,7 +1,12 @@
 from rest_framework import serializers
 from .models import AddCustomer
+from core.readers import ValuesReader
 
 class AddCustomerSerializer(serializers.ModelSerializer):
     class Meta:
         model = AddCustomer
-        fields = ['id', 'name', 'phone_number', 'email', 'address', 'country']
\ No newline at end of file
+        fields = ['id', 'name', 'phone_number', 'email', 'address', 'country']
+
+class AddCustomerValuesReader(ValuesReader):
+    """values()-based equivalent of AddCustomerSerializer for read endpoints."""
+    fields = ('id', 'name', 'phone_number', 'email', 'address', 'country')
@@ -1,3 +1,31 @@
 from django.test import TestCase
 
-# Create your tests here.
+from core.renderers import FastJSONRenderer
+from .models import AddCustomer
+from .serializers import AddCustomerSerializer, AddCustomerValuesReader
+
+
+class ValuesReaderEquivalenceTests(TestCase):
+    """The values() read path must render byte for byte like the serializer."""
+
+    def setUp(self):
+        AddCustomer.objects.create(name='Ünïcode Name', phone_number='+974 1234', email='a@example.com',
+                                   address='Line 1\nLine 2', country='Qatar')
+        AddCustomer.objects.create(name='Second', phone_number='5', email='b@example.com', address='',
+                                   country='UK')
+
+    def render(self, data):
+        return FastJSONRenderer().render(data)
+
+    def test_customers_match_the_serializer(self):
+        queryset = AddCustomer.objects.order_by('id')
+        expected = AddCustomerSerializer(queryset, many=True).data
+        self.assertEqual(self.render(AddCustomerValuesReader().read(queryset)), self.render(expected))
+        self.assertEqual(self.client.get('/api/customers/add-customers/').content, self.render(expected))
+
+    def test_sparse_fields(self):
+        expected = AddCustomerSerializer(AddCustomer.objects.order_by('id'), many=True).data
+        response = self.client.get('/api/customers/add-customers/?fields=id,country')
+        self.assertEqual(response.json(), [{'id': row['id'], 'country': row['country']} for row in expected])
+        response = self.client.get('/api/customers/add-customers/%d/?fields=name' % expected[0]['id'])
+        self.assertEqual(response.json(), {'name': expected[0]['name']})
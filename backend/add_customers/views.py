@@ -1,9 +1,13 @@
 from rest_framework import viewsets
 from rest_framework.permissions import AllowAny
 from .models import AddCustomer
-from .serializers import AddCustomerSerializer
+from .serializers import AddCustomerSerializer, AddCustomerValuesReader
+from core.prefer import ReturnMinimalMixin
+from core.readers import ValuesReadMixin
 
-class AddCustomerViewSet(viewsets.ModelViewSet):
+class AddCustomerViewSet(ReturnMinimalMixin, ValuesReadMixin, viewsets.ModelViewSet):
     queryset = AddCustomer.objects.all()
     serializer_class = AddCustomerSerializer
+    values_reader_class = AddCustomerValuesReader
+    cache_tags = ('add_customers.addcustomer',)
     permission_classes = [AllowAny]
\ No newline at end of file
@@ -1,3 +1,90 @@
 from django.contrib import admin
+from django.utils import timezone
+from core.admin_tools import LargeTableAdmin
+from .models import Job, JobAttachment, RateBreak, RateCard, StatusUpdate
+from .pricing import PRICING_FIELDS, job_quote_fields, reprice_jobs
 
-# Register your models here.
+class StatusUpdateInline(admin.TabularInline):
+    model = StatusUpdate
+    fields = ('status_content', 'status_date', 'status_time')
+    extra = 0
+
+class JobAttachmentInline(admin.TabularInline):
+    model = JobAttachment
+    fields = ('kind', 'original_name', 'content_type', 'size', 'preview_status', 'created_at')
+    readonly_fields = fields
+    extra = 0
+    can_delete = False
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+@admin.register(Job)
+class JobAdmin(LargeTableAdmin):
+    list_display = ('tracking_id', 'cargo_ref_number', 'customer', 'cargo_type', 'origin', 'destination',
+                    'quoted_price', 'collection_date', 'date_of_departure', 'date_of_arrival', 'created_at')
+    list_select_related = ('customer',)
+    list_filter = ('cargo_type', 'created_at', 'collection_date')
+    search_fields = ('=tracking_id', '=cargo_ref_number', '^customer__name')
+    autocomplete_fields = ('customer',)
+    readonly_fields = ('tracking_id', 'quoted_price', 'quote_currency', 'rate_card', 'priced_at', 'created_at')
+    ordering = ('-id',)
+    inlines = (StatusUpdateInline, JobAttachmentInline)
+    actions = LargeTableAdmin.actions + ['mark_departed_today', 'mark_arrived_today']
+    export_fields = ('id', 'tracking_id', 'cargo_ref_number', 'customer__name', 'cargo_type', 'commodity',
+                     'number_of_packages', 'weight', 'volume', 'origin', 'destination', 'quoted_price',
+                     'quote_currency', 'collection_date', 'date_of_departure', 'date_of_arrival', 'created_at')
+
+    def save_model(self, request, obj, form, change):
+        if not change or PRICING_FIELDS.intersection(form.changed_data):
+            for field, value in job_quote_fields({}, obj).items():
+                setattr(obj, field, value)
+        super().save_model(request, obj, form, change)
+
+    @admin.action(description='Mark selected jobs as departed today')
+    def mark_departed_today(self, request, queryset):
+        updated = queryset.update(date_of_departure=timezone.localdate())
+        self.invalidate_cache()
+        self.message_user(request, f'{updated} job(s) marked as departed.')
+
+    @admin.action(description='Mark selected jobs as arrived today')
+    def mark_arrived_today(self, request, queryset):
+        updated = queryset.update(date_of_arrival=timezone.localdate())
+        self.invalidate_cache()
+        self.message_user(request, f'{updated} job(s) marked as arrived.')
+
+@admin.register(StatusUpdate)
+class StatusUpdateAdmin(LargeTableAdmin):
+    list_display = ('job_tracking_id', 'status_content', 'status_date', 'status_time', 'created_at')
+    list_select_related = ('job',)
+    list_filter = ('status_date',)
+    search_fields = ('=job__tracking_id', '=job__cargo_ref_number')
+    autocomplete_fields = ('job',)
+    ordering = ('-id',)
+    export_fields = ('id', 'job__tracking_id', 'status_content', 'status_date', 'status_time', 'created_at')
+
+    @admin.display(description='Tracking ID', ordering='job__tracking_id')
+    def job_tracking_id(self, obj):
+        return obj.job.tracking_id
+
+class RateBreakInline(admin.TabularInline):
+    model = RateBreak
+    fields = ('min_units', 'rate')
+    extra = 1
+
+@admin.register(RateCard)
+class RateCardAdmin(admin.ModelAdmin):
+    list_display = ('origin', 'destination', 'cargo_type', 'basis', 'minimum_charge', 'currency',
+                    'valid_from', 'valid_to', 'is_active', 'updated_at')
+    list_filter = ('cargo_type', 'is_active', 'basis')
+    search_fields = ('origin', 'destination')
+    ordering = ('origin', 'destination', 'cargo_type', '-valid_from')
+    inlines = (RateBreakInline,)
+    actions = ['reprice_open_jobs']
+
+    @admin.action(description='Re-price open jobs of the selected cargo types')
+    def reprice_open_jobs(self, request, queryset):
+        cargo_types = set(queryset.values_list('cargo_type', flat=True))
+        jobs = Job.objects.filter(cargo_type__in=cargo_types, date_of_departure__isnull=True)
+        examined, changed, unpriced = reprice_jobs(jobs)
+        self.message_user(request, f'{examined} open job(s) checked, {changed} re-priced, {unpriced} without a rate card.')
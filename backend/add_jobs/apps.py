@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class AddJobsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'add_jobs'
+
+    def ready(self):
+        from django.db.models.signals import post_delete
+        from .attachments import delete_attachment_files
+        from .models import JobAttachment
+
+        post_delete.connect(delete_attachment_files, sender=JobAttachment, dispatch_uid='job-attachment-files')
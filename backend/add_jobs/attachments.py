@@ -0,0 +1,372 @@
+"""
+Job attachments: packing lists, bills of lading, proof-of-delivery photos.
+
+Uploads are resumable and chunked. A client creates an upload with the
+file's name and size, then PATCHes the bytes from `Upload-Offset` onwards in
+as many requests as it likes. Each request body is streamed to a `.part`
+file in 64 KiB pieces, never held in memory. An interrupted chunk keeps
+the bytes that arrived, so the client asks for the offset (HEAD) and carries
+on from there. The last byte moves the file into place and creates the
+JobAttachment. Sizes are reserved against JOB_ATTACHMENT_QUOTA_BYTES per job
+when an upload starts.
+
+Checksums and previews (image thumbnails with Pillow, first-page PDF
+previews with poppler's `pdftoppm`, when installed) are made on a background
+thread; `manage.py process_attachments` catches up after a restart.
+
+Downloads honour single byte ranges. Full downloads go through
+FileResponse, which lets Gunicorn use sendfile(). With
+JOB_ATTACHMENT_SENDFILE set, the file is handed to the web server instead
+(X-Accel-Redirect for nginx, X-Sendfile for Apache/lighttpd), which then
+serves ranges itself.
+"""
+import fcntl
+import hashlib
+import logging
+import mimetypes
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Sum
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.http import content_disposition_header
+from django.utils.text import get_valid_filename
+
+from .models import AttachmentUpload, Job, JobAttachment
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+COPY_CHUNK_SIZE = 64 * 1024
+RANGE_PATTERN = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class AttachmentError(Exception):
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+
+
+# Paths (relative names are what the FileFields store)
+
+def media_path(name):
+    return os.path.join(settings.MEDIA_ROOT, name)
+
+
+def part_path(upload):
+    return media_path(os.path.join('attachments', 'uploads', '%s.part' % upload.pk))
+
+
+def attachment_name(upload):
+    extension = os.path.splitext(upload.original_name)[1].lower()[:10]
+    return os.path.join('attachments', 'jobs', str(upload.job_id), '%s%s' % (upload.pk, extension))
+
+
+def preview_name(attachment):
+    return os.path.join('attachments', 'previews', '%s.jpg' % attachment.pk)
+
+
+def remove_file(name):
+    if name:
+        try:
+            os.remove(media_path(name))
+        except FileNotFoundError:
+            pass
+
+
+# Uploads
+
+def active_uploads():
+    cutoff = timezone.now() - timedelta(seconds=settings.JOB_ATTACHMENT_UPLOAD_TTL)
+    return AttachmentUpload.objects.filter(updated_at__gte=cutoff)
+
+
+def quota_used(job):
+    """Bytes stored for a job plus bytes reserved by its active uploads."""
+    stored = JobAttachment.objects.filter(job=job).aggregate(total=Sum('size'))['total'] or 0
+    reserved = active_uploads().filter(job=job).aggregate(total=Sum('size'))['total'] or 0
+    return stored + reserved
+
+
+def start_upload(job, original_name, size, kind='other', content_type='', user=None):
+    """Reserve quota and create an empty upload for a file of `size` bytes."""
+    original_name = get_valid_filename(os.path.basename(original_name or ''))[:255]
+    if not original_name:
+        raise AttachmentError('A file name is required.')
+    if size <= 0:
+        raise AttachmentError('The file is empty.')
+    if size > settings.JOB_ATTACHMENT_MAX_BYTES:
+        raise AttachmentError(
+            'Files may be at most %d bytes.' % settings.JOB_ATTACHMENT_MAX_BYTES, status_code=413,
+        )
+    content_type = content_type or mimetypes.guess_type(original_name)[0] or 'application/octet-stream'
+
+    with transaction.atomic():
+        # Serialises concurrent reservations for the same job.
+        job = Job.objects.select_for_update().get(pk=job.pk)
+        if quota_used(job) + size > settings.JOB_ATTACHMENT_QUOTA_BYTES:
+            raise AttachmentError('This upload would exceed the job\'s attachment quota.', status_code=413)
+        upload = AttachmentUpload.objects.create(
+            job=job, kind=kind, original_name=original_name, content_type=content_type[:100],
+            size=size, created_by_id=user.pk if user is not None and user.is_authenticated else None,
+        )
+    path = part_path(upload)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    open(path, 'wb').close()
+    return upload
+
+
+def append_chunk(upload, offset, stream, length):
+    """
+    Write up to `length` bytes from `stream` at `offset`, which must equal
+    the bytes received so far. Returns the attachment when the upload is
+    complete, otherwise None; `upload.offset` is updated either way.
+    """
+    if offset != upload.offset:
+        raise AttachmentError('Upload-Offset %d does not match the upload offset %d.' % (offset, upload.offset),
+                              status_code=409)
+    if offset == upload.size:
+        # Every byte arrived but completing failed: finish now.
+        return finish_upload(upload)
+    if length > settings.JOB_ATTACHMENT_CHUNK_BYTES:
+        raise AttachmentError(
+            'Chunks may be at most %d bytes.' % settings.JOB_ATTACHMENT_CHUNK_BYTES, status_code=413,
+        )
+    if offset + length > upload.size:
+        raise AttachmentError('The chunk would exceed the declared file size.', status_code=413)
+
+    with open(part_path(upload), 'r+b') as part:
+        try:
+            fcntl.flock(part, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            raise AttachmentError('Another chunk of this upload is being written.', status_code=409)
+        # Re-read under the lock: a concurrent request may just have moved on.
+        current = AttachmentUpload.objects.filter(pk=upload.pk).values_list('offset', flat=True).first()
+        if current != offset:
+            raise AttachmentError('The upload offset has changed; resume from %s.' % current, status_code=409)
+        part.seek(offset)
+        # Drop bytes a previous, interrupted chunk wrote past the recorded offset.
+        part.truncate()
+        written = 0
+        try:
+            while written < length:
+                data = stream.read(min(COPY_CHUNK_SIZE, length - written))
+                if not data:
+                    break
+                part.write(data)
+                written += len(data)
+        finally:
+            # Keep what arrived even if the client went away mid-chunk.
+            part.flush()
+            os.fsync(part.fileno())
+            upload.offset = offset + written
+            AttachmentUpload.objects.filter(pk=upload.pk).update(offset=upload.offset, updated_at=timezone.now())
+
+    if upload.offset == upload.size:
+        return finish_upload(upload)
+    return None
+
+
+def finish_upload(upload):
+    name = attachment_name(upload)
+    os.makedirs(os.path.dirname(media_path(name)), exist_ok=True)
+    if os.path.exists(part_path(upload)) or not os.path.exists(media_path(name)):
+        # A retry after a failure below finds the file already in place.
+        os.replace(part_path(upload), media_path(name))
+    with transaction.atomic():
+        attachment = JobAttachment.objects.create(
+            job_id=upload.job_id, kind=upload.kind, original_name=upload.original_name,
+            content_type=upload.content_type, size=upload.size, file=name, uploaded_by_id=upload.created_by_id,
+        )
+        AttachmentUpload.objects.filter(pk=upload.pk).delete()
+        transaction.on_commit(lambda: attachment_processor.submit(attachment.pk))
+    return attachment
+
+
+def abort_upload(upload):
+    AttachmentUpload.objects.filter(pk=upload.pk).delete()
+    try:
+        os.remove(part_path(upload))
+    except FileNotFoundError:
+        pass
+
+
+def purge_stale_uploads():
+    """Remove uploads idle for longer than JOB_ATTACHMENT_UPLOAD_TTL. Returns the number removed."""
+    cutoff = timezone.now() - timedelta(seconds=settings.JOB_ATTACHMENT_UPLOAD_TTL)
+    removed = 0
+    for upload in AttachmentUpload.objects.filter(updated_at__lt=cutoff).iterator():
+        abort_upload(upload)
+        removed += 1
+    return removed
+
+
+def delete_attachment_files(sender, instance, **kwargs):
+    """post_delete receiver: remove the file and preview of a deleted attachment."""
+    names = [instance.file.name, instance.preview.name]
+    transaction.on_commit(lambda: [remove_file(name) for name in names])
+
+
+# Checksums and previews
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as source:
+        for block in iter(lambda: source.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def render_preview(attachment, target):
+    """Write a JPEG preview of the attachment to `target`. Returns False if unsupported."""
+    size = settings.JOB_ATTACHMENT_PREVIEW_SIZE
+    source = media_path(attachment.file.name)
+    if attachment.content_type.startswith('image/') and Image is not None:
+        with Image.open(source) as image:
+            # Lets JPEG decode at reduced scale, so large scans are never
+            # fully decompressed.
+            image.draft('RGB', (size, size))
+            image = ImageOps.exif_transpose(image)
+            image.thumbnail((size, size))
+            image.convert('RGB').save(target, 'JPEG', quality=80, optimize=True)
+        return True
+    if attachment.content_type == 'application/pdf' and shutil.which('pdftoppm'):
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, 'preview')
+            subprocess.run(
+                ['pdftoppm', '-jpeg', '-f', '1', '-l', '1', '-singlefile', '-scale-to', str(size), source, output],
+                check=True, capture_output=True, timeout=60,
+            )
+            shutil.move(output + '.jpg', target)
+        return True
+    return False
+
+
+def process_attachment(attachment_id):
+    """Record the checksum and build the preview of one attachment."""
+    attachment = JobAttachment.objects.filter(pk=attachment_id).first()
+    if attachment is None:
+        return
+    updates = {'sha256': file_sha256(media_path(attachment.file.name))}
+    name = preview_name(attachment)
+    os.makedirs(os.path.dirname(media_path(name)), exist_ok=True)
+    try:
+        if render_preview(attachment, media_path(name)):
+            updates.update(preview=name, preview_status=JobAttachment.PREVIEW_READY)
+        else:
+            updates['preview_status'] = JobAttachment.PREVIEW_UNAVAILABLE
+    except Exception as exc:
+        logger.warning("Preview of attachment %s failed: %s", attachment_id, exc)
+        updates['preview_status'] = JobAttachment.PREVIEW_FAILED
+    JobAttachment.objects.filter(pk=attachment_id).update(**updates)
+
+
+class AttachmentProcessor:
+    """Runs `process_attachment` off the request path."""
+
+    def __init__(self):
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def submit(self, attachment_id):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='attachment-preview')
+        return self._executor.submit(self._run, attachment_id)
+
+    def _run(self, attachment_id):
+        try:
+            process_attachment(attachment_id)
+        except Exception:
+            logger.error("Processing attachment %s failed", attachment_id, exc_info=True)
+        finally:
+            close_old_connections()
+
+
+attachment_processor = AttachmentProcessor()
+
+
+# Downloads
+
+def parse_range(header, size):
+    """
+    (start, end) for a single satisfiable byte range, None to send the whole
+    file (no header, or one we do not handle such as multiple ranges), or
+    False when unsatisfiable.
+    """
+    match = RANGE_PATTERN.match(header.strip()) if header else None
+    if match is None:
+        return None
+    first, last = match.groups()
+    if not first:
+        if not last:
+            return None
+        start, end = max(size - int(last), 0), size - 1
+    else:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    if start > end or start >= size:
+        return False
+    return start, end
+
+
+def iter_file_range(path, start, end):
+    with open(path, 'rb') as source:
+        source.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            data = source.read(min(COPY_CHUNK_SIZE, remaining))
+            if not data:
+                break
+            remaining -= len(data)
+            yield data
+
+
+def file_response(request, name, content_type, filename, etag, as_attachment=True):
+    """Serve a stored file with Range support, or hand it to the web server."""
+    path = media_path(name)
+    size = os.path.getsize(path)
+    offload = settings.JOB_ATTACHMENT_SENDFILE
+    if offload:
+        response = HttpResponse(content_type=content_type)
+        if offload == 'x-accel-redirect':
+            response['X-Accel-Redirect'] = settings.JOB_ATTACHMENT_ACCEL_PREFIX.rstrip('/') + '/' + name
+        else:
+            response['X-Sendfile'] = path
+    else:
+        byte_range = parse_range(request.headers.get('Range'), size)
+        if_range = request.headers.get('If-Range')
+        if if_range is not None and if_range != etag:
+            byte_range = None
+        if byte_range is False:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = 'bytes */%d' % size
+            return response
+        if byte_range is None:
+            # FileResponse uses wsgi.file_wrapper, i.e. sendfile() under Gunicorn.
+            response = FileResponse(open(path, 'rb'), content_type=content_type)
+        else:
+            start, end = byte_range
+            response = StreamingHttpResponse(iter_file_range(path, start, end), status=206,
+                                             content_type=content_type)
+            response['Content-Range'] = 'bytes %d-%d/%d' % (start, end, size)
+            response['Content-Length'] = str(end - start + 1)
+        response['Accept-Ranges'] = 'bytes'
+    response['Content-Disposition'] = content_disposition_header(as_attachment, filename)
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, max-age=3600'
+    return response
@@ -0,0 +1,175 @@
+"""
+Shipping labels and waybills as PDF.
+
+Each page is rendered from a plain dict of the job's fields (see add_jobs.pdf)
+and cached on disk under MEDIA_ROOT/documents/<kind>/<job id>/, named after
+the job's version: a hash of exactly the data on the page. Editing the job,
+or its customer, changes the version, so a stale page is never served and
+nothing needs invalidating; the superseded file is removed when the new one
+is written.
+
+Cache misses are rendered in a process pool of DOCUMENT_RENDER_WORKERS
+(QR and barcode drawing is CPU-bound pure Python), a handful at a time
+inline. Batches are read, rendered and written out DOCUMENT_BATCH_CHUNK
+jobs at a time, so a multi-page PDF for a whole consignment is streamed to
+the client as it is produced.
+"""
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.db.models import F
+
+from . import pdf
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+KINDS = ('label', 'waybill')
+# Bump when the page layout changes, to retire every cached page.
+LAYOUT_VERSION = 1
+# Fewer misses than this are rendered in the calling process.
+INLINE_RENDER_MAX = 4
+
+JOB_FIELDS = (
+    'id', 'tracking_id', 'cargo_ref_number', 'cargo_type', 'receiver_name', 'contact_number', 'email',
+    'recipient_address', 'recipient_country', 'commodity', 'number_of_packages', 'weight', 'volume',
+    'origin', 'destination', 'collection_date', 'date_of_departure', 'date_of_arrival', 'created_at',
+)
+COMPANY = {
+    'company': 'Almas Movers International',
+    'website': 'www.almasintl.com',
+    'terms': (
+        'Goods are carried subject to the standard trading conditions of Almas Movers International. '
+        'Please check the shipment on receipt and report any damage or shortage within 48 hours.'
+    ),
+}
+
+
+def job_documents_data(job_ids):
+    """{job id: page data} for the jobs that exist, with one query."""
+    rows = Job.objects.filter(pk__in=job_ids).values(
+        *JOB_FIELDS,
+        customer_name=F('customer__name'),
+        customer_email=F('customer__email'),
+        customer_phone=F('customer__phone_number'),
+    )
+    tracking_link = Job().get_tracking_link()
+    data = {}
+    for row in rows:
+        for field in ('collection_date', 'date_of_departure', 'date_of_arrival'):
+            row[field] = row[field].isoformat() if row[field] else None
+        row['issued'] = row.pop('created_at').date().isoformat()
+        data[row['id']] = dict(row, tracking_link=tracking_link, **COMPANY)
+    return data
+
+
+def document_version(data):
+    payload = json.dumps([LAYOUT_VERSION, data], sort_keys=True, default=str).encode()
+    return hashlib.sha256(payload).hexdigest()[:16]
+
+
+def cache_dir(kind, job_id):
+    return os.path.join(settings.MEDIA_ROOT, 'documents', kind, str(job_id))
+
+
+def read_cached(kind, job_id, version):
+    try:
+        with open(os.path.join(cache_dir(kind, job_id), version + '.bin'), 'rb') as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def write_cached(kind, job_id, version, stream):
+    directory = cache_dir(kind, job_id)
+    try:
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(stream)
+        os.replace(tmp_path, os.path.join(directory, version + '.bin'))
+        for name in os.listdir(directory):
+            if name.endswith('.bin') and name != version + '.bin':
+                os.remove(os.path.join(directory, name))
+    except OSError as exc:
+        logger.warning("Could not cache %s for job %s: %s", kind, job_id, exc)
+
+
+class DocumentRenderer:
+    """Renders pages in a lazily started process pool."""
+
+    def __init__(self):
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def executor(self):
+        with self._lock:
+            if self._executor is None:
+                # spawn: forking a threaded server process is unsafe, and pdf
+                # needs no Django set-up in the workers.
+                self._executor = ProcessPoolExecutor(
+                    max_workers=settings.DOCUMENT_RENDER_WORKERS,
+                    mp_context=multiprocessing.get_context('spawn'),
+                )
+            return self._executor
+
+    def render(self, kind, pages):
+        """Compressed content streams for each data dict in `pages`, in order."""
+        if len(pages) < INLINE_RENDER_MAX or settings.DOCUMENT_RENDER_WORKERS < 1:
+            return [pdf.render_page(kind, data) for data in pages]
+        chunksize = max(len(pages) // (settings.DOCUMENT_RENDER_WORKERS * 4), 1)
+        try:
+            return list(self.executor().map(pdf.render_page, [kind] * len(pages), pages, chunksize=chunksize))
+        except BrokenProcessPool:
+            logger.error("Document render pool broke; rendering %d pages inline", len(pages), exc_info=True)
+            with self._lock:
+                self._executor = None
+            return [pdf.render_page(kind, data) for data in pages]
+
+
+renderer = DocumentRenderer()
+
+
+def job_pages(kind, job_ids):
+    """[(job id, version, stream)] for the jobs in `job_ids` that exist, in order."""
+    data = job_documents_data(job_ids)
+    pages = {}
+    misses = []
+    for job_id in job_ids:
+        if job_id not in data or job_id in pages:
+            continue
+        version = document_version(data[job_id])
+        pages[job_id] = (version, read_cached(kind, job_id, version))
+        if pages[job_id][1] is None:
+            misses.append(job_id)
+    if misses:
+        streams = renderer.render(kind, [data[job_id] for job_id in misses])
+        for job_id, stream in zip(misses, streams):
+            version = pages[job_id][0]
+            write_cached(kind, job_id, version, stream)
+            pages[job_id] = (version, stream)
+    return [(job_id, *pages[job_id]) for job_id in dict.fromkeys(job_ids) if job_id in pages]
+
+
+def stream_pdf(kind, job_ids):
+    """Yield a PDF with one page per job, in order, rendering a chunk at a time."""
+    writer = pdf.PDFStreamWriter()
+    size = pdf.PAGE_SIZES[kind]
+    yield writer.begin()
+    step = settings.DOCUMENT_BATCH_CHUNK
+    for start in range(0, len(job_ids), step):
+        for job_id, version, stream in job_pages(kind, job_ids[start:start + step]):
+            yield writer.page(size, stream)
+    yield writer.end()
+
+
+def build_pdf(kind, job_ids):
+    return b''.join(stream_pdf(kind, job_ids))
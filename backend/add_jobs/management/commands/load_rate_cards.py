@@ -0,0 +1,81 @@
+import csv
+from decimal import Decimal, InvalidOperation
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils.dateparse import parse_date
+from add_jobs.models import Job, RateBreak, RateCard
+from add_jobs.pricing import RATE_CACHE_TAGS
+from core.cache import cache
+
+COLUMNS = ('origin', 'destination', 'cargo_type', 'basis', 'kg_per_cbm', 'rounding_step', 'minimum_charge',
+           'currency', 'valid_from', 'valid_to', 'breaks')
+
+
+class Command(BaseCommand):
+    help = (
+        'Import rate cards from a CSV file with the columns ' + ', '.join(COLUMNS) + '. '
+        'breaks lists min_units:rate pairs separated by ";", e.g. "0:12.5;45:10;100:8.75". '
+        'Running processes pick the new rates up without a restart.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--replace', action='store_true', help='Deactivate all existing rate cards first.')
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['path'], newline='', encoding='utf-8-sig') as f:
+                rows = list(csv.DictReader(f))
+        except OSError as e:
+            raise CommandError(e)
+        cards = [self.parse(line, row) for line, row in enumerate(rows, start=2)]
+
+        with transaction.atomic():
+            if options['replace']:
+                RateCard.objects.filter(is_active=True).update(is_active=False)
+            # Saved one by one: bulk_create does not return ids on MySQL.
+            for card, breaks in cards:
+                card.save()
+            RateBreak.objects.bulk_create([
+                RateBreak(rate_card=card, min_units=min_units, rate=rate)
+                for card, breaks in cards for min_units, rate in breaks
+            ])
+            # Invalidate once the new rows are visible; bulk_create and
+            # update send no signals.
+            transaction.on_commit(lambda: cache.invalidate_tags(*RATE_CACHE_TAGS))
+        self.stdout.write(f'Loaded {len(cards)} rate cards')
+
+    def parse(self, line, row):
+        missing = [column for column in ('origin', 'destination', 'cargo_type', 'valid_from', 'breaks')
+                   if not (row.get(column) or '').strip()]
+        if missing:
+            raise CommandError(f'Line {line}: missing {", ".join(missing)}')
+        if row['cargo_type'] not in {value for value, label in Job.CARGO_TYPE_CHOICES}:
+            raise CommandError(f'Line {line}: unknown cargo_type {row["cargo_type"]!r}')
+        try:
+            card = RateCard(
+                origin=row['origin'].strip(),
+                destination=row['destination'].strip(),
+                cargo_type=row['cargo_type'],
+                basis=(row.get('basis') or 'kg').strip(),
+                kg_per_cbm=Decimal(row.get('kg_per_cbm') or 167),
+                rounding_step=Decimal(row.get('rounding_step') or 0),
+                minimum_charge=Decimal(row.get('minimum_charge') or 0),
+                currency=(row.get('currency') or 'QAR').strip().upper(),
+                valid_from=parse_date(row['valid_from'].strip()),
+                valid_to=parse_date(row['valid_to'].strip()) if (row.get('valid_to') or '').strip() else None,
+            )
+            breaks = []
+            for pair in row['breaks'].split(';'):
+                min_units, rate = pair.split(':')
+                breaks.append((Decimal(min_units.strip()), Decimal(rate.strip())))
+        except (InvalidOperation, ValueError) as e:
+            raise CommandError(f'Line {line}: {e}')
+        if card.basis not in {value for value, label in RateCard.BASIS_CHOICES}:
+            raise CommandError(f'Line {line}: basis must be kg or cbm')
+        if card.valid_from is None:
+            raise CommandError(f'Line {line}: valid_from must be YYYY-MM-DD')
+        if len({min_units for min_units, rate in breaks}) != len(breaks):
+            raise CommandError(f'Line {line}: duplicate break')
+        return card, breaks
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from add_jobs.attachments import process_attachment, purge_stale_uploads
+from add_jobs.models import JobAttachment
+
+
+class Command(BaseCommand):
+    help = 'Build missing attachment checksums and previews, and remove abandoned uploads.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--retry-failed', action='store_true', help='Also retry previews that failed.')
+
+    def handle(self, *args, **options):
+        statuses = [JobAttachment.PREVIEW_PENDING]
+        if options['retry_failed']:
+            statuses.append(JobAttachment.PREVIEW_FAILED)
+        ids = list(JobAttachment.objects.filter(preview_status__in=statuses).values_list('id', flat=True))
+        for attachment_id in ids:
+            process_attachment(attachment_id)
+        removed = purge_stale_uploads()
+        self.stdout.write(f'Processed {len(ids)} attachments, removed {removed} abandoned uploads')
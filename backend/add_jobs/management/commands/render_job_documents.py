@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError
+from add_jobs import documents
+from add_jobs.models import Job
+
+
+class Command(BaseCommand):
+    help = 'Render shipping labels or waybills to a PDF file, or warm the document cache.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=documents.KINDS)
+        parser.add_argument('job_ids', nargs='*', type=int, help='Jobs to include; all jobs when omitted.')
+        parser.add_argument('--tracking-ids', nargs='+', default=[], help='Select jobs by tracking ID instead.')
+        parser.add_argument('--output', help='Write one PDF with a page per job to this path.')
+
+    def handle(self, *args, **options):
+        kind = options['kind']
+        if options['tracking_ids']:
+            tracking_ids = [value.strip().upper() for value in options['tracking_ids']]
+            found = dict(Job.objects.filter(tracking_id__in=tracking_ids).values_list('tracking_id', 'id'))
+            job_ids = [found[tracking_id] for tracking_id in tracking_ids if tracking_id in found]
+        elif options['job_ids']:
+            job_ids = options['job_ids']
+        else:
+            job_ids = list(Job.objects.order_by('id').values_list('id', flat=True))
+        if not job_ids:
+            raise CommandError('No matching jobs.')
+
+        if options['output']:
+            with open(options['output'], 'wb') as f:
+                for data in documents.stream_pdf(kind, job_ids):
+                    f.write(data)
+            self.stdout.write(f'Wrote {len(job_ids)} {kind} pages to {options["output"]}')
+            return
+        rendered = 0
+        for start in range(0, len(job_ids), 500):
+            rendered += len(documents.job_pages(kind, job_ids[start:start + 500]))
+        self.stdout.write(f'Cached {rendered} {kind} pages')
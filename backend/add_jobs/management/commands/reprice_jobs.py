@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from add_jobs.models import Job
+from add_jobs.pricing import reprice_jobs
+
+
+class Command(BaseCommand):
+    help = 'Re-quote jobs against the current rate cards and store the prices that changed.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Include jobs that have already departed.')
+        parser.add_argument('--cargo-type', choices=[value for value, label in Job.CARGO_TYPE_CHOICES])
+        parser.add_argument('--batch-size', type=int, default=1000, help='Jobs quoted and updated per batch.')
+        parser.add_argument('--dry-run', action='store_true', help='Report what would change without saving.')
+
+    def handle(self, *args, **options):
+        jobs = Job.objects.all()
+        if not options['all']:
+            jobs = jobs.filter(date_of_departure__isnull=True)
+        if options['cargo_type']:
+            jobs = jobs.filter(cargo_type=options['cargo_type'])
+        examined, changed, unpriced = reprice_jobs(jobs, options['batch_size'], options['dry_run'])
+        verb = 'would change' if options['dry_run'] else 'changed'
+        self.stdout.write(f'Examined {examined} jobs, {verb} {changed}, {unpriced} without a rate card')
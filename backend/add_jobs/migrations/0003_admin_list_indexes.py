@@ -0,0 +1,30 @@
+# Generated by Django 5.2.1 on 2026-10-19 01:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('add_customers', '0002_admin_list_indexes'),
+        ('add_jobs', '0002_remove_job_time_of_arrival_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='job',
+            index=models.Index(fields=['created_at'], name='add_jobs_jo_created_08c924_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='job',
+            index=models.Index(fields=['cargo_type', 'created_at'], name='add_jobs_jo_cargo_t_41f8ec_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='job',
+            index=models.Index(fields=['collection_date'], name='add_jobs_jo_collect_a23bd3_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='statusupdate',
+            index=models.Index(fields=['status_date'], name='add_jobs_st_status__8a2e26_idx'),
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.2.1 on 2026-10-19 01:42
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('add_jobs', '0003_admin_list_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttachmentUpload',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('kind', models.CharField(choices=[('packing_list', 'Packing List'), ('bill_of_lading', 'Bill of Lading'), ('proof_of_delivery', 'Proof of Delivery'), ('other', 'Other')], default='other', max_length=20)),
+                ('original_name', models.CharField(max_length=255)),
+                ('content_type', models.CharField(max_length=100)),
+                ('size', models.PositiveBigIntegerField()),
+                ('offset', models.PositiveBigIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('job', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attachment_uploads', to='add_jobs.job')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['updated_at'], name='add_jobs_at_updated_ec5bdd_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='JobAttachment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('packing_list', 'Packing List'), ('bill_of_lading', 'Bill of Lading'), ('proof_of_delivery', 'Proof of Delivery'), ('other', 'Other')], default='other', max_length=20)),
+                ('original_name', models.CharField(max_length=255)),
+                ('content_type', models.CharField(max_length=100)),
+                ('size', models.PositiveBigIntegerField()),
+                ('sha256', models.CharField(blank=True, max_length=64)),
+                ('file', models.FileField(max_length=255, upload_to='')),
+                ('preview', models.FileField(blank=True, max_length=255, upload_to='')),
+                ('preview_status', models.CharField(choices=[('pending', 'Pending'), ('ready', 'Ready'), ('unavailable', 'Unavailable'), ('failed', 'Failed')], default='pending', max_length=12)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('job', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attachments', to='add_jobs.job')),
+                ('uploaded_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['preview_status'], name='add_jobs_jo_preview_f3ead8_idx')],
+            },
+        ),
+    ]
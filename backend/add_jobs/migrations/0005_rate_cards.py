@@ -0,0 +1,67 @@
+# Generated by Django 5.2.1 on 2026-10-19 01:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('add_jobs', '0004_job_attachments'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='priced_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='job',
+            name='quote_currency',
+            field=models.CharField(blank=True, max_length=3),
+        ),
+        migrations.AddField(
+            model_name='job',
+            name='quoted_price',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True),
+        ),
+        migrations.CreateModel(
+            name='RateCard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('origin', models.CharField(help_text='City or country as entered on jobs, or * for any.', max_length=255)),
+                ('destination', models.CharField(help_text='City or country as entered on jobs, or * for any.', max_length=255)),
+                ('cargo_type', models.CharField(choices=[('air', 'Air Cargo'), ('door_to_door', 'Door To Door Cargo'), ('land', 'Land Cargo'), ('sea', 'Sea Cargo')], max_length=20)),
+                ('basis', models.CharField(choices=[('kg', 'Per chargeable kg'), ('cbm', 'Per chargeable cbm')], default='kg', max_length=3)),
+                ('kg_per_cbm', models.DecimalField(decimal_places=2, default=167, help_text='Volumetric factor: air 167, road 333, sea 1000.', max_digits=8)),
+                ('rounding_step', models.DecimalField(decimal_places=3, default=0, help_text='Round chargeable units up to a multiple of this; 0 for none.', max_digits=8)),
+                ('minimum_charge', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('currency', models.CharField(default='QAR', max_length=3)),
+                ('valid_from', models.DateField()),
+                ('valid_to', models.DateField(blank=True, null=True)),
+                ('is_active', models.BooleanField(default=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['cargo_type', 'origin', 'destination'], name='add_jobs_ra_cargo_t_3c1464_idx')],
+            },
+        ),
+        migrations.AddField(
+            model_name='job',
+            name='rate_card',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='priced_jobs', to='add_jobs.ratecard'),
+        ),
+        migrations.CreateModel(
+            name='RateBreak',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('min_units', models.DecimalField(decimal_places=3, default=0, max_digits=12)),
+                ('rate', models.DecimalField(decimal_places=4, max_digits=12)),
+                ('rate_card', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='breaks', to='add_jobs.ratecard')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('rate_card', 'min_units'), name='unique_rate_break')],
+            },
+        ),
+    ]
@@ -1,6 +1,8 @@
+from django.conf import settings
 from django.db import models
 import random
 import string
+import uuid
 
 class Job(models.Model):
     CARGO_TYPE_CHOICES = [
@@ -28,8 +30,20 @@ class Job(models.Model):
     collection_date = models.DateField()
     date_of_departure = models.DateField(null=True, blank=True)
     date_of_arrival = models.DateField(null=True, blank=True)
+    quoted_price = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
+    quote_currency = models.CharField(max_length=3, blank=True)
+    rate_card = models.ForeignKey('RateCard', null=True, blank=True, on_delete=models.SET_NULL,
+                                  related_name='priced_jobs')
+    priced_at = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at']),
+            models.Index(fields=['cargo_type', 'created_at']),
+            models.Index(fields=['collection_date']),
+        ]
+
     def save(self, *args, **kwargs):
         if not self.tracking_id:
             while True:
@@ -52,5 +66,119 @@ class StatusUpdate(models.Model):
     status_time = models.TimeField()
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['status_date']),
+        ]
+
+    def __str__(self):
+        return f"Status for {self.job.cargo_ref_number or 'No Ref'} at {self.status_date} {self.status_time}"
+
+class JobAttachment(models.Model):
+    """A document attached to a job; the file lives under MEDIA_ROOT (see add_jobs.attachments)."""
+    KIND_CHOICES = [
+        ('packing_list', 'Packing List'),
+        ('bill_of_lading', 'Bill of Lading'),
+        ('proof_of_delivery', 'Proof of Delivery'),
+        ('other', 'Other'),
+    ]
+    PREVIEW_PENDING = 'pending'
+    PREVIEW_READY = 'ready'
+    PREVIEW_UNAVAILABLE = 'unavailable'
+    PREVIEW_FAILED = 'failed'
+    PREVIEW_STATUS_CHOICES = [
+        (PREVIEW_PENDING, 'Pending'),
+        (PREVIEW_READY, 'Ready'),
+        (PREVIEW_UNAVAILABLE, 'Unavailable'),
+        (PREVIEW_FAILED, 'Failed'),
+    ]
+
+    job = models.ForeignKey(Job, on_delete=models.CASCADE, related_name='attachments')
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES, default='other')
+    original_name = models.CharField(max_length=255)
+    content_type = models.CharField(max_length=100)
+    size = models.PositiveBigIntegerField()
+    sha256 = models.CharField(max_length=64, blank=True)
+    file = models.FileField(max_length=255)
+    preview = models.FileField(max_length=255, blank=True)
+    preview_status = models.CharField(max_length=12, choices=PREVIEW_STATUS_CHOICES, default=PREVIEW_PENDING)
+    uploaded_by = models.ForeignKey(settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.SET_NULL,
+                                    related_name='+')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['preview_status']),
+        ]
+
+    def __str__(self):
+        return f"{self.original_name} ({self.job.tracking_id})"
+
+class AttachmentUpload(models.Model):
+    """A resumable upload in progress; `offset` bytes have been written so far."""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    job = models.ForeignKey(Job, on_delete=models.CASCADE, related_name='attachment_uploads')
+    kind = models.CharField(max_length=20, choices=JobAttachment.KIND_CHOICES, default='other')
+    original_name = models.CharField(max_length=255)
+    content_type = models.CharField(max_length=100)
+    size = models.PositiveBigIntegerField()
+    offset = models.PositiveBigIntegerField(default=0)
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.SET_NULL,
+                                   related_name='+')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['updated_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.original_name} ({self.offset}/{self.size})"
+
+class RateCard(models.Model):
+    """
+    Prices for one lane and cargo type over a validity period; the price per
+    unit comes from its breaks (see add_jobs.pricing).
+    """
+    BASIS_CHOICES = [
+        ('kg', 'Per chargeable kg'),
+        ('cbm', 'Per chargeable cbm'),
+    ]
+
+    origin = models.CharField(max_length=255, help_text='City or country as entered on jobs, or * for any.')
+    destination = models.CharField(max_length=255, help_text='City or country as entered on jobs, or * for any.')
+    cargo_type = models.CharField(max_length=20, choices=Job.CARGO_TYPE_CHOICES)
+    basis = models.CharField(max_length=3, choices=BASIS_CHOICES, default='kg')
+    kg_per_cbm = models.DecimalField(max_digits=8, decimal_places=2, default=167,
+                                     help_text='Volumetric factor: air 167, road 333, sea 1000.')
+    rounding_step = models.DecimalField(max_digits=8, decimal_places=3, default=0,
+                                        help_text='Round chargeable units up to a multiple of this; 0 for none.')
+    minimum_charge = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    currency = models.CharField(max_length=3, default='QAR')
+    valid_from = models.DateField()
+    valid_to = models.DateField(null=True, blank=True)
+    is_active = models.BooleanField(default=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['cargo_type', 'origin', 'destination']),
+        ]
+
+    def __str__(self):
+        return f"{self.origin} -> {self.destination} ({self.get_cargo_type_display()}, from {self.valid_from})"
+
+class RateBreak(models.Model):
+    """The rate per unit for chargeable units of at least `min_units`."""
+    rate_card = models.ForeignKey(RateCard, on_delete=models.CASCADE, related_name='breaks')
+    min_units = models.DecimalField(max_digits=12, decimal_places=3, default=0)
+    rate = models.DecimalField(max_digits=12, decimal_places=4)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['rate_card', 'min_units'], name='unique_rate_break'),
+        ]
+
     def __str__(self):
-        return f"Status for {self.job.cargo_ref_number or 'No Ref'} at {self.status_date} {self.status_time}"
\ No newline at end of file
+        return f"{self.min_units}+ @ {self.rate}"
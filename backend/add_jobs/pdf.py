@@ -0,0 +1,312 @@
+"""
+Shipping label and waybill pages, and a streaming PDF writer.
+
+Pages are drawn straight into PDF content streams with the standard
+Helvetica fonts, a Code 128 barcode and a QR code, so rendering needs no
+PDF library and each page is an independent, cacheable byte string.
+PDFStreamWriter then emits a document page by page: a batch of any size is
+sent as it is rendered, in constant memory.
+
+This module must not import Django: `render_page` runs in the document
+process pool (see add_jobs.documents).
+"""
+import textwrap
+import zlib
+
+import segno
+
+LABEL_SIZE = (288, 432)      # 4 x 6 in
+WAYBILL_SIZE = (595, 842)    # A4
+PAGE_SIZES = {'label': LABEL_SIZE, 'waybill': WAYBILL_SIZE}
+
+# Code 128 bar/space widths for values 0-106 (103-105 start A/B/C, 106 stop).
+CODE128_PATTERNS = (
+    '212222', '222122', '222221', '121223', '121322', '131222', '122213', '122312', '132212', '221213',
+    '221312', '231212', '112232', '122132', '122231', '113222', '123122', '123221', '223211', '221132',
+    '221231', '213212', '223112', '312131', '311222', '321122', '321221', '312212', '322112', '322211',
+    '212123', '212321', '232121', '111323', '131123', '131321', '112313', '132113', '132311', '211313',
+    '231113', '231311', '112133', '112331', '132131', '113123', '113321', '133121', '313121', '211331',
+    '231131', '213113', '213311', '213131', '311123', '311321', '331121', '312113', '312311', '332111',
+    '314111', '221411', '431111', '111224', '111422', '121124', '121421', '141122', '141221', '112214',
+    '112412', '122114', '122411', '142112', '142211', '241211', '221114', '413111', '241112', '134111',
+    '111242', '121142', '121241', '114212', '124112', '124211', '411212', '421112', '421211', '212141',
+    '214121', '412121', '111143', '111341', '131141', '114113', '114311', '411113', '411311', '113141',
+    '114131', '311141', '411131', '211412', '211214', '211232', '2331112',
+)
+CODE128_START_B = 104
+CODE128_STOP = 106
+
+CARGO_TYPES = {
+    'air': 'Air Cargo',
+    'door_to_door': 'Door To Door Cargo',
+    'land': 'Land Cargo',
+    'sea': 'Sea Cargo',
+}
+
+
+def code128_widths(value):
+    """Alternating bar/space widths, in modules, encoding `value` in code set B."""
+    codes = [ord(char) - 32 for char in value if 32 <= ord(char) < 128]
+    checksum = (CODE128_START_B + sum(position * code for position, code in enumerate(codes, 1))) % 103
+    symbols = [CODE128_START_B, *codes, checksum, CODE128_STOP]
+    return [int(width) for symbol in symbols for width in CODE128_PATTERNS[symbol]]
+
+
+def pdf_text(value):
+    """A PDF literal string in WinAnsi; characters the base fonts lack become '?'."""
+    encoded = str(value).encode('cp1252', errors='replace')
+    return b'(' + encoded.replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)') + b')'
+
+
+def number(value):
+    return ('%.2f' % value).rstrip('0').rstrip('.')
+
+
+class Canvas:
+    """Collects drawing operators for one page, in points from the bottom left."""
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.ops = []
+
+    def text(self, x, y, value, size=9, bold=False):
+        self.ops.append(b'BT /%s %s Tf %s %s Td %s Tj ET' % (
+            b'F2' if bold else b'F1', number(size).encode(), number(x).encode(), number(y).encode(), pdf_text(value),
+        ))
+
+    def wrapped(self, x, y, value, width, size=9, bold=False, max_lines=3, leading=None):
+        """Draw `value` wrapped to roughly `width` points; returns the y below it."""
+        leading = leading or size * 1.25
+        # Helvetica averages about half an em per character.
+        lines = textwrap.wrap(str(value or ''), max(int(width / (size * 0.5)), 1))[:max_lines] or ['']
+        for line in lines:
+            self.text(x, y, line, size, bold)
+            y -= leading
+        return y
+
+    def rect(self, x, y, width, height, fill=False):
+        self.ops.append(b'%s %s %s %s re %s' % (
+            number(x).encode(), number(y).encode(), number(width).encode(), number(height).encode(),
+            b'f' if fill else b'S',
+        ))
+
+    def line(self, x1, y1, x2, y2):
+        self.ops.append(b'%s %s m %s %s l S' % tuple(number(v).encode() for v in (x1, y1, x2, y2)))
+
+    def barcode(self, x, y, value, width, height):
+        """Code 128 of `value` scaled to fit `width`; returns the width used."""
+        widths = code128_widths(value)
+        module = min(width / sum(widths), 2.0)
+        position = x
+        for index, modules in enumerate(widths):
+            if index % 2 == 0:
+                self.rect(position, y, modules * module, height, fill=True)
+            position += modules * module
+        return position - x
+
+    def qr(self, x, y, data, size):
+        """QR code of `data` in a `size`-point square with its bottom left at (x, y)."""
+        matrix = segno.make(data, error='m').matrix
+        module = size / len(matrix)
+        for row_index, row in enumerate(matrix):
+            top = y + size - (row_index + 1) * module
+            column = 0
+            while column < len(row):
+                if row[column]:
+                    start = column
+                    while column < len(row) and row[column]:
+                        column += 1
+                    self.rect(x + start * module, top, (column - start) * module, module, fill=True)
+                else:
+                    column += 1
+
+    def content(self):
+        return b'\n'.join(self.ops)
+
+
+def tracking_url(data):
+    return '%s?tracking_id=%s' % (data['tracking_link'], data['tracking_id'])
+
+
+def draw_label(data):
+    width, height = LABEL_SIZE
+    canvas = Canvas(width, height)
+    margin = 14
+    inner = width - 2 * margin
+    canvas.rect(margin / 2, margin / 2, width - margin, height - margin)
+
+    y = height - 30
+    canvas.text(margin, y, data['company'], 11, bold=True)
+    canvas.text(margin, y - 12, data['website'], 7)
+    canvas.line(margin, y - 20, width - margin, y - 20)
+
+    y -= 42
+    canvas.text(margin, y, 'TRACKING ID', 7)
+    canvas.text(margin, y - 20, data['tracking_id'], 20, bold=True)
+    canvas.barcode(margin, y - 78, data['tracking_id'], inner, 50)
+    canvas.line(margin, y - 88, width - margin, y - 88)
+
+    y -= 104
+    canvas.text(margin, y, 'SHIP TO', 7, bold=True)
+    y = canvas.wrapped(margin, y - 13, data['receiver_name'] or data['customer_name'], inner, 12, bold=True, max_lines=2)
+    y = canvas.wrapped(margin, y, data['recipient_address'], inner, 9, max_lines=3)
+    canvas.text(margin, y, data['recipient_country'], 9, bold=True)
+    if data['contact_number']:
+        canvas.text(margin, y - 12, 'Tel: %s' % data['contact_number'], 9)
+    canvas.line(margin, y - 22, width - margin, y - 22)
+
+    y -= 38
+    canvas.text(margin, y, 'FROM: %s' % data['origin'], 8)
+    canvas.text(margin, y - 12, 'TO: %s' % data['destination'], 8, bold=True)
+    canvas.text(margin, y - 28, '%s | %s pcs | %s kg | %s cbm' % (
+        CARGO_TYPES.get(data['cargo_type'], data['cargo_type']), data['number_of_packages'],
+        number(data['weight']), number(data['volume']),
+    ), 8)
+    canvas.wrapped(margin, y - 40, data['commodity'], inner - 80, 8, max_lines=2)
+    if data['cargo_ref_number']:
+        canvas.text(margin, margin + 6, 'Ref: %s' % data['cargo_ref_number'], 8, bold=True)
+    canvas.qr(width - margin - 72, margin + 2, tracking_url(data), 72)
+    return canvas
+
+
+def draw_waybill(data):
+    width, height = WAYBILL_SIZE
+    canvas = Canvas(width, height)
+    margin = 40
+    inner = width - 2 * margin
+    column = inner / 2
+
+    y = height - 60
+    canvas.text(margin, y, data['company'], 16, bold=True)
+    canvas.text(margin, y - 16, data['website'], 9)
+    canvas.text(width - margin - 140, y, 'WAYBILL', 20, bold=True)
+    canvas.text(width - margin - 140, y - 16, 'Issued %s' % data['issued'], 9)
+
+    y -= 40
+    canvas.barcode(margin, y - 50, data['tracking_id'], inner - 110, 50)
+    canvas.text(margin, y - 64, data['tracking_id'], 12, bold=True)
+    canvas.qr(width - margin - 90, y - 72, tracking_url(data), 90)
+
+    def box(x, top, box_width, box_height, title, rows):
+        canvas.rect(x, top - box_height, box_width, box_height)
+        canvas.text(x + 8, top - 14, title, 9, bold=True)
+        row_y = top - 30
+        for label, value in rows:
+            canvas.text(x + 8, row_y, label, 8, bold=True)
+            row_y = canvas.wrapped(x + 95, row_y, value, box_width - 103, 8, max_lines=3) - 2
+
+    y -= 100
+    box(margin, y, column, 150, 'SHIPPER', [
+        ('Name', data['customer_name']),
+        ('Email', data['customer_email']),
+        ('Phone', data['customer_phone']),
+        ('Origin', data['origin']),
+    ])
+    box(margin + column, y, column, 150, 'CONSIGNEE', [
+        ('Name', data['receiver_name'] or data['customer_name']),
+        ('Phone', data['contact_number'] or ''),
+        ('Email', data['email']),
+        ('Address', data['recipient_address']),
+        ('Country', data['recipient_country']),
+    ])
+
+    y -= 165
+    box(margin, y, inner, 150, 'SHIPMENT', [
+        ('Cargo type', CARGO_TYPES.get(data['cargo_type'], data['cargo_type'])),
+        ('Commodity', data['commodity']),
+        ('Packages', data['number_of_packages']),
+        ('Weight (kg)', number(data['weight'])),
+        ('Volume (cbm)', number(data['volume'])),
+        ('Destination', data['destination']),
+    ])
+    canvas.text(margin + column + 8, y - 30, 'Cargo ref', 8, bold=True)
+    canvas.text(margin + column + 95, y - 30, data['cargo_ref_number'] or '-', 8)
+    canvas.text(margin + column + 8, y - 44, 'Collection', 8, bold=True)
+    canvas.text(margin + column + 95, y - 44, data['collection_date'], 8)
+    canvas.text(margin + column + 8, y - 58, 'Departure', 8, bold=True)
+    canvas.text(margin + column + 95, y - 58, data['date_of_departure'] or '-', 8)
+    canvas.text(margin + column + 8, y - 72, 'Arrival', 8, bold=True)
+    canvas.text(margin + column + 95, y - 72, data['date_of_arrival'] or '-', 8)
+
+    y -= 170
+    for index, title in enumerate(('Shipper signature / date', 'Received by / date')):
+        x = margin + index * column
+        canvas.rect(x, y - 70, column, 70)
+        canvas.text(x + 8, y - 14, title, 8, bold=True)
+    canvas.wrapped(margin, y - 90, data['terms'], inner, 7, max_lines=4)
+    return canvas
+
+
+DRAW = {'label': draw_label, 'waybill': draw_waybill}
+
+
+def render_page(kind, data):
+    """The compressed content stream of one page; its size is PAGE_SIZES[kind]."""
+    return zlib.compress(DRAW[kind](data).content(), 6)
+
+
+class PDFStreamWriter:
+    """
+    Write a PDF incrementally: `begin()`, then `page()` per page, then
+    `end()`, each returning the bytes to send. The page tree is written last,
+    so pages need not be known up front.
+    """
+    CATALOG, PAGES, FONT, FONT_BOLD = 1, 2, 3, 4
+
+    def __init__(self):
+        self.position = 0
+        self.offsets = {}
+        self.next_id = 5
+        self.page_ids = []
+
+    def _object(self, object_id, body):
+        data = b'%d 0 obj\n%s\nendobj\n' % (object_id, body)
+        self.offsets[object_id] = self.position
+        self.position += len(data)
+        return data
+
+    def _emit(self, data):
+        self.position += len(data)
+        return data
+
+    def begin(self):
+        return b''.join((
+            self._emit(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n'),
+            self._object(self.FONT, b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica '
+                                    b'/Encoding /WinAnsiEncoding >>'),
+            self._object(self.FONT_BOLD, b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold '
+                                         b'/Encoding /WinAnsiEncoding >>'),
+        ))
+
+    def page(self, size, stream):
+        width, height = size
+        content_id, page_id = self.next_id, self.next_id + 1
+        self.next_id += 2
+        self.page_ids.append(page_id)
+        return b''.join((
+            self._object(content_id, b'<< /Length %d /Filter /FlateDecode >>\nstream\n%s\nendstream' % (
+                len(stream), stream,
+            )),
+            self._object(page_id, b'<< /Type /Page /Parent %d 0 R /MediaBox [0 0 %d %d] '
+                                  b'/Resources << /Font << /F1 %d 0 R /F2 %d 0 R >> >> /Contents %d 0 R >>' % (
+                self.PAGES, width, height, self.FONT, self.FONT_BOLD, content_id,
+            )),
+        ))
+
+    def end(self):
+        kids = b' '.join(b'%d 0 R' % page_id for page_id in self.page_ids)
+        data = [
+            self._object(self.PAGES, b'<< /Type /Pages /Kids [%s] /Count %d >>' % (kids, len(self.page_ids))),
+            self._object(self.CATALOG, b'<< /Type /Catalog /Pages %d 0 R >>' % self.PAGES),
+        ]
+        xref_position = self.position
+        size = self.next_id
+        xref = [b'xref\n0 %d\n' % size, b'0000000000 65535 f \n']
+        for object_id in range(1, size):
+            xref.append(b'%010d 00000 n \n' % self.offsets[object_id])
+        data.append(b''.join(xref))
+        data.append(b'trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (
+            size, self.CATALOG, xref_position,
+        ))
+        return b''.join(data)
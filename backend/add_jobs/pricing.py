@@ -0,0 +1,301 @@
+"""
+Rate-card quotes.
+
+Active rate cards and their breaks are compiled into a RateTable once per
+process: a dict keyed by (origin, destination, cargo type) holding each
+lane's cards newest first, each with its breaks as sorted tuples for a
+bisect. The table is rebuilt when the cache tags of RateCard or RateBreak
+move, so rate changes made in the admin or with `load_rate_cards` apply
+everywhere within CACHE_LOCAL_TTL seconds, without a restart.
+
+A lane is matched most specific first: the place as written, then its last
+comma-separated part (usually the country), then '*', trying origins in
+that order and destinations within each.
+
+The chargeable quantity is the larger of the actual and volumetric
+quantities, in kg (`basis='kg'`, volume * kg_per_cbm) or cbm
+(`basis='cbm'`, weight / kg_per_cbm), rounded up to `rounding_step`. It is
+priced at the rate of the highest break it reaches, and never below the
+card's minimum charge.
+
+`quote` serves single quotes through the tiered cache. `quote_many` prices
+thousands of shipments per call, looking each distinct lane up once, and
+`reprice_jobs` stores quotes on jobs in bulk after rates change.
+"""
+import hashlib
+import json
+import math
+import threading
+from bisect import bisect_right
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from rest_framework.exceptions import ValidationError
+
+from core.cache import cache, model_tag
+from .models import Job, RateBreak, RateCard
+
+RATE_CACHE_TAGS = ('add_jobs.ratecard', 'add_jobs.ratebreak')
+ANY = '*'
+CENT = Decimal('0.01')
+CARGO_TYPES = {value for value, label in Job.CARGO_TYPE_CHOICES}
+# Job fields a quote depends on; edits to any other field keep the stored quote.
+PRICING_FIELDS = frozenset(('origin', 'destination', 'cargo_type', 'weight', 'volume', 'collection_date'))
+
+
+def normalize_place(value):
+    return ', '.join(' '.join(part.split()) for part in str(value or '').casefold().split(','))
+
+
+def place_candidates(value):
+    """The keys a place matches, most specific first."""
+    place = normalize_place(value)
+    candidates = [place]
+    country = place.rsplit(', ', 1)[-1]
+    if country != place:
+        candidates.append(country)
+    if place != ANY:
+        candidates.append(ANY)
+    return candidates
+
+
+class CompiledCard:
+    __slots__ = ('id', 'currency', 'basis', 'kg_per_cbm', 'rounding_step', 'minimum_charge',
+                 'valid_from', 'valid_to', 'thresholds', 'rates')
+
+    def __init__(self, row, breaks):
+        self.id = row['id']
+        self.currency = row['currency']
+        self.basis = row['basis']
+        self.kg_per_cbm = float(row['kg_per_cbm'])
+        self.rounding_step = float(row['rounding_step'])
+        self.minimum_charge = row['minimum_charge']
+        self.valid_from = row['valid_from']
+        self.valid_to = row['valid_to']
+        breaks = sorted(breaks)
+        self.thresholds = tuple(float(min_units) for min_units, rate in breaks)
+        # Money stays Decimal; only the thresholds are compared as floats.
+        self.rates = tuple(rate for min_units, rate in breaks)
+
+    def valid_on(self, day):
+        return self.valid_from <= day and (self.valid_to is None or day <= self.valid_to)
+
+    def chargeable(self, weight, volume):
+        if self.basis == 'cbm':
+            units = max(volume, weight / self.kg_per_cbm if self.kg_per_cbm else 0.0)
+        else:
+            units = max(weight, volume * self.kg_per_cbm)
+        step = self.rounding_step
+        if step:
+            # Tolerate float noise, e.g. 10.000000001 on a 0.5 step.
+            units = math.ceil(round(units / step, 6)) * step
+        return round(units, 3)
+
+    def quote(self, weight, volume):
+        units = self.chargeable(weight, volume)
+        rate = self.rates[max(bisect_right(self.thresholds, units) - 1, 0)]
+        price = Decimal('%.3f' % units) * rate
+        minimum_applied = price < self.minimum_charge
+        if minimum_applied:
+            price = self.minimum_charge
+        return {
+            'found': True,
+            'rate_card': self.id,
+            'currency': self.currency,
+            'basis': self.basis,
+            'chargeable': units,
+            'rate': str(rate),
+            'minimum_applied': minimum_applied,
+            'price': str(price.quantize(CENT, ROUND_HALF_UP)),
+        }
+
+
+class RateTable:
+    def __init__(self, cards):
+        self.lanes = {}
+        for origin, destination, cargo_type, card in cards:
+            self.lanes.setdefault((origin, destination, cargo_type), []).append(card)
+        for lane in self.lanes.values():
+            lane.sort(key=lambda card: card.valid_from, reverse=True)
+
+    def find(self, origin, destination, cargo_type, day):
+        """The most specific card for the lane valid on `day`, or None."""
+        destinations = place_candidates(destination)
+        for origin_key in place_candidates(origin):
+            for destination_key in destinations:
+                for card in self.lanes.get((origin_key, destination_key, cargo_type), ()):
+                    if card.valid_on(day):
+                        return card
+        return None
+
+
+def load_table():
+    breaks = {}
+    for rate_card_id, min_units, rate in RateBreak.objects.filter(rate_card__is_active=True).values_list(
+            'rate_card_id', 'min_units', 'rate'):
+        breaks.setdefault(rate_card_id, []).append((min_units, rate))
+    cards = []
+    for row in RateCard.objects.filter(is_active=True, id__in=list(breaks)).values():
+        cards.append((
+            normalize_place(row['origin']), normalize_place(row['destination']), row['cargo_type'],
+            CompiledCard(row, breaks[row['id']]),
+        ))
+    return RateTable(cards)
+
+
+class QuoteEngine:
+    """Holds the compiled RateTable, rebuilding it when rate cards change."""
+
+    def __init__(self):
+        self._table = None
+        self._versions = None
+        self._lock = threading.Lock()
+
+    def table(self):
+        versions = cache.tag_versions(RATE_CACHE_TAGS)
+        if self._table is None or self._versions != versions:
+            with self._lock:
+                if self._table is None or self._versions != versions:
+                    # Versions are read before loading, so a change made
+                    # meanwhile triggers another rebuild on the next call.
+                    self._table = load_table()
+                    self._versions = versions
+        return self._table
+
+
+engine = QuoteEngine()
+
+
+def clean_shipment(raw, index=None):
+    """Validate one shipment dict for `quote`/`quote_many`, raising ValidationError."""
+    def fail(message):
+        raise ValidationError({'shipments': {index: [message]}} if index is not None else {'error': message})
+
+    if not isinstance(raw, dict):
+        fail('Expected an object.')
+    cargo_type = raw.get('cargo_type')
+    if cargo_type not in CARGO_TYPES:
+        fail('cargo_type must be one of: %s.' % ', '.join(sorted(CARGO_TYPES)))
+    shipment = {'cargo_type': cargo_type}
+    for field in ('origin', 'destination'):
+        if not isinstance(raw.get(field), str) or not raw[field].strip():
+            fail('%s is required.' % field)
+        shipment[field] = raw[field]
+    for field in ('weight', 'volume'):
+        try:
+            shipment[field] = float(raw.get(field) or 0)
+        except (TypeError, ValueError):
+            fail('%s must be a number.' % field)
+        if not 0 <= shipment[field] < 1e9:
+            fail('%s must be a non-negative number.' % field)
+    day = raw.get('date') or None
+    if day is not None:
+        try:
+            day = parse_date(day) if isinstance(day, str) else None
+        except ValueError:
+            day = None
+        if day is None:
+            fail('date must be YYYY-MM-DD.')
+    shipment['date'] = day
+    return shipment
+
+
+def quote_many(shipments, today=None):
+    """One quote dict per shipment, in order; `found` is False where no card applies."""
+    table = engine.table()
+    today = today or timezone.localdate()
+    cards = {}
+    results = []
+    for shipment in shipments:
+        lane = (shipment['origin'], shipment['destination'], shipment['cargo_type'], shipment['date'] or today)
+        if lane in cards:
+            card = cards[lane]
+        else:
+            card = cards[lane] = table.find(*lane)
+        if card is None:
+            results.append({'found': False})
+        else:
+            results.append(card.quote(shipment['weight'], shipment['volume']))
+    return results
+
+
+def quote(shipment):
+    """A single quote, cached until the rate cards change."""
+    day = shipment['date'] or timezone.localdate()
+    payload = json.dumps([
+        normalize_place(shipment['origin']), normalize_place(shipment['destination']),
+        shipment['cargo_type'], shipment['weight'], shipment['volume'], day.isoformat(),
+    ])
+    key = 'quote:' + hashlib.sha1(payload.encode()).hexdigest()
+    return cache.get_or_set(key, lambda: quote_many([dict(shipment, date=day)])[0],
+                            timeout=settings.RATE_QUOTE_CACHE_TIMEOUT, tags=RATE_CACHE_TAGS)
+
+
+def pricing_changed(data, instance):
+    """Whether saving validated `data` over `instance` changes any pricing input."""
+    return any(field in data and data[field] != getattr(instance, field) for field in PRICING_FIELDS)
+
+
+def job_quote_fields(data, instance=None):
+    """
+    Pricing fields for a job being saved from validated serializer data,
+    taking fields a partial update leaves out from `instance`.
+    """
+    def value(field):
+        return data[field] if field in data else getattr(instance, field)
+
+    result = quote({
+        'origin': value('origin'),
+        'destination': value('destination'),
+        'cargo_type': value('cargo_type'),
+        'weight': float(value('weight')),
+        'volume': float(value('volume')),
+        'date': value('collection_date'),
+    })
+    if not result['found']:
+        return {'quoted_price': None, 'quote_currency': '', 'rate_card_id': None, 'priced_at': timezone.now()}
+    return {
+        'quoted_price': Decimal(result['price']),
+        'quote_currency': result['currency'],
+        'rate_card_id': result['rate_card'],
+        'priced_at': timezone.now(),
+    }
+
+
+def reprice_jobs(queryset, batch_size=1000, dry_run=False):
+    """
+    Re-quote the jobs in `queryset` on their collection dates and store the
+    quotes that changed. Returns (examined, changed, unpriced).
+    """
+    fields = ('id', 'origin', 'destination', 'cargo_type', 'weight', 'volume', 'collection_date',
+              'quoted_price', 'quote_currency', 'rate_card_id')
+    update_fields = ['quoted_price', 'quote_currency', 'rate_card', 'priced_at']
+    examined = changed = unpriced = 0
+    last_id = 0
+    now = timezone.now()
+    while True:
+        rows = list(queryset.filter(pk__gt=last_id).order_by('pk').values(*fields)[:batch_size])
+        if not rows:
+            break
+        last_id = rows[-1]['id']
+        quotes = quote_many([dict(row, date=row['collection_date']) for row in rows])
+        updates = []
+        for row, result in zip(rows, quotes):
+            if result['found']:
+                priced = (Decimal(result['price']), result['currency'], result['rate_card'])
+            else:
+                priced = (None, '', None)
+                unpriced += 1
+            if priced != (row['quoted_price'], row['quote_currency'], row['rate_card_id']):
+                updates.append(Job(pk=row['id'], quoted_price=priced[0], quote_currency=priced[1],
+                                   rate_card_id=priced[2], priced_at=now))
+        examined += len(rows)
+        changed += len(updates)
+        if updates and not dry_run:
+            Job.objects.bulk_update(updates, update_fields, batch_size=batch_size)
+    if changed and not dry_run:
+        # bulk_update sends no signals.
+        cache.invalidate_tags(model_tag(Job))
+    return examined, changed, unpriced
@@ -1,6 +1,7 @@
 from rest_framework import serializers
-from .models import Job, StatusUpdate
+from .models import AttachmentUpload, Job, JobAttachment, StatusUpdate
 from add_customers.models import AddCustomer
+from core.readers import ValuesReader, chunked, date_repr, datetime_repr, decimal_repr
 
 class CustomerSerializer(serializers.ModelSerializer):
     class Meta:
@@ -35,6 +36,108 @@ class JobSerializer(serializers.ModelSerializer):
             'id', 'cargo_type', 'customer', 'customer_id', 'receiver_name', 'contact_number', 'email',
             'recipient_address', 'recipient_country', 'commodity', 'number_of_packages',
             'weight', 'volume', 'origin', 'destination', 'cargo_ref_number', 'tracking_id',
-            'collection_date', 'date_of_departure', 'date_of_arrival', 'created_at',
-            'status_updates'
-        ]
\ No newline at end of file
+            'collection_date', 'date_of_departure', 'date_of_arrival', 'quoted_price', 'quote_currency',
+            'rate_card', 'priced_at', 'created_at', 'status_updates'
+        ]
+        read_only_fields = ['quoted_price', 'quote_currency', 'rate_card', 'priced_at']
+
+class StatusUpdateValuesReader(ValuesReader):
+    """values()-based equivalent of StatusUpdateSerializer for read endpoints."""
+    fields = ('id', 'job', 'status_content', 'status_date', 'status_time', 'created_at')
+    converters = {
+        'status_date': date_repr,
+        'status_time': date_repr,
+        'created_at': datetime_repr,
+    }
+
+    def for_jobs(self, job_ids):
+        """Return {job_id: [status update dicts]} for the given jobs, ordered by id."""
+        job_ids = list(job_ids)
+        grouped = {job_id: [] for job_id in job_ids}
+        for ids in chunked(job_ids):
+            queryset = StatusUpdate.objects.filter(job_id__in=ids).order_by('id')
+            for row in self.read(queryset):
+                grouped[row['job']].append(row)
+        return grouped
+
+
+class JobValuesReader(ValuesReader):
+    """
+    values()-based equivalent of JobSerializer for read endpoints.
+
+    The nested customer and status updates are each loaded with one grouped
+    query per chunk of jobs, and only when selected.
+    """
+    fields = (
+        'id', 'cargo_type', 'customer', 'receiver_name', 'contact_number', 'email',
+        'recipient_address', 'recipient_country', 'commodity', 'number_of_packages',
+        'weight', 'volume', 'origin', 'destination', 'cargo_ref_number', 'tracking_id',
+        'collection_date', 'date_of_departure', 'date_of_arrival', 'quoted_price', 'quote_currency',
+        'rate_card', 'priced_at', 'created_at', 'status_updates',
+    )
+    columns = {
+        'rate_card': 'rate_card_id',
+    }
+    converters = {
+        'collection_date': date_repr,
+        'date_of_departure': date_repr,
+        'date_of_arrival': date_repr,
+        'quoted_price': decimal_repr,
+        'priced_at': datetime_repr,
+        'created_at': datetime_repr,
+    }
+    relations = {
+        'customer': 'customer_id',
+        'status_updates': 'pk',
+    }
+
+    def expand_customer(self, customer_ids):
+        customers = {}
+        for ids in chunked(list(customer_ids)):
+            for pk, name in AddCustomer.objects.filter(id__in=ids).values_list('id', 'name'):
+                customers[pk] = {'id': pk, 'name': name}
+        return customers
+
+    def expand_status_updates(self, job_ids):
+        return StatusUpdateValuesReader().for_jobs(job_ids)
+
+
+class TrackingValuesReader(ValuesReader):
+    """
+    Public-safe view of a job for tracking lookups: shipment progress only,
+    without the customer, recipient contact details or internal references.
+    """
+    fields = (
+        'tracking_id', 'cargo_type', 'commodity', 'number_of_packages', 'weight', 'volume',
+        'origin', 'destination', 'collection_date', 'date_of_departure', 'date_of_arrival',
+        'status_updates',
+    )
+    converters = {
+        'collection_date': date_repr,
+        'date_of_departure': date_repr,
+        'date_of_arrival': date_repr,
+    }
+    relations = {
+        'status_updates': 'pk',
+    }
+    status_update_fields = ('id', 'status_content', 'status_date', 'status_time')
+
+    def expand_status_updates(self, job_ids):
+        grouped = StatusUpdateValuesReader(fields={'job', *self.status_update_fields}).for_jobs(job_ids)
+        for updates in grouped.values():
+            for update in updates:
+                del update['job']
+        return grouped
+
+class JobAttachmentSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = JobAttachment
+        fields = ['id', 'job', 'kind', 'original_name', 'content_type', 'size', 'sha256', 'preview_status', 'created_at']
+        read_only_fields = fields
+
+class AttachmentUploadSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = AttachmentUpload
+        fields = ['id', 'job', 'kind', 'original_name', 'content_type', 'size', 'offset', 'created_at']
+        read_only_fields = ['id', 'job', 'offset', 'created_at']
+        extra_kwargs = {'content_type': {'required': False, 'allow_blank': True}}
@@ -1,3 +1,245 @@
-from django.test import TestCase
+import shutil
+import tempfile
+from datetime import date, datetime, time, timezone
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.contrib.admin.sites import site
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from add_customers.models import AddCustomer
+from authapp.tokens import RoleRefreshToken
+from core.cache import cache
+from core.renderers import FastJSONRenderer
+from .admin import JobAdmin
+from .models import AttachmentUpload, Job, JobAttachment, RateBreak, RateCard, StatusUpdate
+from .pricing import CompiledCard
+from .serializers import JobSerializer, JobValuesReader, StatusUpdateSerializer, StatusUpdateValuesReader
+
+
+def make_job(**fields):
+    customer = AddCustomer.objects.create(name='Test Customer', phone_number='12345', email='customer@example.com',
+                                          address='1 Test Street', country='Qatar')
+    values = dict(
+        cargo_type='sea', customer=customer, email='recipient@example.com', recipient_address='2 Test Road',
+        recipient_country='UK', commodity='Furniture', number_of_packages=3, weight=120.5, volume=1.25,
+        origin='Doha', destination='London', collection_date=date(2025, 1, 10),
+    )
+    values.update(fields)
+    return Job.objects.create(**values)
+
+
+class AttachmentUploadAuthTests(TestCase):
+    """Uploads made through the real JWT authentication, whose user is a token-backed RoleTokenUser."""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=self.media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+
+        self.user = get_user_model().objects.create_user('staff@example.com', 'password', role='user')
+        self.client = APIClient()
+        token = RoleRefreshToken.for_user(self.user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer %s' % token)
+        self.job = make_job()
+
+    def test_upload_records_the_token_user(self):
+        payload = b'%PDF-1.4 test document'
+        response = self.client.post('/api/jobs/jobs/%d/attachments/' % self.job.pk,
+                                    {'original_name': 'packing list.pdf', 'size': len(payload)}, format='json')
+        self.assertEqual(response.status_code, 201)
+        upload = AttachmentUpload.objects.get(pk=response.data['id'])
+        self.assertEqual(upload.created_by_id, self.user.pk)
+
+        response = self.client.generic('PATCH', response.data['upload_url'], payload,
+                                       content_type='application/offset+octet-stream', HTTP_UPLOAD_OFFSET='0')
+        self.assertEqual(response.status_code, 200)
+        attachment = JobAttachment.objects.get(pk=response.data['attachment']['id'])
+        self.assertEqual(attachment.uploaded_by_id, self.user.pk)
+        self.assertEqual(attachment.size, len(payload))
+
+    def test_upload_requires_authentication(self):
+        response = APIClient().post('/api/jobs/jobs/%d/attachments/' % self.job.pk,
+                                    {'original_name': 'a.pdf', 'size': 10}, format='json')
+        self.assertEqual(response.status_code, 401)
+
+
+class CompiledCardTests(TestCase):
+    def card(self, rate, minimum_charge='0', basis='kg', rounding_step='0'):
+        row = {
+            'id': 1, 'currency': 'QAR', 'basis': basis, 'kg_per_cbm': Decimal('167'),
+            'rounding_step': Decimal(rounding_step), 'minimum_charge': Decimal(minimum_charge),
+            'valid_from': date(2025, 1, 1), 'valid_to': None,
+        }
+        return CompiledCard(row, [(Decimal('0'), Decimal(rate))])
+
+    def test_price_is_rounded_from_the_exact_product(self):
+        # 3 * 0.145 is 0.43499999... in binary floating point.
+        self.assertEqual(self.card('0.145').quote(3, 0)['price'], '0.44')
+        self.assertEqual(self.card('2.675').quote(1, 0)['price'], '2.68')
+
+    def test_minimum_charge_and_volumetric_weight(self):
+        quote = self.card('10', minimum_charge='150.00', rounding_step='0.5').quote(2, 0.1)
+        self.assertEqual(quote['chargeable'], 17.0)
+        self.assertEqual(quote['price'], '170.00')
+        quote = self.card('10', minimum_charge='150.00').quote(1, 0)
+        self.assertTrue(quote['minimum_applied'])
+        self.assertEqual(quote['price'], '150.00')
+
+
+class TrackTests(TestCase):
+    def setUp(self):
+        self.job = make_job()
+
+    def test_batch_lookup_reads_the_cache_in_one_round_trip(self):
+        ids = [self.job.tracking_id.lower(), 'AMI000000']
+        first = self.client.post('/api/jobs/jobs/track/', {'tracking_ids': ids}, content_type='application/json')
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual([result['found'] for result in first.json()['results']], [True, False])
+
+        cache.local.clear()
+        with mock.patch.object(cache.shared, 'get_many', wraps=cache.shared.get_many) as get_many:
+            second = self.client.post('/api/jobs/jobs/track/', {'tracking_ids': ids}, content_type='application/json')
+        self.assertEqual(second.json(), first.json())
+        value_reads = [call.args[0] for call in get_many.call_args_list if call.args[0][0].startswith('val:')]
+        self.assertEqual(value_reads, [['val:tracking:' + self.job.tracking_id, 'val:tracking:AMI000000']])
+
+    def test_non_object_body_is_rejected(self):
+        response = self.client.post('/api/jobs/jobs/track/', [self.job.tracking_id], content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+
+class DocumentsTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user('staff@example.com', 'password', role='user')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_non_object_body_is_rejected(self):
+        response = self.client.post('/api/jobs/jobs/documents/', [1, 2], format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+class RepriceTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user('staff@example.com', 'password', role='user')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_non_object_body_is_rejected(self):
+        response = self.client.post('/api/jobs/jobs/reprice/', [1, 2], format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+class ValuesReaderEquivalenceTests(TestCase):
+    """The values() read path must render byte for byte like the serializers."""
+
+    def setUp(self):
+        # Nulls everywhere they are allowed, and no status updates.
+        self.bare = make_job(receiver_name=None, contact_number=None, cargo_ref_number=None)
+        self.full = Job.objects.create(
+            cargo_type='air', customer=self.bare.customer, receiver_name='Receiver', contact_number='+974 5555',
+            email='full@example.com', recipient_address='Line 1\nLine 2', recipient_country='Qatar',
+            commodity='Électronique', number_of_packages=1, weight=0.1, volume=0.0, origin='Doha',
+            destination='Paris, France', cargo_ref_number='REF-1', collection_date=date(2025, 2, 1),
+            date_of_departure=date(2025, 2, 3), date_of_arrival=date(2025, 2, 9), quoted_price=Decimal('1234.50'),
+            quote_currency='QAR',
+        )
+        for day in (4, 5):
+            StatusUpdate.objects.create(job=self.full, status_content='Update %d' % day,
+                                        status_date=date(2025, 2, day), status_time=time(9, 30, 15))
+
+    def render(self, data):
+        return FastJSONRenderer().render(data)
+
+    def test_jobs_match_the_serializer(self):
+        queryset = Job.objects.order_by('id')
+        self.assertEqual(self.render(JobValuesReader().read(queryset)),
+                         self.render(JobSerializer(queryset, many=True).data))
+
+    def test_status_updates_match_the_serializer(self):
+        queryset = StatusUpdate.objects.order_by('id')
+        self.assertEqual(self.render(StatusUpdateValuesReader().read(queryset)),
+                         self.render(StatusUpdateSerializer(queryset, many=True).data))
+
+    def test_list_and_retrieve_endpoints_match_the_serializer(self):
+        expected = JobSerializer(Job.objects.order_by('id'), many=True).data
+        response = self.client.get('/api/jobs/jobs/')
+        self.assertEqual(response.content, self.render(expected))
+        response = self.client.get('/api/jobs/jobs/%d/' % self.full.pk)
+        self.assertEqual(response.content, self.render(expected[1]))
+
+    def test_sparse_fields_and_expand(self):
+        expected = JobSerializer(Job.objects.order_by('id'), many=True).data
+        response = self.client.get('/api/jobs/jobs/?fields=id,tracking_id,quoted_price,date_of_departure')
+        self.assertEqual(response.json(), [
+            {name: row[name] for name in ('id', 'tracking_id', 'quoted_price', 'date_of_departure')}
+            for row in expected
+        ])
+        # Relations are left out with `fields` unless expanded.
+        response = self.client.get('/api/jobs/jobs/?fields=id&expand=customer,status_updates')
+        self.assertEqual(response.content, self.render([
+            {name: row[name] for name in ('id', 'customer', 'status_updates')} for row in expected
+        ]))
+        response = self.client.get('/api/jobs/jobs/?fields=id,status_updates')
+        self.assertEqual(response.json()[1]['status_updates'], expected[1]['status_updates'])
+        self.assertEqual(self.client.get('/api/jobs/jobs/?expand=weight').status_code, 400)
+
+
+class JobRepricingTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user('staff@example.com', 'password', role='user')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.job = make_job()
+        self.priced_at = datetime(2025, 1, 1, tzinfo=timezone.utc)
+        Job.objects.filter(pk=self.job.pk).update(quoted_price=Decimal('99.00'), quote_currency='QAR',
+                                                  priced_at=self.priced_at)
+        with self.captureOnCommitCallbacks(execute=True):
+            card = RateCard.objects.create(origin='Doha', destination='London', cargo_type='sea',
+                                           valid_from=date(2025, 1, 1))
+            RateBreak.objects.create(rate_card=card, min_units=0, rate=Decimal('10'))
+
+    def patch(self, data):
+        response = self.client.patch('/api/jobs/jobs/%d/' % self.job.pk, data, format='json')
+        self.assertEqual(response.status_code, 200)
+        return Job.objects.get(pk=self.job.pk)
+
+    def test_edit_without_pricing_inputs_keeps_the_quote(self):
+        job = self.patch({'receiver_name': 'Corrected Name', 'weight': 120.5})
+        self.assertEqual(job.receiver_name, 'Corrected Name')
+        self.assertEqual((job.quoted_price, job.priced_at), (Decimal('99.00'), self.priced_at))
+
+    def test_edit_to_a_pricing_input_reprices(self):
+        job = self.patch({'weight': 300})
+        self.assertEqual(job.quoted_price, Decimal('3000.00'))
+        self.assertNotEqual(job.priced_at, self.priced_at)
+
+    def test_admin_save_reprices_only_for_pricing_changes(self):
+        class Form:
+            changed_data = ['receiver_name']
+
+        request = mock.Mock()
+        job = Job.objects.get(pk=self.job.pk)
+        JobAdmin(Job, site).save_model(request, job, Form(), True)
+        self.assertEqual(Job.objects.get(pk=job.pk).quoted_price, Decimal('99.00'))
+        Form.changed_data = ['weight']
+        job.weight = 300
+        JobAdmin(Job, site).save_model(request, job, Form(), True)
+        self.assertEqual(Job.objects.get(pk=job.pk).quoted_price, Decimal('3000.00'))
+
+
+class QuoteViewTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user('staff@example.com', 'password', role='user')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_non_object_body_is_rejected(self):
+        for body in (5, 'shipments', [{'origin': 'Doha'}]):
+            response = self.client.post('/api/jobs/quotes/', body, format='json')
+            self.assertEqual(response.status_code, 400, body)
@@ -0,0 +1,64 @@
+"""
+Batch tracking lookups.
+
+Tracking ids are normalised (trimmed, upper-cased, de-duplicated), served
+from the tiered cache per id where possible, and the misses resolved with a
+single query on the unique tracking_id index. Results only carry the
+public-safe fields of TrackingValuesReader.
+"""
+from django.conf import settings
+from rest_framework.exceptions import ValidationError
+
+from core.cache import cache
+from core.db_router import read_from_replica
+from .models import Job
+from .serializers import TrackingValuesReader
+
+TRACKING_CACHE_TAGS = ('add_jobs.job', 'add_jobs.statusupdate')
+
+
+def normalize_tracking_ids(raw_ids):
+    """Return the distinct, upper-cased ids in request order, validating the batch."""
+    if not isinstance(raw_ids, (list, tuple)) or not all(isinstance(value, str) for value in raw_ids):
+        raise ValidationError({'tracking_ids': ['Expected a list of tracking IDs.']})
+    tracking_ids = list(dict.fromkeys(value.strip().upper() for value in raw_ids if value.strip()))
+    if not tracking_ids:
+        raise ValidationError({'tracking_ids': ['At least one tracking ID is required.']})
+    if len(tracking_ids) > settings.TRACKING_BATCH_MAX_IDS:
+        raise ValidationError({
+            'tracking_ids': ['At most %d tracking IDs can be tracked at once.' % settings.TRACKING_BATCH_MAX_IDS],
+        })
+    return tracking_ids
+
+
+def track_shipments(tracking_ids):
+    """Return one result per tracking id, in order, with `found` set for each."""
+    cached = cache.get_many([_cache_key(tracking_id) for tracking_id in tracking_ids])
+    results = {tracking_id: cached.get(_cache_key(tracking_id)) for tracking_id in tracking_ids}
+    missing = [tracking_id for tracking_id, result in results.items() if result is None]
+    if missing:
+        versions = cache.tag_versions(TRACKING_CACHE_TAGS)
+        found = _lookup(missing)
+        results.update(found)
+        cache.set_many({_cache_key(tracking_id): result for tracking_id, result in found.items()}, versions=versions)
+    return [results[tracking_id] for tracking_id in tracking_ids]
+
+
+def _lookup(tracking_ids):
+    queryset = Job.objects.filter(tracking_id__in=tracking_ids)
+    if cache.invalidated_within(TRACKING_CACHE_TAGS, settings.REPLICA_MAX_LAG_SECONDS):
+        shipments = TrackingValuesReader().read(queryset)
+    else:
+        with read_from_replica():
+            shipments = TrackingValuesReader().read(queryset)
+    # Match case-insensitively, as MySQL's collation does.
+    found = {shipment['tracking_id'].upper(): shipment for shipment in shipments}
+    return {
+        tracking_id: {'tracking_id': tracking_id, 'found': True, 'shipment': found[tracking_id]}
+        if tracking_id in found else {'tracking_id': tracking_id, 'found': False}
+        for tracking_id in tracking_ids
+    }
+
+
+def _cache_key(tracking_id):
+    return 'tracking:' + tracking_id
@@ -1,11 +1,14 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import JobViewSet, StatusUpdateViewSet
+from .views import AttachmentUploadView, JobAttachmentViewSet, JobViewSet, QuoteView, StatusUpdateViewSet
 
 router = DefaultRouter()
 router.register(r'jobs', JobViewSet, basename='job')
 router.register(r'status-updates', StatusUpdateViewSet, basename='status-update') 
+router.register(r'attachments', JobAttachmentViewSet, basename='attachment')
 
 urlpatterns = [
     path('', include(router.urls)),
+    path('quotes/', QuoteView.as_view(), name='quotes'),
+    path('attachment-uploads/<uuid:pk>/', AttachmentUploadView.as_view(), name='attachment-upload'),
 ]
\ No newline at end of file
@@ -1,14 +1,33 @@
-from rest_framework import viewsets, status
-from rest_framework.permissions import AllowAny
+import logging
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.urls import reverse
+from rest_framework import mixins, viewsets, status
+from rest_framework.decorators import action
+from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
-from .models import Job, StatusUpdate
-from .serializers import JobSerializer, StatusUpdateSerializer
+from rest_framework.views import APIView
+from . import documents
+from .attachments import AttachmentError, abort_upload, active_uploads, append_chunk, file_response, start_upload
+from .models import Job, JobAttachment, StatusUpdate
+from .pricing import clean_shipment, job_quote_fields, pricing_changed, quote, quote_many, reprice_jobs
+from .serializers import (
+    AttachmentUploadSerializer, JobAttachmentSerializer, JobSerializer, StatusUpdateSerializer,
+    JobValuesReader, StatusUpdateValuesReader,
+)
+from .tracking import normalize_tracking_ids, track_shipments
+from core.idempotency import idempotent
+from core.prefer import ReturnMinimalMixin, minimal_response, prefers_minimal
+from core.readers import ValuesReadMixin, etag_matches
 from django.core.mail import send_mail
 from django.conf import settings
 
-class JobViewSet(viewsets.ModelViewSet):
+logger = logging.getLogger(__name__)
+
+class JobViewSet(ReturnMinimalMixin, ValuesReadMixin, viewsets.ModelViewSet):
     queryset = Job.objects.all()
     serializer_class = JobSerializer
+    values_reader_class = JobValuesReader
+    cache_tags = ('add_jobs.job', 'add_jobs.statusupdate', 'add_customers.addcustomer')
     permission_classes = [AllowAny]
 
     def get_queryset(self):
@@ -18,12 +37,147 @@ class JobViewSet(viewsets.ModelViewSet):
             queryset = queryset.filter(tracking_id=tracking_id)
         return queryset
 
+    @action(detail=False, methods=['get', 'post'], url_path='track')
+    def track(self, request):
+        """
+        Track several shipments at once: POST {"tracking_ids": [...]} or
+        GET ?tracking_ids=ID1,ID2. Returns public shipment details, or
+        found=false, per ID.
+        """
+        if request.method == 'POST':
+            if not isinstance(request.data, dict):
+                return Response({'error': 'Expected a JSON object.'}, status=status.HTTP_400_BAD_REQUEST)
+            raw_ids = request.data.get('tracking_ids')
+        else:
+            raw_ids = request.query_params.get('tracking_ids', '').split(',')
+        tracking_ids = normalize_tracking_ids(raw_ids)
+        return Response({'results': track_shipments(tracking_ids)})
+
+    @action(detail=True, methods=['get', 'post'], url_path='attachments', permission_classes=[IsAuthenticated])
+    def attachments(self, request, pk=None):
+        """
+        GET lists the job's attachments. POST {"original_name", "size",
+        "kind", "content_type"} starts a resumable upload; send the bytes to
+        the returned upload URL (see AttachmentUploadView).
+        """
+        job = self.get_object()
+        if request.method == 'GET':
+            attachments = JobAttachment.objects.filter(job=job).order_by('-id')
+            return Response(JobAttachmentSerializer(attachments, many=True).data)
+
+        serializer = AttachmentUploadSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            upload = start_upload(job, user=request.user, **serializer.validated_data)
+        except AttachmentError as e:
+            return Response({'error': e.message}, status=e.status_code)
+        return upload_response(upload, status.HTTP_201_CREATED)
+
+    def perform_create(self, serializer):
+        serializer.save(**job_quote_fields(serializer.validated_data))
+
+    def perform_update(self, serializer):
+        fields = {}
+        if pricing_changed(serializer.validated_data, serializer.instance):
+            fields = job_quote_fields(serializer.validated_data, serializer.instance)
+        serializer.save(**fields)
+
+    @action(detail=False, methods=['post'], url_path='reprice', permission_classes=[IsAuthenticated])
+    def reprice(self, request):
+        """
+        Re-quote jobs against the current rate cards and store the new
+        prices: POST {"job_ids": [...]}. `manage.py reprice_jobs` covers all
+        open jobs.
+        """
+        if not isinstance(request.data, dict):
+            return Response({'error': 'Expected a JSON object.'}, status=status.HTTP_400_BAD_REQUEST)
+        job_ids = request.data.get('job_ids')
+        if not isinstance(job_ids, list) or not job_ids or not all(isinstance(value, int) for value in job_ids):
+            return Response({'error': 'job_ids must be a non-empty list of job ids.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if len(job_ids) > settings.RATE_BATCH_MAX_ITEMS:
+            return Response({'error': 'At most %d jobs per request.' % settings.RATE_BATCH_MAX_ITEMS},
+                            status=status.HTTP_400_BAD_REQUEST)
+        examined, changed, unpriced = reprice_jobs(Job.objects.filter(pk__in=job_ids))
+        return Response({'examined': examined, 'changed': changed, 'unpriced': unpriced})
+
+    @action(detail=True, methods=['get'], permission_classes=[IsAuthenticated])
+    def label(self, request, pk=None):
+        """The job's 4x6 in shipping label as PDF."""
+        return self.document_response(request, 'label')
+
+    @action(detail=True, methods=['get'], permission_classes=[IsAuthenticated])
+    def waybill(self, request, pk=None):
+        """The job's A4 waybill as PDF."""
+        return self.document_response(request, 'waybill')
+
+    def document_response(self, request, kind):
+        job = self.get_object()
+        data = documents.job_documents_data([job.pk])[job.pk]
+        etag = '"%s-%s"' % (kind, documents.document_version(data))
+        if etag_matches(request.headers.get('If-None-Match'), etag):
+            response = HttpResponse(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = HttpResponse(documents.build_pdf(kind, [job.pk]), content_type='application/pdf')
+            response['Content-Disposition'] = 'inline; filename="%s-%s.pdf"' % (kind, job.tracking_id)
+        response['ETag'] = etag
+        response['Cache-Control'] = 'private, no-cache'
+        return response
+
+    @action(detail=False, methods=['get', 'post'], url_path='documents', permission_classes=[IsAuthenticated])
+    def documents(self, request):
+        """
+        One PDF of labels or waybills for many jobs, streamed page by page:
+        POST {"kind": "label"|"waybill", "job_ids": [...]} or
+        {"kind", "tracking_ids": [...]}, or GET ?kind=label&ids=1,2,3.
+        Pages follow the order given; unknown jobs are skipped.
+        """
+        if request.method == 'POST':
+            if not isinstance(request.data, dict):
+                return Response({'error': 'Expected a JSON object.'}, status=status.HTTP_400_BAD_REQUEST)
+            kind = request.data.get('kind')
+            tracking_ids = request.data.get('tracking_ids')
+            raw_ids = request.data.get('job_ids')
+        else:
+            kind = request.query_params.get('kind')
+            tracking_ids = None
+            raw_ids = [value for value in request.query_params.get('ids', '').split(',') if value.strip()]
+        if kind not in documents.KINDS:
+            return Response({'error': 'kind must be one of: %s.' % ', '.join(documents.KINDS)},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        if tracking_ids is not None:
+            if not isinstance(tracking_ids, list) or not all(isinstance(value, str) for value in tracking_ids):
+                return Response({'error': 'tracking_ids must be a list of tracking IDs.'},
+                                status=status.HTTP_400_BAD_REQUEST)
+            tracking_ids = list(dict.fromkeys(value.strip().upper() for value in tracking_ids if value.strip()))
+            found = dict(Job.objects.filter(tracking_id__in=tracking_ids).values_list('tracking_id', 'id'))
+            job_ids = [found[tracking_id] for tracking_id in tracking_ids if tracking_id in found]
+        else:
+            try:
+                job_ids = list(dict.fromkeys(int(value) for value in raw_ids or ()))
+            except (TypeError, ValueError):
+                return Response({'error': 'job_ids must be a list of job ids.'}, status=status.HTTP_400_BAD_REQUEST)
+            found = set(Job.objects.filter(pk__in=job_ids).values_list('id', flat=True))
+            job_ids = [job_id for job_id in job_ids if job_id in found]
+        if not job_ids:
+            return Response({'error': 'No matching jobs.'}, status=status.HTTP_404_NOT_FOUND)
+        if len(job_ids) > settings.DOCUMENT_BATCH_MAX_JOBS:
+            return Response({'error': 'At most %d jobs per batch.' % settings.DOCUMENT_BATCH_MAX_JOBS},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        response = StreamingHttpResponse(documents.stream_pdf(kind, job_ids), content_type='application/pdf')
+        response['Content-Disposition'] = 'attachment; filename="%ss-%d-jobs.pdf"' % (kind, len(job_ids))
+        response['Cache-Control'] = 'no-store'
+        return response
+
+    @idempotent
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         self.perform_create(serializer)
 
-        job = Job.objects.get(id=serializer.data['id'])
+        job = serializer.instance
         customer = job.customer
         tracking_id = job.tracking_id
         tracking_link = job.get_tracking_link()
@@ -67,14 +221,19 @@ class JobViewSet(viewsets.ModelViewSet):
                 fail_silently=False,
             )
         except Exception as e:
-            print(f"Failed to send email: {e}")
+            logger.error("Failed to send job confirmation email: %s", e, exc_info=True)
+
+        if prefers_minimal(request):
+            return minimal_response(job, status.HTTP_201_CREATED)
 
         headers = self.get_success_headers(serializer.data)
         return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
 
-class StatusUpdateViewSet(viewsets.ModelViewSet):
+class StatusUpdateViewSet(ReturnMinimalMixin, ValuesReadMixin, viewsets.ModelViewSet):
     queryset = StatusUpdate.objects.all()
     serializer_class = StatusUpdateSerializer
+    values_reader_class = StatusUpdateValuesReader
+    cache_tags = ('add_jobs.statusupdate',)
     permission_classes = [AllowAny]
 
     def get_queryset(self):
@@ -82,4 +241,107 @@ class StatusUpdateViewSet(viewsets.ModelViewSet):
         job_id = self.request.query_params.get('job_id', None)
         if job_id is not None:
             queryset = queryset.filter(job_id=job_id)
-        return queryset
\ No newline at end of file
+        return queryset
+
+class QuoteView(APIView):
+    """
+    Price shipments from the rate cards. POST one shipment
+    {"origin", "destination", "cargo_type", "weight", "volume", "date"}
+    for {"quote": {...}}, or {"shipments": [...]} for {"results": [...]}
+    in the same order. `date` (YYYY-MM-DD) defaults to today; `found` is
+    false when no rate card covers the lane.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        if not isinstance(request.data, dict):
+            return Response({'error': 'Expected a JSON object.'}, status=status.HTTP_400_BAD_REQUEST)
+        if 'shipments' not in request.data:
+            return Response({'quote': quote(clean_shipment(request.data))})
+        raw = request.data['shipments']
+        if not isinstance(raw, list) or not raw:
+            return Response({'error': 'shipments must be a non-empty list.'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(raw) > settings.RATE_BATCH_MAX_ITEMS:
+            return Response({'error': 'At most %d shipments per request.' % settings.RATE_BATCH_MAX_ITEMS},
+                            status=status.HTTP_400_BAD_REQUEST)
+        shipments = [clean_shipment(item, index) for index, item in enumerate(raw)]
+        return Response({'results': quote_many(shipments)})
+
+def upload_response(upload, status_code=status.HTTP_200_OK, attachment=None):
+    url = reverse('attachment-upload', kwargs={'pk': upload.pk})
+    data = dict(AttachmentUploadSerializer(upload).data, upload_url=url, chunk_size=settings.JOB_ATTACHMENT_CHUNK_BYTES)
+    if attachment is not None:
+        data['attachment'] = JobAttachmentSerializer(attachment).data
+    response = Response(data, status=status_code)
+    response['Upload-Offset'] = str(upload.offset)
+    response['Cache-Control'] = 'no-store'
+    if status_code == status.HTTP_201_CREATED:
+        response['Location'] = url
+    return response
+
+class AttachmentUploadView(APIView):
+    """
+    A resumable upload. GET/HEAD report the bytes received in Upload-Offset.
+    PATCH appends the request body (application/offset+octet-stream) at the
+    Upload-Offset it names; the response includes the attachment once the
+    last byte is in. DELETE abandons the upload.
+    """
+    permission_classes = [IsAuthenticated]
+    content_types = ('application/offset+octet-stream', 'application/octet-stream')
+
+    def get_upload(self, pk):
+        upload = active_uploads().filter(pk=pk).first()
+        if upload is None:
+            raise Http404('No upload matches the given query.')
+        return upload
+
+    def get(self, request, pk):
+        return upload_response(self.get_upload(pk))
+
+    def patch(self, request, pk):
+        upload = self.get_upload(pk)
+        if request.content_type.split(';')[0].strip() not in self.content_types:
+            return Response({'error': 'Send the chunk as application/offset+octet-stream.'},
+                            status=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE)
+        try:
+            offset = int(request.headers['Upload-Offset'])
+            length = int(request.headers.get('Content-Length') or 0)
+        except (KeyError, ValueError):
+            return Response({'error': 'Upload-Offset and Content-Length headers are required.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        try:
+            # request.stream is the raw body, read without buffering it.
+            attachment = append_chunk(upload, offset, request.stream, length)
+        except AttachmentError as e:
+            response = Response({'error': e.message}, status=e.status_code)
+            response['Upload-Offset'] = str(upload.offset)
+            return response
+        return upload_response(upload, attachment=attachment)
+
+    def delete(self, request, pk):
+        abort_upload(self.get_upload(pk))
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+class JobAttachmentViewSet(mixins.RetrieveModelMixin, mixins.DestroyModelMixin, viewsets.GenericViewSet):
+    queryset = JobAttachment.objects.all()
+    serializer_class = JobAttachmentSerializer
+    permission_classes = [IsAuthenticated]
+
+    def etag(self, attachment, suffix=''):
+        return '"%s-%s%s"' % (attachment.pk, attachment.size, suffix)
+
+    @action(detail=True, methods=['get'])
+    def download(self, request, pk=None):
+        """The file itself; supports Range requests."""
+        attachment = self.get_object()
+        return file_response(request, attachment.file.name, attachment.content_type,
+                             attachment.original_name, self.etag(attachment))
+
+    @action(detail=True, methods=['get'])
+    def preview(self, request, pk=None):
+        """A JPEG thumbnail or first-page preview, once preview_status is 'ready'."""
+        attachment = self.get_object()
+        if not attachment.preview:
+            raise Http404('No preview is available for this attachment.')
+        return file_response(request, attachment.preview.name, 'image/jpeg', 'preview.jpg',
+                             self.etag(attachment, '-preview'), as_attachment=False)
@@ -8,7 +8,7 @@ class CustomUserAdmin(UserAdmin):
     list_filter = ('role', 'is_active', 'is_staff')
     search_fields = ('email', 'first_name', 'last_name')
     ordering = ('email',)
-    readonly_fields = ('date_joined', 'otp', 'otp_created_at')
+    readonly_fields = ('date_joined',)
     filter_horizontal = ('groups', 'user_permissions')
     
     fieldsets = (
@@ -16,7 +16,6 @@ class CustomUserAdmin(UserAdmin):
         ('Personal Info', {'fields': ('first_name', 'last_name')}),
         ('Permissions', {'fields': ('is_active', 'is_staff', 'is_superuser', 'role', 'groups', 'user_permissions')}),
         ('Important Dates', {'fields': ('date_joined',)}),
-        ('OTP', {'fields': ('otp', 'otp_created_at')}),
     )
 
     add_fieldsets = (
@@ -27,8 +26,8 @@ class CustomUserAdmin(UserAdmin):
     )
 
     def get_readonly_fields(self, request, obj=None):
-        """Make OTP fields readonly to prevent manual changes."""
-        readonly = ['date_joined', 'otp', 'otp_created_at']
+        """Only superusers may change an existing user's role."""
+        readonly = ['date_joined']
         if obj and not request.user.is_superuser:
             readonly.append('role') 
         return readonly
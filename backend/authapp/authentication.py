@@ -0,0 +1,84 @@
+import threading
+import time
+
+from django.conf import settings
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication, JWTStatelessUserAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+from .models import CustomUser
+from .tokens import user_state_stamp
+
+
+class UserStateCache:
+    """
+    Per-process cache of user state stamps with a TTL.
+
+    Entries are dropped on save of the user in this process (see signals);
+    other processes pick up the change when their entry expires, which
+    bounds how long a revoked token keeps working.
+    """
+
+    def __init__(self, ttl, maxsize=10000):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        entry = self._entries.get(user_id)
+        now = time.monotonic()
+        if entry is not None and entry[0] > now:
+            return entry[1]
+        state = self.load(user_id)
+        with self._lock:
+            if len(self._entries) >= self.maxsize:
+                self._entries.clear()
+            self._entries[user_id] = (now + self.ttl, state)
+        return state
+
+    def load(self, user_id):
+        """Return the user's state stamp, or None if the user does not exist or is inactive."""
+        row = CustomUser.objects.filter(pk=user_id).values_list('role', 'is_active', 'password').first()
+        if row is None or not row[1]:
+            return None
+        return user_state_stamp(*row)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+
+user_state_cache = UserStateCache(ttl=getattr(settings, 'USER_STATE_CACHE_TTL', 60))
+
+
+class RoleTokenUser(TokenUser):
+    """Token-backed user exposing the `role` claim used by permission classes."""
+
+    @property
+    def role(self):
+        return self.token.get('role')
+
+
+class CachedJWTAuthentication(JWTStatelessUserAuthentication):
+    """
+    JWT authentication that does not load the user row per request.
+
+    The role comes from the token; the token's state stamp is checked
+    against the cached current stamp, so role, password or active-flag
+    changes revoke it within USER_STATE_CACHE_TTL seconds. Tokens issued
+    before the claims existed fall back to the database lookup.
+    """
+
+    def get_user(self, validated_token):
+        if 'state' not in validated_token:
+            return JWTAuthentication.get_user(self, validated_token)
+
+        user = super().get_user(validated_token)
+        state = user_state_cache.get(validated_token[api_settings.USER_ID_CLAIM])
+        if state is None:
+            raise AuthenticationFailed(_('User not found or inactive'), code='user_not_found')
+        if state != validated_token['state']:
+            raise AuthenticationFailed(_('Token is no longer valid for this user'), code='user_state_changed')
+        return user
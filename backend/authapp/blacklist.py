@@ -0,0 +1,90 @@
+"""
+In-memory index of blacklisted refresh-token JTIs, and batched pruning of
+expired outstanding/blacklisted tokens.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.db.models import Max
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.utils import aware_utcnow
+
+# Rows are re-read this far below the highest id seen, to catch inserts
+# that committed out of id order.
+SYNC_OVERLAP = 100
+
+
+class BlacklistIndex:
+    """
+    Set of unexpired blacklisted JTIs, kept in sync with BlacklistedToken.
+
+    The first lookup loads the unexpired entries; later lookups read only
+    rows above the highest id seen, at most every `sync_interval` seconds.
+    Tokens blacklisted by this process are added immediately; those
+    blacklisted by other processes are seen within `sync_interval`.
+    """
+
+    def __init__(self, sync_interval):
+        self.sync_interval = sync_interval
+        self._expiry = {}
+        self._last_id = None
+        self._synced_at = 0.0
+        self._swept_at = 0.0
+        self._lock = threading.Lock()
+
+    def __contains__(self, jti):
+        self.sync()
+        return jti in self._expiry
+
+    def add(self, jti, expires_at):
+        self._expiry[jti] = expires_at
+
+    def sync(self, force=False):
+        if not force and time.monotonic() - self._synced_at < self.sync_interval:
+            return
+        with self._lock:
+            if not force and time.monotonic() - self._synced_at < self.sync_interval:
+                return
+            now = aware_utcnow()
+            rows = BlacklistedToken.objects.filter(token__expires_at__gt=now)
+            if self._last_id is None:
+                last_id = BlacklistedToken.objects.aggregate(last=Max('id'))['last'] or 0
+                rows = rows.filter(id__lte=last_id)
+            else:
+                last_id = self._last_id
+                rows = rows.filter(id__gt=self._last_id - SYNC_OVERLAP)
+            for pk, jti, expires_at in rows.values_list('id', 'token__jti', 'token__expires_at'):
+                self._expiry[jti] = expires_at
+                last_id = max(last_id, pk)
+            self._last_id = last_id
+            self._synced_at = time.monotonic()
+
+            if self._synced_at - self._swept_at > 600:
+                self._expiry = {jti: exp for jti, exp in self._expiry.items() if exp > now}
+                self._swept_at = self._synced_at
+
+
+blacklist_index = BlacklistIndex(sync_interval=getattr(settings, 'TOKEN_BLACKLIST_SYNC_INTERVAL', 5))
+
+
+def prune_expired_tokens(batch_size=1000, max_seconds=10):
+    """
+    Delete expired outstanding tokens (and their blacklist entries) in
+    batches until none are left or `max_seconds` has passed. Returns the
+    number of outstanding tokens deleted. Run by `manage.py prune_tokens`.
+    """
+    deadline = time.monotonic() + max_seconds
+    deleted = 0
+    while time.monotonic() < deadline:
+        ids = list(
+            OutstandingToken.objects.filter(expires_at__lte=aware_utcnow())
+            .values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            break
+        BlacklistedToken.objects.filter(token_id__in=ids).delete()
+        OutstandingToken.objects.filter(id__in=ids).delete()
+        deleted += len(ids)
+    return deleted
+
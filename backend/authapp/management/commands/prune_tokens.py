@@ -0,0 +1,35 @@
+import logging
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from authapp.blacklist import prune_expired_tokens
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Delete expired outstanding and blacklisted JWT refresh tokens in time-bounded batches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--max-seconds', type=int, default=60, help='Stop after this long; rerun to continue.')
+        parser.add_argument('--every', type=int, default=None, metavar='SECONDS',
+                            help='Keep running, pruning every SECONDS.')
+
+    def handle(self, *args, **options):
+        if options['every'] is None:
+            self.prune(options)
+            return
+        while True:
+            try:
+                self.prune(options)
+            except Exception:
+                logger.error("Token prune run failed", exc_info=True)
+            finally:
+                close_old_connections()
+            time.sleep(options['every'])
+
+    def prune(self, options):
+        deleted = prune_expired_tokens(batch_size=options['batch_size'], max_seconds=options['max_seconds'])
+        self.stdout.write(f'Deleted {deleted} expired tokens')
@@ -0,0 +1,26 @@
+from django.db import migrations, models
+
+INDEX = models.Index(fields=['expires_at'], name='outstandingtoken_expires_idx')
+
+
+def add_index(apps, schema_editor):
+    OutstandingToken = apps.get_model('token_blacklist', 'OutstandingToken')
+    schema_editor.add_index(OutstandingToken, INDEX)
+
+
+def remove_index(apps, schema_editor):
+    OutstandingToken = apps.get_model('token_blacklist', 'OutstandingToken')
+    schema_editor.remove_index(OutstandingToken, INDEX)
+
+
+class Migration(migrations.Migration):
+    """Index token_blacklist_outstandingtoken.expires_at so expired tokens can be pruned in batches."""
+
+    dependencies = [
+        ('authapp', '0006_alter_customuser_role'),
+        ('token_blacklist', '0012_alter_outstandingtoken_user'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_index, remove_index),
+    ]
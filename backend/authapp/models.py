@@ -1,7 +1,11 @@
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
+from django.conf import settings
 from django.db import models
+from django.db.models import F
 from django.utils import timezone
-import random
+from django.utils.crypto import salted_hmac
+from datetime import timedelta
+import secrets
 import string
 
 class CustomUserManager(BaseUserManager):
@@ -38,8 +42,6 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
     is_active = models.BooleanField(default=True)
     is_staff = models.BooleanField(default=False)
     date_joined = models.DateTimeField(default=timezone.now)
-    otp = models.CharField(max_length=6, blank=True, null=True)
-    otp_created_at = models.DateTimeField(blank=True, null=True)
     role = models.CharField(max_length=10, choices=ROLE_CHOICES, default='user')
 
     objects = CustomUserManager()
@@ -50,8 +52,57 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
     def __str__(self):
         return f"{self.email} ({self.role})"
 
-    def generate_otp(self):
-        self.otp = ''.join(random.choices(string.digits, k=6))
-        self.otp_created_at = timezone.now()
-        self.save()
-        return self.otp
\ No newline at end of file
+def hash_otp(email, code):
+    return salted_hmac('authapp.PasswordResetOTP', f'{email}:{code}', algorithm='sha256').hexdigest()
+
+class PasswordResetOTPManager(models.Manager):
+    def issue(self, email):
+        """
+        Create (or replace) the OTP for an email and return the plain code.
+        Only its HMAC is stored. Expired codes are cleaned up in small batches.
+        """
+        code = ''.join(secrets.choice(string.digits) for _ in range(6))
+        now = timezone.now()
+        self.update_or_create(
+            email=email,
+            defaults={
+                'code_hash': hash_otp(email, code),
+                'attempts': 0,
+                'expires_at': now + timedelta(minutes=settings.OTP_TTL_MINUTES),
+            },
+        )
+        expired = list(self.filter(expires_at__lte=now).values_list('id', flat=True)[:500])
+        if expired:
+            self.filter(id__in=expired).delete()
+        return code
+
+    def verify_and_consume(self, email, code):
+        """
+        Delete the OTP in one query if the code matches, is unexpired and has
+        attempts left. Returns True on success; a failure counts as an attempt.
+        """
+        deleted, _ = self.filter(
+            email=email,
+            code_hash=hash_otp(email, code),
+            expires_at__gt=timezone.now(),
+            attempts__lt=settings.OTP_MAX_ATTEMPTS,
+        ).delete()
+        if deleted:
+            return True
+        self.filter(email=email).update(attempts=F('attempts') + 1)
+        return False
+
+class PasswordResetOTP(models.Model):
+    """
+    Short-lived password reset code, kept out of the user table.
+    """
+    email = models.EmailField(unique=True)
+    code_hash = models.CharField(max_length=64)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    expires_at = models.DateTimeField(db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = PasswordResetOTPManager()
+
+    def __str__(self):
+        return f"OTP for {self.email}"
\ No newline at end of file
@@ -1,5 +1,10 @@
 from rest_framework.permissions import BasePermission
 
+
+def is_admin(user):
+    return user.is_authenticated and user.role == 'admin'
+
+
 class IsAdmin(BasePermission):
     def has_permission(self, request, view):
-        return request.user.is_authenticated and request.user.role == 'admin'
\ No newline at end of file
+        return is_admin(request.user)
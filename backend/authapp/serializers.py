@@ -1,7 +1,5 @@
 from rest_framework import serializers
-from .models import CustomUser
-from django.utils import timezone
-from datetime import timedelta
+from .models import CustomUser, PasswordResetOTP
 
 class LoginSerializer(serializers.Serializer):
     email = serializers.EmailField()
@@ -20,16 +18,9 @@ class OTPVerificationSerializer(serializers.Serializer):
     otp = serializers.CharField(max_length=6)
 
     def validate(self, data):
-        email = data.get('email')
-        otp = data.get('otp')
-        try:
-            user = CustomUser.objects.get(email=email)
-            if not user.otp or user.otp != otp:
-                raise serializers.ValidationError("Invalid or expired OTP")
-            if user.otp_created_at < timezone.now() - timedelta(minutes=10):
-                raise serializers.ValidationError("OTP has expired")
-        except CustomUser.DoesNotExist:
-            raise serializers.ValidationError("User with this email does not exist")
+        """Verify and consume the OTP in a single query; it cannot be reused."""
+        if not PasswordResetOTP.objects.verify_and_consume(data['email'], data['otp']):
+            raise serializers.ValidationError("Invalid or expired OTP")
         return data
 
 class ResetPasswordSerializer(serializers.Serializer):
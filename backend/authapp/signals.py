@@ -0,0 +1,10 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .authentication import user_state_cache
+from .models import CustomUser
+
+
+@receiver([post_save, post_delete], sender=CustomUser)
+def invalidate_user_state(sender, instance, **kwargs):
+    """Drop the cached state stamp so role/password/active changes apply immediately here."""
+    user_state_cache.invalidate(instance.pk)
@@ -1,3 +1,223 @@
-from django.test import TestCase
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.core import mail
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.utils import aware_utcnow
+
+from .authentication import RoleTokenUser, user_state_cache
+from .blacklist import BlacklistIndex, prune_expired_tokens
+from .models import CustomUser, PasswordResetOTP
+from .tokens import RoleRefreshToken
+
+
+def make_user(email='staff@example.com', password='password', role='user'):
+    return CustomUser.objects.create_user(email, password, role=role)
+
+
+def outstanding(user, jti, expires_in=timedelta(hours=1)):
+    return OutstandingToken.objects.create(user=user, jti=jti, token='token-' + jti,
+                                           expires_at=aware_utcnow() + expires_in)
+
+
+class BlacklistIndexTests(TestCase):
+    def setUp(self):
+        self.user = make_user()
+
+    def test_first_lookup_loads_unexpired_entries(self):
+        BlacklistedToken.objects.create(token=outstanding(self.user, 'live'))
+        BlacklistedToken.objects.create(token=outstanding(self.user, 'expired', expires_in=timedelta(hours=-1)))
+        index = BlacklistIndex(sync_interval=3600)
+        self.assertIn('live', index)
+        self.assertNotIn('expired', index)
+
+    def test_other_processes_blacklists_are_seen_on_the_next_sync(self):
+        index = BlacklistIndex(sync_interval=3600)
+        self.assertNotIn('later', index)
+        BlacklistedToken.objects.create(token=outstanding(self.user, 'later'))
+        self.assertNotIn('later', index)
+        index.sync(force=True)
+        self.assertIn('later', index)
+
+        index.sync_interval = 0
+        BlacklistedToken.objects.create(token=outstanding(self.user, 'latest'))
+        self.assertIn('latest', index)
+
+
+class LogoutTests(TestCase):
+    def setUp(self):
+        self.user = make_user()
+
+    def login(self):
+        response = self.client.post('/api/auth/login/', {'email': self.user.email, 'password': 'password'},
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_logout_revokes_the_refresh_token(self):
+        tokens = self.login()
+        RoleRefreshToken(tokens['refresh'])
+        response = self.client.post('/api/auth/logout/', {'refresh': tokens['refresh']},
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        with self.assertRaises(TokenError):
+            RoleRefreshToken(tokens['refresh'])
+        response = self.client.post('/api/auth/logout/', {'refresh': tokens['refresh']},
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_login_does_not_prune_tokens(self):
+        outstanding(self.user, 'expired', expires_in=timedelta(hours=-1))
+        self.login()
+        self.assertTrue(OutstandingToken.objects.filter(jti='expired').exists())
+
+
+class PruneTokensTests(TestCase):
+    def test_only_expired_tokens_are_deleted(self):
+        user = make_user()
+        BlacklistedToken.objects.create(token=outstanding(user, 'expired', expires_in=timedelta(hours=-1)))
+        outstanding(user, 'live')
+        self.assertEqual(prune_expired_tokens(batch_size=1), 1)
+        self.assertEqual(list(OutstandingToken.objects.values_list('jti', flat=True)), ['live'])
+        self.assertFalse(BlacklistedToken.objects.exists())
+
+
+class CachedJWTAuthenticationTests(TestCase):
+    """Requests to an IsAdmin endpoint authenticated by CachedJWTAuthentication."""
+    url = '/api/contacts/enquiries/filter-stats/'
+
+    def setUp(self):
+        self.user = make_user('admin@example.com', role='admin')
+        user_state_cache._entries.clear()
+        self.addCleanup(user_state_cache._entries.clear)
+
+    def get(self, token):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION='Bearer %s' % token)
+        return client.get(self.url)
+
+    def access_token(self, token_class=RoleRefreshToken):
+        return token_class.for_user(self.user).access_token
+
+    def test_token_user_carries_the_role_without_a_user_query(self):
+        token = self.access_token()
+        self.assertEqual(self.get(token).status_code, 200)
+        with self.assertNumQueries(0):
+            response = self.get(token)
+        self.assertEqual(response.status_code, 200)
+        self.assertIsInstance(response.wsgi_request.user, RoleTokenUser)
+        self.assertEqual(response.wsgi_request.user.role, 'admin')
+
+    def assert_revoked_by(self, change):
+        token = self.access_token()
+        self.assertEqual(self.get(token).status_code, 200)
+        change()
+        self.user.save()
+        self.assertEqual(self.get(token).status_code, 401)
+
+    def test_deactivation_revokes_tokens(self):
+        self.assert_revoked_by(lambda: setattr(self.user, 'is_active', False))
+        # Including tokens issued after the change.
+        self.assertEqual(self.get(self.access_token()).status_code, 401)
+
+    def test_password_change_revokes_tokens(self):
+        self.assert_revoked_by(lambda: self.user.set_password('new password'))
+        self.assertEqual(self.get(self.access_token()).status_code, 200)
+
+    def test_role_change_revokes_tokens(self):
+        self.assert_revoked_by(lambda: setattr(self.user, 'role', 'user'))
+        self.assertEqual(self.get(self.access_token()).status_code, 403)
+
+    def test_deleted_user_is_rejected(self):
+        token = self.access_token()
+        self.user.delete()
+        self.assertEqual(self.get(token).status_code, 401)
+
+    def test_token_without_state_claim_falls_back_to_the_database(self):
+        token = self.access_token(RefreshToken)
+        self.assertNotIn('state', token)
+        response = self.get(token)
+        # The role is read from the user row, not the token.
+        self.assertEqual(response.status_code, 200)
+        self.assertIsInstance(response.wsgi_request.user, CustomUser)
+        CustomUser.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.assertEqual(self.get(token).status_code, 401)
+
+    def test_ttl_bounds_how_long_another_process_trusts_a_stale_stamp(self):
+        token = self.access_token()
+        now = 1000.0
+        with mock.patch('authapp.authentication.time.monotonic', side_effect=lambda: now):
+            self.assertEqual(self.get(token).status_code, 200)
+            # A change made by another process sends no signal here.
+            CustomUser.objects.filter(pk=self.user.pk).update(is_active=False)
+            now += user_state_cache.ttl - 1
+            self.assertEqual(self.get(token).status_code, 200)
+            now += 2
+            self.assertEqual(self.get(token).status_code, 401)
+
+
+@override_settings(OTP_MAX_ATTEMPTS=3, EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend')
+class PasswordResetOTPTests(TestCase):
+    email = 'staff@example.com'
+
+    def setUp(self):
+        self.code = PasswordResetOTP.objects.issue(self.email)
+
+    def verify(self, code):
+        return PasswordResetOTP.objects.verify_and_consume(self.email, code)
+
+    def wrong(self):
+        return '%06d' % ((int(self.code) + 1) % 1000000)
+
+    def test_only_a_hash_of_the_code_is_stored(self):
+        otp = PasswordResetOTP.objects.get(email=self.email)
+        self.assertEqual(len(self.code), 6)
+        self.assertNotIn(self.code, otp.code_hash)
+
+    def test_code_is_single_use(self):
+        self.assertTrue(self.verify(self.code))
+        self.assertFalse(self.verify(self.code))
+        self.assertFalse(PasswordResetOTP.objects.filter(email=self.email).exists())
+
+    def test_wrong_code_counts_an_attempt(self):
+        self.assertFalse(self.verify(self.wrong()))
+        self.assertEqual(PasswordResetOTP.objects.get(email=self.email).attempts, 1)
+        self.assertTrue(self.verify(self.code))
+
+    def test_locked_out_after_the_attempt_limit(self):
+        for _ in range(3):
+            self.assertFalse(self.verify(self.wrong()))
+        self.assertFalse(self.verify(self.code))
+
+    def test_expired_code_is_rejected(self):
+        PasswordResetOTP.objects.filter(email=self.email).update(expires_at=aware_utcnow() - timedelta(seconds=1))
+        self.assertFalse(self.verify(self.code))
+
+    def test_new_code_replaces_the_old_one_and_cleans_up_expired_codes(self):
+        PasswordResetOTP.objects.issue('other@example.com')
+        PasswordResetOTP.objects.filter(email='other@example.com').update(
+            expires_at=aware_utcnow() - timedelta(seconds=1))
+        self.verify(self.wrong())
+        new_code = PasswordResetOTP.objects.issue(self.email)
+        otp = PasswordResetOTP.objects.get(email=self.email)
+        self.assertEqual(otp.attempts, 0)
+        self.assertFalse(PasswordResetOTP.objects.filter(email='other@example.com').exists())
+        if new_code != self.code:
+            self.assertFalse(self.verify(self.code))
+        self.assertTrue(self.verify(new_code))
+
+    def test_forgot_password_and_verification_endpoints(self):
+        make_user(self.email)
+        response = self.client.post('/api/auth/forgot-password/', {'email': self.email},
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        code = mail.outbox[0].body.split('Your OTP is ')[1][:6]
+        data = {'email': self.email, 'otp': code}
+        response = self.client.post('/api/auth/otp-verification/', data, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        response = self.client.post('/api/auth/otp-verification/', data, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
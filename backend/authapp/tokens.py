@@ -0,0 +1,44 @@
+import hashlib
+
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.utils import datetime_from_epoch
+from .blacklist import blacklist_index
+
+
+def user_state_stamp(role, is_active, password):
+    """
+    Short digest of the user fields that authorization depends on.
+
+    Changing the role, the active flag or the password changes the stamp,
+    which invalidates every token issued before the change.
+    """
+    return hashlib.sha256(f'{role}:{is_active}:{password}'.encode()).hexdigest()[:16]
+
+
+class RoleRefreshToken(RefreshToken):
+    """
+    Refresh token carrying the user's role and state stamp as claims.
+
+    Access tokens derived from it copy the claims, so role checks can be
+    made from the token alone. Blacklist checks go through the in-memory
+    blacklist index instead of querying the blacklist table.
+    """
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        token['role'] = user.role
+        token['state'] = user_state_stamp(user.role, user.is_active, user.password)
+        return token
+
+    def check_blacklist(self):
+        if self.payload[api_settings.JTI_CLAIM] in blacklist_index:
+            raise TokenError(_('Token is blacklisted'))
+
+    def blacklist(self):
+        result = super().blacklist()
+        blacklist_index.add(self.payload[api_settings.JTI_CLAIM], datetime_from_epoch(self.payload['exp']))
+        return result
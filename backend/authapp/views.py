@@ -2,10 +2,10 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import AllowAny, IsAuthenticated
-from rest_framework_simplejwt.tokens import RefreshToken
 from django.core.mail import send_mail
 from django.conf import settings
-from .models import CustomUser
+from .models import CustomUser, PasswordResetOTP
+from .tokens import RoleRefreshToken
 from .serializers import LoginSerializer, ForgotPasswordSerializer, OTPVerificationSerializer, ResetPasswordSerializer
 
 class LoginView(APIView):
@@ -18,7 +18,7 @@ class LoginView(APIView):
             password = serializer.validated_data['password']
             user = CustomUser.objects.filter(email=email).first()
             if user and user.check_password(password):
-                refresh = RefreshToken.for_user(user)
+                refresh = RoleRefreshToken.for_user(user)
                 return Response({
                     'access': str(refresh.access_token),
                     'refresh': str(refresh),
@@ -35,7 +35,7 @@ class LogoutView(APIView):
             refresh_token = request.data.get('refresh')
             if not refresh_token:
                 return Response({'error': 'Refresh token is required'}, status=status.HTTP_400_BAD_REQUEST)
-            token = RefreshToken(refresh_token)
+            token = RoleRefreshToken(refresh_token)
             token.blacklist()
             return Response({'message': 'Successfully logged out'}, status=status.HTTP_200_OK)
         except Exception as e:
@@ -48,11 +48,10 @@ class ForgotPasswordView(APIView):
         serializer = ForgotPasswordSerializer(data=request.data)
         if serializer.is_valid():
             email = serializer.validated_data['email']
-            user = CustomUser.objects.get(email=email)
-            otp = user.generate_otp()
+            otp = PasswordResetOTP.objects.issue(email)
             send_mail(
                 'Your OTP for Password Reset',
-                f'Your OTP is {otp}. It is valid for 10 minutes.',
+                f'Your OTP is {otp}. It is valid for {settings.OTP_TTL_MINUTES} minutes.',
                 settings.DEFAULT_FROM_EMAIL,
                 [email],
                 fail_silently=False,
@@ -66,11 +65,6 @@ class OTPVerificationView(APIView):
     def post(self, request):
         serializer = OTPVerificationSerializer(data=request.data)
         if serializer.is_valid():
-            email = serializer.validated_data['email']
-            user = CustomUser.objects.get(email=email)
-            user.otp = None
-            user.otp_created_at = None
-            user.save()
             return Response({'message': 'OTP verified successfully'}, status=status.HTTP_200_OK)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -84,6 +78,6 @@ class ResetPasswordView(APIView):
             new_password = serializer.validated_data['new_password']
             user = CustomUser.objects.get(email=email)
             user.set_password(new_password)
-            user.save()
+            user.save(update_fields=['password'])
             return Response({'message': 'Password reset successfully'}, status=status.HTTP_200_OK)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
\ No newline at end of file
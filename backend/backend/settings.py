@@ -36,6 +36,11 @@ ALLOWED_HOSTS = os.getenv('ALLOWED_HOSTS', '*').split(',')
 
 # Application definition
 
+# Optional components. API-only production containers can turn off the
+# Django admin and the Swagger/ReDoc docs to keep worker startup and memory down.
+ADMIN_ENABLED = os.getenv('ADMIN_ENABLED', 'True') == 'True'
+API_DOCS_ENABLED = os.getenv('API_DOCS_ENABLED', 'True') == 'True'
+
 INSTALLED_APPS = [
     'django.contrib.admin',
     'django.contrib.auth',
@@ -51,11 +56,22 @@ INSTALLED_APPS = [
     'add_customers',
     'add_jobs',
     'contact',
-    'documentation'
+    'documentation',
+    'core',
 ]
+if not ADMIN_ENABLED:
+    INSTALLED_APPS.remove('django.contrib.admin')
+if not API_DOCS_ENABLED:
+    INSTALLED_APPS.remove('drf_yasg')
+    INSTALLED_APPS.remove('documentation')
 
 MIDDLEWARE = [
+    'core.logs.RequestIDMiddleware',
+    'core.profiler.RequestProfilerMiddleware',
+    'core.tracing.TracingMiddleware',
+    'core.db_router.ReplicaPinningMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'core.compression.CompressionMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware', 
     'django.contrib.sessions.middleware.SessionMiddleware',
     "corsheaders.middleware.CorsMiddleware",
@@ -110,6 +126,36 @@ DATABASES = {
     }
 }
 
+# Read replicas
+# DB_REPLICA_HOSTS is a comma-separated list of host[:port] entries sharing
+# the primary's credentials. core.db_router sends safe reads (list and
+# tracking endpoints) to them and falls back to the primary when a replica
+# lags by more than REPLICA_MAX_LAG_SECONDS or is unreachable. A client
+# that wrote is pinned to the primary for REPLICA_PIN_SECONDS.
+DATABASE_REPLICAS = []
+for index, replica in enumerate(filter(None, os.getenv('DB_REPLICA_HOSTS', '').split(',')), start=1):
+    host, _, port = replica.strip().partition(':')
+    alias = f'replica{index}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'HOST': host,
+        'PORT': port or DATABASES['default']['PORT'],
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(alias)
+# Without replica hosts, 'replica_local' points at the primary itself so the
+# routing can be exercised locally and in tests; DB_REPLICA_LOCAL=True sends
+# the safe reads to it.
+if not DATABASE_REPLICAS:
+    DATABASES['replica_local'] = {**DATABASES['default'], 'TEST': {'MIRROR': 'default'}}
+    if os.getenv('DB_REPLICA_LOCAL') == 'True':
+        DATABASE_REPLICAS.append('replica_local')
+
+DATABASE_ROUTERS = ['core.db_router.ReplicaRouter']
+REPLICA_MAX_LAG_SECONDS = int(os.getenv('REPLICA_MAX_LAG_SECONDS', '5'))
+REPLICA_LAG_CHECK_INTERVAL = int(os.getenv('REPLICA_LAG_CHECK_INTERVAL', '5'))
+REPLICA_PIN_SECONDS = int(os.getenv('REPLICA_PIN_SECONDS', '10'))
+
 # DATABASES = {
 #     'default': {
 #         'ENGINE': 'django.db.backends.mysql',
@@ -121,6 +167,32 @@ DATABASES = {
 #     }
 # }
 
+# Cache
+# Shared Redis cache when REDIS_URL is set, otherwise a per-process local
+# memory stand-in (development and tests). core.cache puts a small in-process
+# LRU in front of it, with tag-based invalidation.
+REDIS_URL = os.getenv('REDIS_URL')
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+            'KEY_PREFIX': 'alameinmovers',
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'alameinmovers',
+        }
+    }
+
+CACHE_DEFAULT_TIMEOUT = int(os.getenv('CACHE_DEFAULT_TIMEOUT', '300'))
+CACHE_LOCAL_SIZE = int(os.getenv('CACHE_LOCAL_SIZE', '1000'))
+CACHE_LOCAL_TTL = int(os.getenv('CACHE_LOCAL_TTL', '2'))
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -158,7 +230,19 @@ USE_TZ = True
 # Static files
 STATIC_URL = '/static/'
 STATIC_ROOT = BASE_DIR / 'static'
-STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
+
+# Job attachments are stored here (the media_data volume in
+# docker-compose.yaml). They are private and served only through the API.
+MEDIA_URL = '/media/'
+MEDIA_ROOT = os.getenv('MEDIA_ROOT', str(BASE_DIR / 'media'))
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage',
+    },
+}
 
 
 # Default primary key field type
@@ -188,25 +272,154 @@ CORS_ALLOW_HEADERS = (
     "user-agent",
     "x-csrftoken",
     "x-requested-with",
+    "prefer",
+    "x-request-id",
+    "idempotency-key",
+    "if-none-match",
+    "x-profile-token",
+    "traceparent",
+    "tracestate",
+    "upload-offset",
+    "range",
+    "if-range",
+)
+
+CORS_EXPOSE_HEADERS = (
+    "preference-applied",
+    "x-request-id",
+    "idempotent-replayed",
+    "retry-after",
+    "etag",
+    "x-profile-summary",
+    "upload-offset",
+    "location",
+    "content-range",
+    "accept-ranges",
+    "content-disposition",
 )
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'authapp.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
+    'DEFAULT_RENDERER_CLASSES': (
+        'core.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'core.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
 }
 
+# API response compression (static files are compressed by WhiteNoise)
+COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', '1024'))
+COMPRESSION_ENCODINGS = ('br', 'zstd', 'gzip')
+COMPRESSION_CACHE_SIZE = int(os.getenv('COMPRESSION_CACHE_SIZE', '128'))
+
+# JSON backend for API rendering/parsing: 'orjson' (falls back to stdlib if not installed) or 'json'
+JSON_BACKEND = os.getenv('JSON_BACKEND', 'orjson')
+
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=60),
     'REFRESH_TOKEN_LIFETIME': timedelta(hours=12),
     'ROTATE_REFRESH_TOKENS': True,
     'BLACKLIST_AFTER_ROTATION': True,
     'AUTH_HEADER_TYPES': ('Bearer',),
+    'TOKEN_USER_CLASS': 'authapp.authentication.RoleTokenUser',
 }
 
+# Seconds a worker trusts its cached user state before re-reading it, i.e.
+# the longest a role/password/active change can take to revoke tokens.
+USER_STATE_CACHE_TTL = int(os.getenv('USER_STATE_CACHE_TTL', '60'))
+
+# Most tracking IDs accepted by one batch tracking request.
+TRACKING_BATCH_MAX_IDS = int(os.getenv('TRACKING_BATCH_MAX_IDS', '50'))
+
+# Admin enquiry notifications: 'immediate', 'digest' or 'auto' (immediate
+# until more than ENQUIRY_DIGEST_THRESHOLD enquiries arrive within
+# ENQUIRY_DIGEST_WINDOW seconds, then one digest per window).
+ENQUIRY_NOTIFY_MODE = os.getenv('ENQUIRY_NOTIFY_MODE', 'auto')
+ENQUIRY_DIGEST_THRESHOLD = int(os.getenv('ENQUIRY_DIGEST_THRESHOLD', '20'))
+ENQUIRY_DIGEST_WINDOW = int(os.getenv('ENQUIRY_DIGEST_WINDOW', '600'))
+
+# Enquiries older than this are moved to the archive table by
+# `manage.py archive_enquiries` (run it from cron).
+ENQUIRY_ARCHIVE_AFTER_DAYS = int(os.getenv('ENQUIRY_ARCHIVE_AFTER_DAYS', '180'))
+
+# Identical enquiries resubmitted within this many seconds return the
+# original instead of being processed again; messages with more links than
+# ENQUIRY_SPAM_MAX_LINKS are rejected as spam.
+ENQUIRY_DUPLICATE_WINDOW = int(os.getenv('ENQUIRY_DUPLICATE_WINDOW', '600'))
+ENQUIRY_SPAM_MAX_LINKS = int(os.getenv('ENQUIRY_SPAM_MAX_LINKS', '2'))
+
+# POSTs sent with an Idempotency-Key header are replayed to retries for
+# IDEMPOTENCY_KEY_TTL seconds (`manage.py purge_idempotency_keys` removes
+# expired records). A retry waits up to IDEMPOTENCY_WAIT_SECONDS for an
+# in-flight original; a claim not completed within IDEMPOTENCY_LOCK_SECONDS
+# is treated as abandoned.
+IDEMPOTENCY_KEY_TTL = int(os.getenv('IDEMPOTENCY_KEY_TTL', '86400'))
+IDEMPOTENCY_WAIT_SECONDS = int(os.getenv('IDEMPOTENCY_WAIT_SECONDS', '5'))
+IDEMPOTENCY_LOCK_SECONDS = int(os.getenv('IDEMPOTENCY_LOCK_SECONDS', '60'))
+
+# Admins can profile single requests with a token from
+# api/core/profile-token/ (see core.profiler); profiles are written to
+# PROFILE_DIR. Off by default; without PROFILING_ENABLED=True the middleware
+# is not installed.
+PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', 'False') == 'True'
+PROFILE_TOKEN_MAX_AGE = int(os.getenv('PROFILE_TOKEN_MAX_AGE', '900'))
+PROFILE_SAMPLE_INTERVAL_MS = int(os.getenv('PROFILE_SAMPLE_INTERVAL_MS', '5'))
+PROFILE_DIR = os.getenv('PROFILE_DIR', str(LOGS_DIR / 'profiles'))
+
+# Span tracing of requests, queries, outbound HTTP and email (see
+# core.tracing). Requests without a sampled W3C traceparent are sampled at
+# TRACE_SAMPLE_RATE; spans go to TRACING_FILE as JSON lines, or to an
+# OpenTelemetry collector with
+# TRACING_EXPORTER=core.tracing.OTLPHTTPExporter and TRACING_OTLP_ENDPOINT.
+TRACING_ENABLED = os.getenv('TRACING_ENABLED', 'False') == 'True'
+TRACE_SAMPLE_RATE = float(os.getenv('TRACE_SAMPLE_RATE', '0.1'))
+TRACING_EXPORTER = os.getenv('TRACING_EXPORTER', 'core.tracing.JSONFileExporter')
+TRACING_FILE = os.getenv('TRACING_FILE', str(LOGS_DIR / 'traces.jsonl'))
+TRACING_OTLP_ENDPOINT = os.getenv('TRACING_OTLP_ENDPOINT', 'http://localhost:4318/v1/traces')
+TRACING_SERVICE_NAME = os.getenv('TRACING_SERVICE_NAME', 'almas-backend')
+
+# Job attachments (see add_jobs.attachments): largest file, largest upload
+# chunk, total bytes per job, and how long an idle upload can be resumed.
+JOB_ATTACHMENT_MAX_BYTES = int(os.getenv('JOB_ATTACHMENT_MAX_BYTES', str(500 * 1024 * 1024)))
+JOB_ATTACHMENT_CHUNK_BYTES = int(os.getenv('JOB_ATTACHMENT_CHUNK_BYTES', str(16 * 1024 * 1024)))
+JOB_ATTACHMENT_QUOTA_BYTES = int(os.getenv('JOB_ATTACHMENT_QUOTA_BYTES', str(2 * 1024 * 1024 * 1024)))
+JOB_ATTACHMENT_UPLOAD_TTL = int(os.getenv('JOB_ATTACHMENT_UPLOAD_TTL', '86400'))
+JOB_ATTACHMENT_PREVIEW_SIZE = int(os.getenv('JOB_ATTACHMENT_PREVIEW_SIZE', '480'))
+# '' serves downloads from Django (sendfile() via Gunicorn for whole files);
+# 'x-accel-redirect' (nginx, internal location at JOB_ATTACHMENT_ACCEL_PREFIX
+# aliased to MEDIA_ROOT) or 'x-sendfile' hands them to the web server.
+JOB_ATTACHMENT_SENDFILE = os.getenv('JOB_ATTACHMENT_SENDFILE', '')
+JOB_ATTACHMENT_ACCEL_PREFIX = os.getenv('JOB_ATTACHMENT_ACCEL_PREFIX', '/protected-media/')
+
+# Shipping labels and waybills (see add_jobs.documents): render processes,
+# jobs per batch PDF, and jobs read and rendered per streamed chunk.
+DOCUMENT_RENDER_WORKERS = int(os.getenv('DOCUMENT_RENDER_WORKERS', '2'))
+DOCUMENT_BATCH_MAX_JOBS = int(os.getenv('DOCUMENT_BATCH_MAX_JOBS', '2000'))
+DOCUMENT_BATCH_CHUNK = int(os.getenv('DOCUMENT_BATCH_CHUNK', '50'))
+
+# Rate-card quotes (see add_jobs.pricing): how long a single quote stays
+# cached (rate changes invalidate it sooner), and the most shipments or jobs
+# priced per API request.
+RATE_QUOTE_CACHE_TIMEOUT = int(os.getenv('RATE_QUOTE_CACHE_TIMEOUT', '3600'))
+RATE_BATCH_MAX_ITEMS = int(os.getenv('RATE_BATCH_MAX_ITEMS', '5000'))
+
+# Password reset OTPs
+OTP_TTL_MINUTES = int(os.getenv('OTP_TTL_MINUTES', '10'))
+OTP_MAX_ATTEMPTS = int(os.getenv('OTP_MAX_ATTEMPTS', '5'))
+
+# Seconds between syncs of the in-memory refresh-token blacklist. Expired
+# tokens are deleted by `manage.py prune_tokens` (the token-prune service).
+TOKEN_BLACKLIST_SYNC_INTERVAL = int(os.getenv('TOKEN_BLACKLIST_SYNC_INTERVAL', '5'))
+
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
 EMAIL_HOST = 'smtp.gmail.com'
 EMAIL_PORT = 587
@@ -231,33 +444,36 @@ AUTH_USER_MODEL = 'authapp.CustomUser'
 # X_FRAME_OPTIONS = 'DENY'
 
 # Logging configuration
+# Request threads only enqueue records; a listener thread per process formats
+# them and writes a size-rotated JSON log file, logs/django.<pid>.log, plus a
+# text console stream.
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
-    'formatters': {
-        'verbose': {
-            'format': '{levelname} {asctime} {module} {message}',
-            'style': '{',
+    'filters': {
+        'request_id': {
+            '()': 'core.logs.RequestIDFilter',
+        },
+        'sampling': {
+            '()': 'core.logs.SamplingFilter',
+            'rate': float(os.getenv('LOG_INFO_SAMPLE_RATE', '1.0')),
         },
     },
     'handlers': {
-        'file': {
+        'queue': {
             'level': 'INFO',
-            'class': 'logging.FileHandler',
+            'class': 'core.logs.QueueLogHandler',
+            'filters': ['request_id', 'sampling'],
             'filename': BASE_DIR / 'logs' / 'django.log',
-            'formatter': 'verbose',
-        },
-        'console': {
-            'level': 'DEBUG',
-            'class': 'logging.StreamHandler',
-            'formatter': 'verbose',
+            'max_bytes': int(os.getenv('LOG_MAX_BYTES', str(10 * 1024 * 1024))),
+            'backup_count': int(os.getenv('LOG_BACKUP_COUNT', '5')),
         },
     },
     'loggers': {
         '': {
-            'handlers': ['file', 'console'],
+            'handlers': ['queue'],
             'level': 'INFO',
             'propagate': True,
         },
     },
-}
\ No newline at end of file
+}
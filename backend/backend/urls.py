@@ -14,14 +14,21 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
-from django.contrib import admin
+from django.conf import settings
 from django.urls import path, include
 
 urlpatterns = [
-    path('admin/', admin.site.urls),
     path('api/auth/', include('authapp.urls')),
-    path('documentation/', include('documentation.urls')),
     path('api/customers/', include('add_customers.urls')),
     path('api/jobs/', include('add_jobs.urls')),
     path('api/contacts/', include('contact.urls')),
+    path('api/core/', include('core.urls')),
 ]
+
+if settings.ADMIN_ENABLED:
+    from django.contrib import admin
+
+    urlpatterns.append(path('admin/', admin.site.urls))
+
+if settings.API_DOCS_ENABLED:
+    urlpatterns.append(path('documentation/', include('documentation.urls')))
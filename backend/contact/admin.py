@@ -1,3 +1,31 @@
 from django.contrib import admin
+from core.admin_tools import LargeTableAdmin
+from .models import ArchivedEnquiry, Enquiry
 
-# Register your models here.
+ENQUIRY_EXPORT_FIELDS = ('id', 'fullName', 'phoneNumber', 'email', 'serviceType', 'message',
+                         'refererUrl__url', 'submittedUrl__url', 'created_at')
+
+@admin.register(Enquiry)
+class EnquiryAdmin(LargeTableAdmin):
+    list_display = ('fullName', 'email', 'phoneNumber', 'serviceType', 'submittedUrl', 'created_at')
+    list_select_related = ('submittedUrl',)
+    list_filter = ('serviceType', 'created_at')
+    search_fields = ('=email', '^fullName', '=phoneNumber')
+    raw_id_fields = ('refererUrl', 'submittedUrl')
+    readonly_fields = ('created_at',)
+    ordering = ('-created_at',)
+    export_fields = ENQUIRY_EXPORT_FIELDS
+
+@admin.register(ArchivedEnquiry)
+class ArchivedEnquiryAdmin(LargeTableAdmin):
+    list_display = ('fullName', 'email', 'phoneNumber', 'serviceType', 'created_at', 'archived_at')
+    list_filter = ('serviceType', 'created_at')
+    search_fields = ('=email', '^fullName', '=phoneNumber')
+    ordering = ('-created_at',)
+    export_fields = ENQUIRY_EXPORT_FIELDS
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
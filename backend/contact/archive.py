@@ -0,0 +1,50 @@
+"""
+Hot/cold split for enquiries.
+
+`archive_enquiries` moves enquiries older than ENQUIRY_ARCHIVE_AFTER_DAYS
+from the live table into ArchivedEnquiry in batches, oldest first, so the
+live table (and its icontains search) only covers recent history. The
+admin API reads archived rows on request via `?include_archived=true`.
+"""
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from core.cache import cache, model_tag
+from .models import ArchivedEnquiry, Enquiry
+
+ARCHIVED_FIELDS = [field.attname for field in ArchivedEnquiry._meta.concrete_fields if field.name != 'archived_at']
+
+
+def archive_enquiries(older_than_days=None, batch_size=500, max_seconds=60):
+    """
+    Move enquiries created before the cutoff into the archive until none
+    are left or `max_seconds` has passed. Returns the number moved.
+    """
+    if older_than_days is None:
+        older_than_days = settings.ENQUIRY_ARCHIVE_AFTER_DAYS
+    cutoff = timezone.now() - timedelta(days=older_than_days)
+    deadline = time.monotonic() + max_seconds
+    moved = 0
+    while time.monotonic() < deadline:
+        with transaction.atomic():
+            rows = list(
+                Enquiry.objects.filter(created_at__lt=cutoff)
+                .order_by('created_at', 'id')
+                .values(*ARCHIVED_FIELDS)[:batch_size]
+            )
+            if not rows:
+                break
+            # ignore_conflicts makes a batch safe to replay if a previous
+            # run copied it but failed before deleting.
+            ArchivedEnquiry.objects.bulk_create(
+                [ArchivedEnquiry(**row) for row in rows], ignore_conflicts=True,
+            )
+            Enquiry.objects.filter(id__in=[row['id'] for row in rows]).delete()
+        # bulk_create sends no post_save signals to bump the archive's tag.
+        cache.invalidate_tags(model_tag(ArchivedEnquiry))
+        moved += len(rows)
+    return moved
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from contact.archive import archive_enquiries
+
+
+class Command(BaseCommand):
+    help = 'Move enquiries older than ENQUIRY_ARCHIVE_AFTER_DAYS into the archive table in batches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than-days', type=int, default=None)
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--max-seconds', type=int, default=60, help='Stop after this long; rerun to continue.')
+
+    def handle(self, *args, **options):
+        moved = archive_enquiries(
+            older_than_days=options['older_than_days'],
+            batch_size=options['batch_size'],
+            max_seconds=options['max_seconds'],
+        )
+        self.stdout.write(f'Archived {moved} enquiries')
@@ -0,0 +1,35 @@
+import logging
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from contact.notifications import send_enquiry_digest, send_overdue_enquiry_digest
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Send the admin digest email for any queued enquiries.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--overdue', action='store_true',
+                            help='Only send once the oldest entry has waited ENQUIRY_DIGEST_WINDOW seconds.')
+        parser.add_argument('--every', type=int, default=None, metavar='SECONDS',
+                            help='Keep running, checking the queue every SECONDS.')
+
+    def handle(self, *args, **options):
+        send = send_overdue_enquiry_digest if options['overdue'] else send_enquiry_digest
+        if options['every'] is None:
+            sent = send()
+            self.stdout.write(f'Sent a digest of {sent} enquiries')
+            return
+        while True:
+            try:
+                sent = send()
+                if sent:
+                    self.stdout.write(f'Sent a digest of {sent} enquiries')
+            except Exception:
+                logger.error("Enquiry digest run failed", exc_info=True)
+            finally:
+                close_old_connections()
+            time.sleep(options['every'])
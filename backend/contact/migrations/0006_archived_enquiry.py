@@ -0,0 +1,32 @@
+# Generated by Django 5.2.1 on 2026-10-19 01:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contact', '0005_enquiry_contact_enq_created_b6ecb0_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedEnquiry',
+            fields=[
+                ('fullName', models.CharField(max_length=100)),
+                ('phoneNumber', models.CharField(max_length=20)),
+                ('email', models.EmailField(max_length=254)),
+                ('serviceType', models.CharField(max_length=50)),
+                ('message', models.TextField()),
+                ('recaptchaToken', models.TextField()),
+                ('refererUrl', models.URLField()),
+                ('submittedUrl', models.URLField()),
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['created_at'], name='contact_arc_created_9e50dc_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,92 @@
+# Generated by Django 5.2.1 on 2026-10-19 02:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contact', '0006_archived_enquiry'),
+    ]
+
+    # The verbose columns are made nullable first so 0009 can be reversed.
+    operations = [
+        migrations.AlterField(
+            model_name='enquiry',
+            name='serviceType',
+            field=models.CharField(max_length=50, null=True),
+        ),
+        migrations.AlterField(
+            model_name='enquiry',
+            name='recaptchaToken',
+            field=models.TextField(null=True),
+        ),
+        migrations.AlterField(
+            model_name='enquiry',
+            name='refererUrl',
+            field=models.URLField(null=True),
+        ),
+        migrations.AlterField(
+            model_name='enquiry',
+            name='submittedUrl',
+            field=models.URLField(null=True),
+        ),
+        migrations.AlterField(
+            model_name='archivedenquiry',
+            name='serviceType',
+            field=models.CharField(max_length=50, null=True),
+        ),
+        migrations.AlterField(
+            model_name='archivedenquiry',
+            name='recaptchaToken',
+            field=models.TextField(null=True),
+        ),
+        migrations.AlterField(
+            model_name='archivedenquiry',
+            name='refererUrl',
+            field=models.URLField(null=True),
+        ),
+        migrations.AlterField(
+            model_name='archivedenquiry',
+            name='submittedUrl',
+            field=models.URLField(null=True),
+        ),
+        migrations.CreateModel(
+            name='SiteURL',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('url', models.URLField(unique=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='enquiry',
+            name='service_code',
+            field=models.PositiveSmallIntegerField(null=True),
+        ),
+        migrations.AddField(
+            model_name='enquiry',
+            name='referer_site_url',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='contact.siteurl'),
+        ),
+        migrations.AddField(
+            model_name='enquiry',
+            name='submitted_site_url',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='contact.siteurl'),
+        ),
+        migrations.AddField(
+            model_name='archivedenquiry',
+            name='service_code',
+            field=models.PositiveSmallIntegerField(null=True),
+        ),
+        migrations.AddField(
+            model_name='archivedenquiry',
+            name='referer_site_url',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='contact.siteurl'),
+        ),
+        migrations.AddField(
+            model_name='archivedenquiry',
+            name='submitted_site_url',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='contact.siteurl'),
+        ),
+    ]
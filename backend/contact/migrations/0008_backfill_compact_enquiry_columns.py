@@ -0,0 +1,75 @@
+from django.db import migrations
+
+BATCH_SIZE = 1000
+
+SERVICE_CODES = {
+    'localMove': 1,
+    'internationalMove': 2,
+    'carExport': 3,
+    'storageServices': 4,
+    'logistics': 5,
+}
+OTHER = 99
+
+
+def batches(model, **filters):
+    """Yield lists of rows in primary key order, BATCH_SIZE at a time."""
+    last_pk = None
+    while True:
+        queryset = model.objects.filter(**filters).order_by('pk')
+        if last_pk is not None:
+            queryset = queryset.filter(pk__gt=last_pk)
+        rows = list(queryset[:BATCH_SIZE])
+        if not rows:
+            return
+        yield rows
+        last_pk = rows[-1].pk
+
+
+def backfill(apps, schema_editor):
+    SiteURL = apps.get_model('contact', 'SiteURL')
+    url_ids = dict(SiteURL.objects.values_list('url', 'id'))
+
+    def url_id(url):
+        if url not in url_ids:
+            url_ids[url] = SiteURL.objects.get_or_create(url=url)[0].pk
+        return url_ids[url]
+
+    for model_name in ('Enquiry', 'ArchivedEnquiry'):
+        model = apps.get_model('contact', model_name)
+        for rows in batches(model, service_code__isnull=True):
+            for row in rows:
+                row.service_code = SERVICE_CODES.get(row.serviceType, OTHER)
+                row.referer_site_url_id = url_id(row.refererUrl)
+                row.submitted_site_url_id = url_id(row.submittedUrl)
+            model.objects.bulk_update(rows, ['service_code', 'referer_site_url', 'submitted_site_url'])
+
+
+def restore(apps, schema_editor):
+    SiteURL = apps.get_model('contact', 'SiteURL')
+    urls = dict(SiteURL.objects.values_list('id', 'url'))
+    labels = {code: label for label, code in SERVICE_CODES.items()}
+
+    for model_name in ('Enquiry', 'ArchivedEnquiry'):
+        model = apps.get_model('contact', model_name)
+        for rows in batches(model):
+            for row in rows:
+                row.serviceType = labels.get(row.service_code, 'other')
+                row.refererUrl = urls.get(row.referer_site_url_id, '')
+                row.submittedUrl = urls.get(row.submitted_site_url_id, '')
+                row.recaptchaToken = ''
+            model.objects.bulk_update(rows, ['serviceType', 'refererUrl', 'submittedUrl', 'recaptchaToken'])
+
+
+class Migration(migrations.Migration):
+    # Commit each batch separately so a large table is not rewritten in one
+    # transaction; rerunning picks up where an interrupted run stopped.
+    atomic = False
+
+    dependencies = [
+        ('contact', '0007_compact_enquiry_columns'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, restore),
+    ]
@@ -0,0 +1,106 @@
+# Generated by Django 5.2.1 on 2026-10-19 02:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contact', '0008_backfill_compact_enquiry_columns'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='enquiry',
+            name='serviceType',
+        ),
+        migrations.RemoveField(
+            model_name='enquiry',
+            name='refererUrl',
+        ),
+        migrations.RemoveField(
+            model_name='enquiry',
+            name='submittedUrl',
+        ),
+        migrations.RemoveField(
+            model_name='enquiry',
+            name='recaptchaToken',
+        ),
+        migrations.RemoveField(
+            model_name='archivedenquiry',
+            name='serviceType',
+        ),
+        migrations.RemoveField(
+            model_name='archivedenquiry',
+            name='refererUrl',
+        ),
+        migrations.RemoveField(
+            model_name='archivedenquiry',
+            name='submittedUrl',
+        ),
+        migrations.RemoveField(
+            model_name='archivedenquiry',
+            name='recaptchaToken',
+        ),
+        migrations.RenameField(
+            model_name='enquiry',
+            old_name='service_code',
+            new_name='serviceType',
+        ),
+        migrations.RenameField(
+            model_name='enquiry',
+            old_name='referer_site_url',
+            new_name='refererUrl',
+        ),
+        migrations.RenameField(
+            model_name='enquiry',
+            old_name='submitted_site_url',
+            new_name='submittedUrl',
+        ),
+        migrations.RenameField(
+            model_name='archivedenquiry',
+            old_name='service_code',
+            new_name='serviceType',
+        ),
+        migrations.RenameField(
+            model_name='archivedenquiry',
+            old_name='referer_site_url',
+            new_name='refererUrl',
+        ),
+        migrations.RenameField(
+            model_name='archivedenquiry',
+            old_name='submitted_site_url',
+            new_name='submittedUrl',
+        ),
+        migrations.AlterField(
+            model_name='enquiry',
+            name='serviceType',
+            field=models.PositiveSmallIntegerField(choices=[(1, 'localMove'), (2, 'internationalMove'), (3, 'carExport'), (4, 'storageServices'), (5, 'logistics'), (99, 'other')]),
+        ),
+        migrations.AlterField(
+            model_name='enquiry',
+            name='refererUrl',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='+', to='contact.siteurl'),
+        ),
+        migrations.AlterField(
+            model_name='enquiry',
+            name='submittedUrl',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='+', to='contact.siteurl'),
+        ),
+        migrations.AlterField(
+            model_name='archivedenquiry',
+            name='serviceType',
+            field=models.PositiveSmallIntegerField(choices=[(1, 'localMove'), (2, 'internationalMove'), (3, 'carExport'), (4, 'storageServices'), (5, 'logistics'), (99, 'other')]),
+        ),
+        migrations.AlterField(
+            model_name='archivedenquiry',
+            name='refererUrl',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='+', to='contact.siteurl'),
+        ),
+        migrations.AlterField(
+            model_name='archivedenquiry',
+            name='submittedUrl',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='+', to='contact.siteurl'),
+        ),
+    ]
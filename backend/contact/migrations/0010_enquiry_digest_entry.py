@@ -0,0 +1,21 @@
+# Generated by Django 5.2.1 on 2026-10-19 01:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contact', '0009_drop_verbose_enquiry_columns'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EnquiryDigestEntry',
+            fields=[
+                ('enquiry', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, serialize=False, to='contact.enquiry')),
+                ('queued_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
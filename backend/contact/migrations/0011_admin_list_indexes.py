@@ -0,0 +1,17 @@
+# Generated by Django 5.2.1 on 2026-10-19 01:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contact', '0010_enquiry_digest_entry'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='enquiry',
+            index=models.Index(fields=['serviceType', 'created_at'], name='contact_enq_service_ea109c_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.1 on 2026-10-19 02:01
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contact', '0011_admin_list_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='enquirydigestentry',
+            name='enquiry',
+            field=models.OneToOneField(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, serialize=False, to='contact.enquiry'),
+        ),
+    ]
@@ -1,23 +1,112 @@
-from django.db import models
+from django.db import connections, models, router
+from core.cache import InvalidatingQuerySet, invalidate_on_commit, model_tag
 
-class Enquiry(models.Model):
+class ServiceType(models.IntegerChoices):
     """
-    Model to store enquiry form submissions.
+    Stored as a small integer; the label is the value used by the API.
+    """
+    LOCAL_MOVE = 1, 'localMove'
+    INTERNATIONAL_MOVE = 2, 'internationalMove'
+    CAR_EXPORT = 3, 'carExport'
+    STORAGE_SERVICES = 4, 'storageServices'
+    LOGISTICS = 5, 'logistics'
+    OTHER = 99, 'other'
+
+    @classmethod
+    def code_for(cls, label):
+        return next((choice.value for choice in cls if choice.label == label), cls.OTHER.value)
+
+class SiteURLManager(models.Manager):
+    # {(database alias, url): pk} for the process; see forget().
+    _ids = {}
+
+    def intern(self, url):
+        """Return the SiteURL for `url`, creating it on first use."""
+        using = self._db or router.db_for_write(self.model)
+        key = (using, url)
+        pk = self._ids.get(key)
+        if pk is None:
+            pk = self.db_manager(using).get_or_create(url=url)[0].pk
+            # A row created inside a transaction may still be rolled back.
+            if not connections[using].in_atomic_block:
+                if len(self._ids) > 1000:
+                    self._ids.clear()
+                self._ids[key] = pk
+        return self.model(pk=pk, url=url)
+
+    def forget(self):
+        """Drop the cached ids, e.g. after SiteURL rows are deleted."""
+        self._ids.clear()
+
+class SiteURL(models.Model):
+    """
+    Deduplicated referer and submission URLs; enquiries come from a handful
+    of site pages.
+    """
+    url = models.URLField(unique=True)
+
+    objects = SiteURLManager()
+
+    def __str__(self):
+        return self.url
+
+class EnquiryFields(models.Model):
+    """
+    Fields shared by live and archived enquiries.
     """
     fullName = models.CharField(max_length=100)
     phoneNumber = models.CharField(max_length=20)
     email = models.EmailField()
-    serviceType = models.CharField(max_length=50)
+    serviceType = models.PositiveSmallIntegerField(choices=ServiceType.choices)
     message = models.TextField()
-    recaptchaToken = models.TextField()
-    refererUrl = models.URLField()
-    submittedUrl = models.URLField()
+    refererUrl = models.ForeignKey(SiteURL, on_delete=models.PROTECT, related_name='+')
+    submittedUrl = models.ForeignKey(SiteURL, on_delete=models.PROTECT, related_name='+')
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = InvalidatingQuerySet.as_manager()
+
+    class Meta:
+        abstract = True
+
+    def __str__(self):
+        return self.fullName
+
+    def delete(self, using=None, keep_parents=False):
+        result = super().delete(using=using, keep_parents=keep_parents)
+        invalidate_on_commit([model_tag(type(self))], using=using or self._state.db)
+        return result
+
+class Enquiry(EnquiryFields):
+    """
+    Model to store enquiry form submissions.
+    """
     class Meta:
         indexes = [
             models.Index(fields=['created_at']),
+            models.Index(fields=['serviceType', 'created_at']),
         ]
 
-    def __str__(self):
-        return self.fullName
\ No newline at end of file
+class ArchivedEnquiry(EnquiryFields):
+    """
+    Enquiries moved out of the live table by `archive_enquiries`. They keep
+    their original id and created_at, and are always older than every live
+    enquiry, since archiving moves the oldest rows first.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at']),
+        ]
+
+class EnquiryDigestEntry(models.Model):
+    """
+    An enquiry waiting to be included in the next admin digest email.
+
+    Not cascaded, so enquiries can still be deleted in bulk without loading
+    them; entries left by deleted enquiries are dropped by the next digest.
+    """
+    enquiry = models.OneToOneField(Enquiry, on_delete=models.DO_NOTHING, db_constraint=False, primary_key=True)
+    queued_at = models.DateTimeField(auto_now_add=True)
@@ -0,0 +1,261 @@
+"""
+Enquiry emails.
+
+Every enquiry gets its user confirmation. Admin notifications depend on
+ENQUIRY_NOTIFY_MODE:
+
+- 'immediate': one admin email per enquiry.
+- 'digest': enquiries are queued and sent as one email, grouped by service
+  type, every ENQUIRY_DIGEST_WINDOW seconds.
+- 'auto' (default): immediate while fewer than ENQUIRY_DIGEST_THRESHOLD
+  enquiries arrived in the current window, digest above that.
+
+Sending runs on a background thread, off the request path. The digest is
+sent by a timer in the worker that queued the first entry; queued entries
+live in the database, and the `enquiry-digest` compose service runs
+`manage.py send_enquiry_digest --overdue --every 60` to send any a
+restarted worker's timer never did.
+"""
+import contextvars
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.mail import EmailMultiAlternatives, send_mail
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from django.utils.html import escape
+
+from .models import Enquiry, EnquiryDigestEntry
+from .serializers import EnquiryValuesReader
+
+logger = logging.getLogger(__name__)
+
+SERVICE_TYPE_DISPLAY = {
+    'localMove': 'Local Move',
+    'internationalMove': 'International Move',
+    'carExport': 'Car Import and Export',
+    'storageServices': 'Storage Services',
+    'logistics': 'Logistics',
+}
+
+DIGEST_BATCH_SIZE = 500
+
+
+def service_type_display(service_type):
+    return SERVICE_TYPE_DISPLAY.get(service_type, service_type)
+
+
+def bcc_recipients():
+    bcc = getattr(settings, 'BCC_CONTACT_EMAILS', '')
+    if isinstance(bcc, str):
+        return [email.strip() for email in bcc.split(',') if email.strip()]
+    return list(bcc)
+
+
+def send_user_confirmation(enquiry_data):
+    """Thank the user for their enquiry."""
+    service = service_type_display(enquiry_data["serviceType"])
+    user_message = f"""
+        Hi {enquiry_data['fullName']},
+
+        Thank you for your enquiry regarding our {service} services.
+        We have received your message and will get back to you soon.
+
+        Here's a summary of your enquiry:
+        - Service: {service}
+        - Message: {enquiry_data.get('message', 'N/A')}
+
+        Best regards,
+        Almas Movers International
+        Website: www.almasintl.com
+        """
+    send_mail(
+        subject='Thank You for Your Enquiry',
+        message=user_message,
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        recipient_list=[enquiry_data['email']],
+        fail_silently=False,
+    )
+    logger.info("User enquiry email sent to %s", enquiry_data['email'])
+
+
+def send_admin_notification(enquiry_data):
+    """Notify the admins (with BCC) of a single enquiry."""
+    service = service_type_display(enquiry_data["serviceType"])
+    admin_message = f"""
+        New enquiry received:
+
+        Name: {enquiry_data["fullName"]}
+        Phone: {enquiry_data["phoneNumber"]}
+        Email: {enquiry_data["email"]}
+        Service Type: {service}
+        Message: {enquiry_data.get("message", "N/A")}
+        Referer URL: {enquiry_data.get("refererUrl", "N/A")}
+        Submitted URL: {enquiry_data.get("submittedUrl", "N/A")}
+        """
+    html_content = f"""
+        <html>
+            <body>
+                <h2>New enquiry received:</h2>
+                <p><strong>Name:</strong> {enquiry_data["fullName"]}</p>
+                <p><strong>Phone:</strong> {enquiry_data["phoneNumber"]}</p>
+                <p><strong>Email:</strong> {enquiry_data["email"]}</p>
+                <p><strong>Service Type:</strong> {service}</p>
+                <p><strong>Message:</strong> {enquiry_data.get("message", "N/A")}</p>
+                <p><strong>Referer URL:</strong> {enquiry_data.get("refererUrl", "N/A")}</p>
+                <p><strong>Submitted URL:</strong> {enquiry_data.get("submittedUrl", "N/A")}</p>
+            </body>
+        </html>
+        """
+    bcc = bcc_recipients()
+    email = EmailMultiAlternatives(
+        subject=f'New Enquiry: {service} from {enquiry_data["fullName"]}',
+        body=admin_message,
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        to=[settings.CONTACT_EMAIL],
+        bcc=bcc,
+        reply_to=[enquiry_data['email']],
+    )
+    email.attach_alternative(html_content, "text/html")
+    email.send(fail_silently=False)
+    logger.info("Admin email sent to %s with BCC to %s", settings.CONTACT_EMAIL, bcc)
+
+
+def render_digest(enquiries):
+    """Return (subject, text, html) for a digest of enquiry dicts, grouped by service type."""
+    groups = {}
+    for enquiry in enquiries:
+        groups.setdefault(service_type_display(enquiry['serviceType']), []).append(enquiry)
+
+    subject = f'{len(enquiries)} New Enquiries'
+    text = [f'{len(enquiries)} new enquiries received:']
+    html = [f'<html><body><h2>{len(enquiries)} new enquiries received</h2>']
+    for service, items in sorted(groups.items()):
+        text.append(f'\n{service} ({len(items)})\n')
+        html.append(f'<h3>{escape(service)} ({len(items)})</h3><table cellpadding="4">')
+        for enquiry in items:
+            text.append(
+                f'- {enquiry["fullName"]} | {enquiry["phoneNumber"]} | {enquiry["email"]} | '
+                f'{enquiry["created_at"]}\n  {enquiry["message"]}\n  Submitted URL: {enquiry["submittedUrl"]}'
+            )
+            html.append(
+                f'<tr><td><strong>{escape(enquiry["fullName"])}</strong><br>{escape(enquiry["phoneNumber"])}'
+                f'<br>{escape(enquiry["email"])}<br>{escape(enquiry["created_at"])}</td>'
+                f'<td>{escape(enquiry["message"])}<br><small>{escape(enquiry["submittedUrl"])}</small></td></tr>'
+            )
+        html.append('</table>')
+    html.append('</body></html>')
+    return subject, '\n'.join(text), ''.join(html)
+
+
+def send_enquiry_digest():
+    """
+    Send every queued enquiry in digest emails of up to DIGEST_BATCH_SIZE.
+    A batch stays queued if sending fails. Returns the number sent.
+    """
+    sent = 0
+    while True:
+        with transaction.atomic():
+            ids = list(
+                EnquiryDigestEntry.objects.select_for_update(skip_locked=True)
+                .order_by('enquiry_id').values_list('enquiry_id', flat=True)[:DIGEST_BATCH_SIZE]
+            )
+            if not ids:
+                return sent
+            enquiries = EnquiryValuesReader().read(Enquiry.objects.filter(id__in=ids).order_by('created_at'))
+            if enquiries:
+                subject, text, html = render_digest(enquiries)
+                email = EmailMultiAlternatives(
+                    subject=subject,
+                    body=text,
+                    from_email=settings.DEFAULT_FROM_EMAIL,
+                    to=[settings.CONTACT_EMAIL],
+                    bcc=bcc_recipients(),
+                )
+                email.attach_alternative(html, "text/html")
+                email.send(fail_silently=False)
+                logger.info("Enquiry digest of %s sent to %s", len(enquiries), settings.CONTACT_EMAIL)
+            EnquiryDigestEntry.objects.filter(enquiry_id__in=ids).delete()
+        sent += len(enquiries)
+
+
+def send_overdue_enquiry_digest():
+    """
+    Send the queued enquiries if the oldest has waited longer than
+    ENQUIRY_DIGEST_WINDOW, i.e. its timer is gone. Returns the number sent.
+    """
+    cutoff = timezone.now() - timedelta(seconds=settings.ENQUIRY_DIGEST_WINDOW)
+    if not EnquiryDigestEntry.objects.filter(queued_at__lt=cutoff).exists():
+        return 0
+    return send_enquiry_digest()
+
+
+class EnquiryNotifier:
+    """Chooses the admin notification mode and runs sending in the background."""
+
+    def __init__(self, alias='default'):
+        self.alias = alias
+        self._executor = None
+        self._lock = threading.Lock()
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def notify(self, enquiry, enquiry_data):
+        """Queue the emails for a newly created enquiry."""
+        digest = self.use_digest()
+        if digest:
+            EnquiryDigestEntry.objects.create(enquiry=enquiry)
+        enquiry_data = dict(enquiry_data)
+        self.submit(send_user_confirmation, enquiry_data)
+        if digest:
+            self.schedule_digest()
+        else:
+            self.submit(send_admin_notification, enquiry_data)
+
+    def use_digest(self):
+        mode = settings.ENQUIRY_NOTIFY_MODE
+        if mode != 'auto':
+            return mode == 'digest'
+        return self._count_in_window() > settings.ENQUIRY_DIGEST_THRESHOLD
+
+    def schedule_digest(self):
+        """Send a digest at the end of the window, once across all processes."""
+        window = settings.ENQUIRY_DIGEST_WINDOW
+        if self.cache.add('enqnotify:digest-scheduled', 1, timeout=window):
+            timer = threading.Timer(window, self.submit, args=(send_enquiry_digest,))
+            timer.daemon = True
+            timer.start()
+
+    def submit(self, func, *args):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='enquiry-mail')
+        # Run in a copy of the caller's context so the task stays in its trace.
+        return self._executor.submit(contextvars.copy_context().run, self._run, func, *args)
+
+    def _run(self, func, *args):
+        try:
+            return func(*args)
+        except Exception:
+            logger.error("Enquiry email task %s failed", func.__name__, exc_info=True)
+        finally:
+            close_old_connections()
+
+    def _count_in_window(self):
+        key = 'enqnotify:rate:%d' % (time.time() // settings.ENQUIRY_DIGEST_WINDOW)
+        if self.cache.add(key, 1, timeout=settings.ENQUIRY_DIGEST_WINDOW * 2):
+            return 1
+        try:
+            return self.cache.incr(key)
+        except ValueError:
+            return 1
+
+
+enquiry_notifier = EnquiryNotifier()
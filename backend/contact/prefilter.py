@@ -0,0 +1,113 @@
+"""
+Cheap checks run before an enquiry costs a reCAPTCHA call, a row and two
+emails.
+
+Submissions are fingerprinted by normalised email, phone, service type and
+a hash of the message. The first submission claims the fingerprint in the
+shared cache for ENQUIRY_DUPLICATE_WINDOW seconds, and repeats within the
+window (double-clicks, retries, replaying bots) get the original enquiry
+back instead of being processed again. Obvious spam is rejected by a few
+heuristic rules. Outcomes are counted in the shared cache.
+"""
+import hashlib
+import re
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+PENDING = 'pending'
+
+URL_PATTERN = re.compile(r'https?://|www\.', re.IGNORECASE)
+MARKUP_PATTERN = re.compile(r'\[url|<a\s|\[link', re.IGNORECASE)
+STAT_NAMES = ('checked', 'accepted', 'duplicates', 'pending_duplicates', 'spam_links', 'spam_markup',
+              'spam_link_in_name', 'spam_phone')
+
+
+def _text(data, name):
+    value = data.get(name, '')
+    return value if isinstance(value, str) else str(value)
+
+
+def normalize_message(message):
+    return ' '.join(message.lower().split())
+
+
+class EnquiryPrefilter:
+    def __init__(self, alias='default', wait_timeout=3):
+        self.alias = alias
+        self.wait_timeout = wait_timeout
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def fingerprint(self, data):
+        message_hash = hashlib.sha256(normalize_message(_text(data, 'message')).encode()).hexdigest()
+        parts = (
+            _text(data, 'email').strip().lower(),
+            re.sub(r'\D', '', _text(data, 'phoneNumber')),
+            _text(data, 'serviceType').strip(),
+            message_hash,
+        )
+        return hashlib.sha256('|'.join(parts).encode()).hexdigest()[:32]
+
+    def spam_reason(self, data):
+        """Name of the first heuristic rule the submission trips, or None."""
+        message = _text(data, 'message')
+        if len(URL_PATTERN.findall(message)) > settings.ENQUIRY_SPAM_MAX_LINKS:
+            return 'links'
+        if MARKUP_PATTERN.search(message):
+            return 'markup'
+        if URL_PATTERN.search(_text(data, 'fullName')):
+            return 'link_in_name'
+        if len(re.sub(r'\D', '', _text(data, 'phoneNumber'))) < 6:
+            return 'phone'
+        return None
+
+    def claim(self, fingerprint):
+        """
+        Claim a fingerprint for this submission. Returns None when claimed,
+        the original enquiry's id for a duplicate, or PENDING when the
+        original is still being processed after waiting `wait_timeout`.
+        """
+        key = self._key(fingerprint)
+        if self.cache.add(key, PENDING, timeout=settings.ENQUIRY_DUPLICATE_WINDOW):
+            return None
+        deadline = time.monotonic() + self.wait_timeout
+        delay = 0.05
+        while True:
+            value = self.cache.get(key)
+            if value is None:
+                # The original failed and released its claim.
+                if self.cache.add(key, PENDING, timeout=settings.ENQUIRY_DUPLICATE_WINDOW):
+                    return None
+                continue
+            if value != PENDING or time.monotonic() >= deadline:
+                return value
+            time.sleep(delay)
+            delay = min(delay * 2, 0.5)
+
+    def complete(self, fingerprint, enquiry_id):
+        self.cache.set(self._key(fingerprint), enquiry_id, timeout=settings.ENQUIRY_DUPLICATE_WINDOW)
+
+    def release(self, fingerprint):
+        self.cache.delete(self._key(fingerprint))
+
+    def record(self, name):
+        key = 'enqfilter:stat:' + name
+        try:
+            self.cache.incr(key)
+        except ValueError:
+            if not self.cache.add(key, 1, timeout=None):
+                self.cache.incr(key)
+
+    def stats(self):
+        stored = self.cache.get_many(['enqfilter:stat:' + name for name in STAT_NAMES])
+        return {name: stored.get('enqfilter:stat:' + name, 0) for name in STAT_NAMES}
+
+    def _key(self, fingerprint):
+        return 'enqfilter:fp:' + fingerprint
+
+
+enquiry_prefilter = EnquiryPrefilter()
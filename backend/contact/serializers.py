@@ -1,20 +1,65 @@
 from rest_framework import serializers
-from .models import Enquiry
+from .models import Enquiry, ServiceType, SiteURL
+from core.readers import ValuesReader, datetime_repr
+
+SERVICE_TYPE_LABELS = dict(ServiceType.choices)
+
+class ServiceTypeField(serializers.CharField):
+    """The service type's API name, stored as a ServiceType code."""
+    def to_representation(self, value):
+        return SERVICE_TYPE_LABELS.get(value, value)
 
 class EnquirySerializer(serializers.ModelSerializer):
     """
     Serializer for the Enquiry model.
     Validates and serializes enquiry form data.
+
+    validated_data keeps the submitted strings; they are mapped to the
+    compact stored form (service code, interned URLs) on save.
+
+    recaptchaToken: the token is verified by the view and no longer stored,
+    so it is always returned as ''. The key is kept because the admin
+    frontend and existing API clients read every key of an enquiry, and a
+    missing key would break them where an empty token does not (a used
+    token is single-use and was never meaningful to read back).
     """
+    serviceType = ServiceTypeField(max_length=50)
+    refererUrl = serializers.URLField()
+    submittedUrl = serializers.URLField()
+    recaptchaToken = serializers.SerializerMethodField(
+        help_text='Deprecated: always empty. The token is verified on submission and not stored.'
+    )
+
     class Meta:
         model = Enquiry
-        fields = '__all__'
+        fields = (
+            'id', 'fullName', 'phoneNumber', 'email', 'serviceType', 'message',
+            'recaptchaToken', 'refererUrl', 'submittedUrl', 'created_at',
+        )
+
+    def get_recaptchaToken(self, obj):
+        return ''
+
+    def to_model_data(self, validated_data):
+        data = dict(validated_data)
+        if 'serviceType' in data:
+            data['serviceType'] = ServiceType.code_for(data['serviceType'])
+        for name in ('refererUrl', 'submittedUrl'):
+            if name in data:
+                data[name] = SiteURL.objects.intern(data[name])
+        return data
+
+    def create(self, validated_data):
+        return super().create(self.to_model_data(validated_data))
+
+    def update(self, instance, validated_data):
+        return super().update(instance, self.to_model_data(validated_data))
 
     def validate_serviceType(self, value):
         """
         Validate that serviceType is one of the allowed values.
         """
-        allowed_services = ['localMove', 'internationalMove', 'carExport', 'storageServices', 'logistics']
+        allowed_services = [choice.label for choice in ServiceType if choice != ServiceType.OTHER]
         if value not in allowed_services:
             raise serializers.ValidationError("Invalid service type.")
         return value
@@ -25,4 +70,21 @@ class EnquirySerializer(serializers.ModelSerializer):
         """
         if '@' not in value or '.' not in value:
             raise serializers.ValidationError("Invalid email format.")
-        return value
\ No newline at end of file
+        return value
+
+class EnquiryValuesReader(ValuesReader):
+    """
+    values()-based equivalent of EnquirySerializer for the admin list.
+    """
+    fields = EnquirySerializer.Meta.fields
+    columns = {
+        'refererUrl': 'refererUrl__url',
+        'submittedUrl': 'submittedUrl__url',
+    }
+    converters = {
+        'serviceType': SERVICE_TYPE_LABELS.get,
+        'created_at': datetime_repr,
+    }
+    constants = {
+        'recaptchaToken': '',
+    }
@@ -0,0 +1,9 @@
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+from .models import SiteURL
+
+
+@receiver(post_delete, sender=SiteURL)
+def forget_site_url_ids(sender, instance, **kwargs):
+    """Stop handing out the cached id of a deleted SiteURL."""
+    SiteURL.objects.forget()
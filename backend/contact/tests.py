@@ -1,3 +1,329 @@
-from django.test import TestCase
+import csv
+import importlib
+import io
+from datetime import datetime, timedelta, timezone
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.contrib.admin.sites import site
+from django.core.cache import caches
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TestCase, TransactionTestCase
+from rest_framework.test import APIClient
+
+from core.renderers import FastJSONRenderer
+from .admin import EnquiryAdmin
+from .archive import archive_enquiries
+from .models import ArchivedEnquiry, Enquiry, EnquiryDigestEntry, ServiceType, SiteURL
+from .notifications import send_overdue_enquiry_digest
+from .prefilter import PENDING, EnquiryPrefilter
+from .serializers import EnquirySerializer, EnquiryValuesReader
+
+
+class ValuesReaderEquivalenceTests(TestCase):
+    """The values() read path must render byte for byte like the serializer."""
+
+    def setUp(self):
+        home = SiteURL.objects.intern('https://www.almasintl.com/')
+        contact = SiteURL.objects.intern('https://www.almasintl.com/contact?ref=ad&q=%C3%A9')
+        Enquiry.objects.create(fullName='Zoë "Quoted" Name', phoneNumber='+974 1234', email='z@example.com',
+                               serviceType=ServiceType.INTERNATIONAL_MOVE, message='Line 1\nLine 2 </script>',
+                               refererUrl=home, submittedUrl=contact)
+        Enquiry.objects.create(fullName='Other', phoneNumber='5', email='o@example.com',
+                               serviceType=ServiceType.OTHER, message='', refererUrl=contact, submittedUrl=contact)
+        ArchivedEnquiry.objects.create(id=1000, fullName='Archived', phoneNumber='6', email='a@example.com',
+                                       serviceType=ServiceType.STORAGE_SERVICES, message='Old',
+                                       refererUrl=home, submittedUrl=home,
+                                       created_at=datetime(2024, 5, 1, 8, 0, 0, 123456, tzinfo=timezone.utc))
+
+        self.client = APIClient()
+        admin = get_user_model().objects.create_user('admin@example.com', 'password', role='admin')
+        self.client.force_authenticate(admin)
+
+    def render(self, data):
+        return FastJSONRenderer().render(data)
+
+    def test_enquiries_match_the_serializer(self):
+        for model in (Enquiry, ArchivedEnquiry):
+            queryset = model.objects.order_by('id')
+            self.assertEqual(self.render(EnquiryValuesReader().read(queryset)),
+                             self.render(EnquirySerializer(queryset, many=True).data), model)
+
+    def test_list_endpoint_matches_the_serializer(self):
+        live = EnquirySerializer(Enquiry.objects.order_by('-created_at'), many=True).data
+        archived = EnquirySerializer(ArchivedEnquiry.objects.order_by('-created_at'), many=True).data
+        response = self.client.get('/api/contacts/enquiries/')
+        self.assertEqual(response.content, self.render(live))
+        response = self.client.get('/api/contacts/enquiries/?include_archived=true')
+        self.assertEqual(response.content, self.render(live + archived))
+
+    def test_sparse_fields(self):
+        expected = EnquirySerializer(Enquiry.objects.order_by('-created_at'), many=True).data
+        response = self.client.get('/api/contacts/enquiries/?fields=id,serviceType,recaptchaToken,refererUrl')
+        self.assertEqual(response.json(), [
+            {name: row[name] for name in ('id', 'serviceType', 'recaptchaToken', 'refererUrl')} for row in expected
+        ])
+
+
+class OverdueDigestTests(TestCase):
+    def setUp(self):
+        url = SiteURL.objects.intern('https://www.almasintl.com/')
+        self.enquiries = [
+            Enquiry.objects.create(fullName='Name %d' % index, phoneNumber='1', email='e@example.com',
+                                   serviceType=ServiceType.LOGISTICS, message='Hello', refererUrl=url,
+                                   submittedUrl=url)
+            for index in range(2)
+        ]
+        for enquiry in self.enquiries:
+            EnquiryDigestEntry.objects.create(enquiry=enquiry)
+
+    def test_entries_within_the_window_are_left_to_the_timer(self):
+        self.assertEqual(send_overdue_enquiry_digest(), 0)
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(EnquiryDigestEntry.objects.count(), 2)
+
+    def test_overdue_entries_are_sent_together(self):
+        with self.settings(ENQUIRY_DIGEST_WINDOW=600):
+            EnquiryDigestEntry.objects.filter(enquiry=self.enquiries[0]).update(
+                queued_at=datetime.now(timezone.utc) - timedelta(seconds=601))
+            self.assertEqual(send_overdue_enquiry_digest(), 2)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].subject, '2 New Enquiries')
+        self.assertFalse(EnquiryDigestEntry.objects.exists())
+
+
+def enquiry_payload(**fields):
+    payload = {
+        'fullName': 'Jane Doe', 'phoneNumber': '+974 5555 1234', 'email': 'jane@example.com',
+        'serviceType': 'localMove', 'message': 'Moving a 2 bedroom flat.', 'recaptchaToken': 'token',
+        'refererUrl': 'https://www.google.com/', 'submittedUrl': 'https://www.almasintl.com/contact',
+    }
+    payload.update(fields)
+    return payload
+
+
+class PrefilterTests(TestCase):
+    def setUp(self):
+        caches['default'].clear()
+        self.prefilter = EnquiryPrefilter(wait_timeout=0)
+
+    def test_spam_rules(self):
+        self.assertIsNone(self.prefilter.spam_reason(enquiry_payload()))
+        links = 'See https://a.example and www.b.example and http://c.example'
+        self.assertEqual(self.prefilter.spam_reason(enquiry_payload(message=links)), 'links')
+        self.assertEqual(self.prefilter.spam_reason(enquiry_payload(message='[url=x]cheap[/url]')), 'markup')
+        self.assertEqual(self.prefilter.spam_reason(enquiry_payload(fullName='www.spam.example')), 'link_in_name')
+        self.assertEqual(self.prefilter.spam_reason(enquiry_payload(phoneNumber='12-34')), 'phone')
+
+    def test_fingerprint_ignores_case_and_spacing(self):
+        self.assertEqual(
+            self.prefilter.fingerprint(enquiry_payload()),
+            self.prefilter.fingerprint(enquiry_payload(email=' JANE@example.com', phoneNumber='97455551234',
+                                                       message='moving a  2 bedroom\nflat.')),
+        )
+        self.assertNotEqual(self.prefilter.fingerprint(enquiry_payload()),
+                            self.prefilter.fingerprint(enquiry_payload(serviceType='logistics')))
+
+    def test_claim_complete_release_cycle(self):
+        fingerprint = self.prefilter.fingerprint(enquiry_payload())
+        self.assertIsNone(self.prefilter.claim(fingerprint))
+        self.assertEqual(self.prefilter.claim(fingerprint), PENDING)
+        self.prefilter.complete(fingerprint, 42)
+        self.assertEqual(self.prefilter.claim(fingerprint), 42)
+        self.prefilter.release(fingerprint)
+        self.assertIsNone(self.prefilter.claim(fingerprint))
+
+
+@mock.patch('contact.notifications.enquiry_notifier.notify')
+@mock.patch('requests.post')
+class EnquiryCreateTests(TestCase):
+    def setUp(self):
+        caches['default'].clear()
+        self.admin = APIClient()
+        self.admin.force_authenticate(get_user_model().objects.create_user('admin@example.com', 'password',
+                                                                             role='admin'))
+
+    def post(self, data):
+        return self.client.post('/api/contacts/enquiries/', data, content_type='application/json')
+
+    def test_non_object_body_is_rejected(self, recaptcha, notify):
+        for body in ([enquiry_payload()], 'message', 5):
+            self.assertEqual(self.post(body).status_code, 400, body)
+        recaptcha.assert_not_called()
+
+    def test_duplicate_gets_the_original_and_stats_are_counted(self, recaptcha, notify):
+        recaptcha.return_value.json.return_value = {'success': True, 'score': 0.9}
+        first = self.post(enquiry_payload())
+        self.assertEqual(first.status_code, 201)
+        second = self.post(enquiry_payload(message='MOVING a 2 bedroom flat. '))
+        self.assertEqual(second.status_code, 201)
+        self.assertEqual(second.json()['id'], first.json()['id'])
+        self.assertEqual(Enquiry.objects.count(), 1)
+        self.assertEqual(recaptcha.call_count, 1)
+        self.assertEqual(notify.call_count, 1)
+
+        spam = self.post(enquiry_payload(fullName='http://spam.example'))
+        self.assertEqual(spam.status_code, 400)
+        stats = self.admin.get('/api/contacts/enquiries/filter-stats/').json()
+        self.assertEqual({name: stats[name] for name in ('checked', 'accepted', 'duplicates', 'spam_link_in_name')},
+                         {'checked': 3, 'accepted': 1, 'duplicates': 1, 'spam_link_in_name': 1})
+        self.assertEqual(self.client.get('/api/contacts/enquiries/filter-stats/').status_code, 401)
+
+    def test_failed_submission_releases_its_claim(self, recaptcha, notify):
+        recaptcha.return_value.json.return_value = {'success': False}
+        self.assertEqual(self.post(enquiry_payload()).status_code, 400)
+        recaptcha.return_value.json.return_value = {'success': True, 'score': 0.9}
+        self.assertEqual(self.post(enquiry_payload()).status_code, 201)
+        self.assertEqual(recaptcha.call_count, 2)
+
+
+class CompactColumnsMigrationTests(TransactionTestCase):
+    """0007-0009 move enquiries to service codes and interned URLs, and back."""
+    before = [('contact', '0007_compact_enquiry_columns')]
+    after = [('contact', '0009_drop_verbose_enquiry_columns')]
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def setUp(self):
+        self.addCleanup(SiteURL.objects.forget)
+        self.addCleanup(self.migrate, MigrationExecutor(connection).loader.graph.leaf_nodes('contact'))
+        self.apps = self.migrate(self.before)
+
+    def create(self, model_name, **fields):
+        values = dict(fullName='Name', phoneNumber='1', email='e@example.com', message='Hi',
+                      recaptchaToken='token', refererUrl='https://www.google.com/',
+                      submittedUrl='https://www.almasintl.com/contact', serviceType='carExport')
+        values.update(fields)
+        return self.apps.get_model('contact', model_name).objects.create(**values)
+
+    def test_forward_and_backward(self):
+        live = self.create('Enquiry')
+        unknown = self.create('Enquiry', serviceType='somethingElse', refererUrl='https://www.bing.com/')
+        archived = self.create('ArchivedEnquiry', id=5000, created_at=datetime(2024, 1, 1, tzinfo=timezone.utc))
+
+        apps = self.migrate(self.after)
+        Enquiry = apps.get_model('contact', 'Enquiry')
+        rows = dict(Enquiry.objects.values_list('id', 'serviceType'))
+        self.assertEqual(rows, {live.pk: ServiceType.CAR_EXPORT, unknown.pk: ServiceType.OTHER})
+        self.assertEqual(Enquiry.objects.get(pk=unknown.pk).refererUrl.url, 'https://www.bing.com/')
+        archived_row = apps.get_model('contact', 'ArchivedEnquiry').objects.get(pk=archived.pk)
+        self.assertEqual((archived_row.serviceType, archived_row.submittedUrl.url),
+                         (ServiceType.CAR_EXPORT, 'https://www.almasintl.com/contact'))
+        # Three distinct URLs, each stored once.
+        self.assertEqual(apps.get_model('contact', 'SiteURL').objects.count(), 3)
+
+        apps = self.migrate(self.before)
+        restored = {row.pk: row for row in apps.get_model('contact', 'Enquiry').objects.all()}
+        self.assertEqual((restored[live.pk].serviceType, restored[live.pk].refererUrl,
+                          restored[live.pk].recaptchaToken),
+                         ('carExport', 'https://www.google.com/', ''))
+        # Unknown service types were stored as 'other'.
+        self.assertEqual(restored[unknown.pk].serviceType, 'other')
+        archived_row = apps.get_model('contact', 'ArchivedEnquiry').objects.get(pk=archived.pk)
+        self.assertEqual(archived_row.submittedUrl, 'https://www.almasintl.com/contact')
+
+    def test_backfill_is_batched_and_resumes(self):
+        backfill = importlib.import_module('contact.migrations.0008_backfill_compact_enquiry_columns')
+        for index in range(5):
+            self.create('Enquiry', submittedUrl='https://www.almasintl.com/page-%d' % (index % 2))
+        Enquiry = self.apps.get_model('contact', 'Enquiry')
+        # A row done by an interrupted earlier run is left alone.
+        done = Enquiry.objects.order_by('pk').first()
+        url = self.apps.get_model('contact', 'SiteURL').objects.create(url='https://www.almasintl.com/done')
+        Enquiry.objects.filter(pk=done.pk).update(service_code=ServiceType.LOGISTICS, referer_site_url=url,
+                                                  submitted_site_url=url)
+        with mock.patch.object(backfill, 'BATCH_SIZE', 2):
+            backfill.backfill(self.apps, None)
+        codes = dict(Enquiry.objects.values_list('pk', 'service_code'))
+        self.assertEqual(codes.pop(done.pk), ServiceType.LOGISTICS)
+        self.assertEqual(set(codes.values()), {ServiceType.CAR_EXPORT})
+        self.assertFalse(Enquiry.objects.exclude(pk=done.pk).filter(submitted_site_url__isnull=True).exists())
+
+
+class SiteURLInternTests(TestCase):
+    def test_ids_are_cached_per_database_and_forgotten_on_delete(self):
+        SiteURL.objects.forget()
+        self.addCleanup(SiteURL.objects.forget)
+        with mock.patch('contact.models.connections') as connections:
+            connections.__getitem__.return_value.in_atomic_block = False
+            first = SiteURL.objects.intern('https://www.almasintl.com/a')
+            self.assertIn(('default', 'https://www.almasintl.com/a'), SiteURL._default_manager._ids)
+            with self.assertNumQueries(0):
+                self.assertEqual(SiteURL.objects.intern('https://www.almasintl.com/a').pk, first.pk)
+        SiteURL.objects.filter(pk=first.pk).delete()
+        self.assertEqual(SiteURL.objects._ids, {})
+        self.assertNotEqual(SiteURL.objects.intern('https://www.almasintl.com/a').pk, first.pk)
+
+
+class ArchiveTests(TestCase):
+    def setUp(self):
+        url = SiteURL.objects.intern('https://www.almasintl.com/')
+        now = datetime.now(timezone.utc)
+        self.enquiries = {}
+        for name, age in (('Older', 500), ('Old', 400), ('Recent', 1)):
+            enquiry = Enquiry.objects.create(fullName=name, phoneNumber='1', email='e@example.com',
+                                             serviceType=ServiceType.LOGISTICS, message=name, refererUrl=url,
+                                             submittedUrl=url)
+            Enquiry.objects.filter(pk=enquiry.pk).update(created_at=now - timedelta(days=age))
+            self.enquiries[name] = Enquiry.objects.get(pk=enquiry.pk)
+        self.client = APIClient()
+        self.client.force_authenticate(get_user_model().objects.create_user('admin@example.com', 'password',
+                                                                            role='admin'))
+
+    def archive(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            return archive_enquiries(older_than_days=180, batch_size=1)
+
+    def names(self, url):
+        return [row['fullName'] for row in self.client.get(url).json()]
+
+    def export_names(self, url):
+        response = self.client.get(url)
+        rows = list(csv.DictReader(io.StringIO(b''.join(response.streaming_content).decode())))
+        return [row['fullName'] for row in rows]
+
+    def test_old_enquiries_move_with_their_ids_and_dates(self):
+        self.assertEqual(self.archive(), 2)
+        self.assertEqual(list(Enquiry.objects.values_list('fullName', flat=True)), ['Recent'])
+        for name in ('Old', 'Older'):
+            archived = ArchivedEnquiry.objects.get(pk=self.enquiries[name].pk)
+            self.assertEqual((archived.fullName, archived.created_at),
+                             (name, self.enquiries[name].created_at))
+        self.assertEqual(self.archive(), 0)
+
+    def test_list_and_export_with_and_without_archived(self):
+        self.archive()
+        self.assertEqual(self.names('/api/contacts/enquiries/'), ['Recent'])
+        self.assertEqual(self.names('/api/contacts/enquiries/?include_archived=true'), ['Recent', 'Old', 'Older'])
+        self.assertEqual(self.export_names('/api/contacts/enquiries/export/'), ['Recent'])
+        self.assertEqual(self.export_names('/api/contacts/enquiries/export/?include_archived=true'),
+                         ['Recent', 'Old', 'Older'])
+
+    def test_archived_enquiry_can_be_deleted(self):
+        self.archive()
+        response = self.client.delete('/api/contacts/enquiries/%d/' % self.enquiries['Old'].pk)
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(ArchivedEnquiry.objects.filter(pk=self.enquiries['Old'].pk).exists())
+        response = self.client.delete('/api/contacts/enquiries/%d/' % self.enquiries['Recent'].pk)
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.client.delete('/api/contacts/enquiries/999999/').status_code, 404)
+        self.assertEqual(self.names('/api/contacts/enquiries/?include_archived=true'), ['Older'])
+
+
+class EnquiryAdminExportTests(TestCase):
+    def test_service_type_is_exported_as_its_label(self):
+        url = SiteURL.objects.intern('https://www.almasintl.com/')
+        enquiry = Enquiry.objects.create(fullName='Name', phoneNumber='1', email='e@example.com',
+                                         serviceType=ServiceType.CAR_EXPORT, message='Hi', refererUrl=url,
+                                         submittedUrl=url)
+        response = EnquiryAdmin(Enquiry, site).export_as_csv(mock.Mock(), Enquiry.objects.all())
+        [row] = csv.DictReader(io.StringIO(b''.join(response.streaming_content).decode()))
+        self.assertEqual(row['serviceType'], enquiry.get_serviceType_display())
+        self.assertEqual(row['serviceType'], 'carExport')
+        self.assertEqual(row['submittedUrl__url'], 'https://www.almasintl.com/')
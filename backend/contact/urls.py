@@ -1,8 +1,10 @@
 from django.urls import path
-from .views import EnquiryListCreate, EnquiryDelete, EnquiryDeleteAll
+from .views import EnquiryListCreate, EnquiryDelete, EnquiryDeleteAll, EnquiryExport, EnquiryFilterStats
 
 urlpatterns = [
     path('enquiries/', EnquiryListCreate.as_view(), name='enquiry-list-create'),
     path('enquiries/<int:pk>/', EnquiryDelete.as_view(), name='enquiry-delete'),
+    path('enquiries/export/', EnquiryExport.as_view(), name='enquiry-export'),
+    path('enquiries/filter-stats/', EnquiryFilterStats.as_view(), name='enquiry-filter-stats'),
     path('enquiries/delete-all/', EnquiryDeleteAll.as_view(), name='enquiry-delete-all'),
 ]
\ No newline at end of file
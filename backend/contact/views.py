@@ -1,114 +1,62 @@
 import logging
-from django.core.mail import send_mail, EmailMultiAlternatives
 from django.conf import settings
 from django.db import models
+from django.http import Http404
 from rest_framework import generics, status
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
-import requests
-from .models import Enquiry
-from .serializers import EnquirySerializer
+from rest_framework.views import APIView
+from .models import ArchivedEnquiry, Enquiry, EnquiryDigestEntry, ServiceType
+from .prefilter import PENDING, enquiry_prefilter
+from .serializers import EnquirySerializer, EnquiryValuesReader
 from authapp.permissions import IsAdmin  
+from core.prefer import minimal_response, prefers_minimal
+from core.db_router import read_from_replica
+from core.exports import streaming_csv_response
+from core.idempotency import idempotent
+from core.readers import ValuesReadMixin
 
 logger = logging.getLogger(__name__)
 
-SERVICE_TYPE_DISPLAY = {
-    'localMove': 'Local Move',
-    'internationalMove': 'International Move',
-    'carExport': 'Car Import and Export',
-    'storageServices': 'Storage Services',
-    'logistics': 'Logistics',
-}
-
-def send_enquiry_emails(enquiry_data):
-    """Send emails to the user and admin regarding the enquiry with working BCC."""
-    service_type_display = SERVICE_TYPE_DISPLAY.get(enquiry_data["serviceType"], enquiry_data["serviceType"])
-    
-    from_email = settings.DEFAULT_FROM_EMAIL
-    
-    try:
-        # 1. Send email to user
-        user_subject = 'Thank You for Your Enquiry'
-        user_message = f"""
-        Hi {enquiry_data['fullName']},
-
-        Thank you for your enquiry regarding our {service_type_display} services. 
-        We have received your message and will get back to you soon.
-
-        Here's a summary of your enquiry:
-        - Service: {service_type_display}
-        - Message: {enquiry_data.get('message', 'N/A')}
-
-        Best regards,
-        Almas Movers International
-        Website: www.almasintl.com
-        """
-        
-        # Admin email
-        admin_subject = f'New Enquiry: {service_type_display} from {enquiry_data["fullName"]}'
-        admin_message = f"""
-        New enquiry received:
-
-        Name: {enquiry_data["fullName"]}
-        Phone: {enquiry_data["phoneNumber"]}
-        Email: {enquiry_data["email"]}
-        Service Type: {service_type_display}
-        Message: {enquiry_data.get("message", "N/A")}
-        Referer URL: {enquiry_data.get("refererUrl", "N/A")}
-        Submitted URL: {enquiry_data.get("submittedUrl", "N/A")}
-        """  
-        
-        send_mail(
-            subject=user_subject,
-            message=user_message,
-            from_email=from_email,
-            recipient_list=[enquiry_data['email']],
-            fail_silently=False,
-        )
-        logger.info(f"User enquiry email sent to {enquiry_data['email']}")
-        
-        bcc_recipients = []
-        if hasattr(settings, 'BCC_CONTACT_EMAILS'):
-            if isinstance(settings.BCC_CONTACT_EMAILS, str):
-                bcc_recipients = [email.strip() for email in settings.BCC_CONTACT_EMAILS.split(',') if email.strip()]
-            elif isinstance(settings.BCC_CONTACT_EMAILS, (list, tuple)):
-                bcc_recipients = list(settings.BCC_CONTACT_EMAILS)
-        
-        email = EmailMultiAlternatives(
-            subject=admin_subject,
-            body=admin_message,
-            from_email=from_email,
-            to=[settings.CONTACT_EMAIL],  
-            bcc=bcc_recipients,  
-            reply_to=[enquiry_data['email']],
+def include_archived(request):
+    return request.query_params.get('include_archived', '').lower() in ('1', 'true', 'yes')
+
+def filter_enquiries(queryset, params):
+    """Apply the admin list's date range and search filters, newest first."""
+    # Date filtering
+    start_date = params.get('start_date')
+    end_date = params.get('end_date')
+    if start_date and end_date:
+        try:
+            queryset = queryset.filter(created_at__date__range=[start_date, end_date])
+        except ValueError as e:
+            logger.error("Invalid date format for filtering enquiries: %s", e)
+            return queryset.none()
+
+    # Search functionality
+    search_query = params.get('search')
+    if search_query:
+        queryset = queryset.filter(
+            models.Q(fullName__icontains=search_query) |
+            models.Q(email__icontains=search_query) |
+            models.Q(phoneNumber__icontains=search_query) |
+            models.Q(serviceType__in=[
+                choice.value for choice in ServiceType if search_query.lower() in choice.label.lower()
+            ]) |
+            models.Q(message__icontains=search_query)
         )
-        
-        html_content = f"""
-        <html>
-            <body>
-                <h2>New enquiry received:</h2>
-                <p><strong>Name:</strong> {enquiry_data["fullName"]}</p>
-                <p><strong>Phone:</strong> {enquiry_data["phoneNumber"]}</p>
-                <p><strong>Email:</strong> {enquiry_data["email"]}</p>
-                <p><strong>Service Type:</strong> {service_type_display}</p>
-                <p><strong>Message:</strong> {enquiry_data.get("message", "N/A")}</p>
-                <p><strong>Referer URL:</strong> {enquiry_data.get("refererUrl", "N/A")}</p>
-                <p><strong>Submitted URL:</strong> {enquiry_data.get("submittedUrl", "N/A")}</p>
-            </body>
-        </html>
-        """  
-        email.attach_alternative(html_content, "text/html")
-        
-        email.send(fail_silently=False)
-        logger.info(f"Admin email sent to {settings.CONTACT_EMAIL} with BCC to {bcc_recipients}")
-        
-    except Exception as e:
-        logger.error(f"Failed to send enquiry emails: {str(e)}", exc_info=True)
-        raise
 
-class EnquiryListCreate(generics.ListCreateAPIView):
+    return queryset.order_by('-created_at')
+
+class EnquiryListCreate(ValuesReadMixin, generics.ListCreateAPIView):
+    """
+    Admin list of live enquiries, plus archived ones with
+    `?include_archived=true`; public enquiry submission.
+    """
     queryset = Enquiry.objects.all()
     serializer_class = EnquirySerializer
+    values_reader_class = EnquiryValuesReader
+    cache_tags = ('contact.enquiry', 'contact.archivedenquiry')
 
     def get_permissions(self):
         """
@@ -120,33 +68,72 @@ class EnquiryListCreate(generics.ListCreateAPIView):
         return [AllowAny()]
 
     def get_queryset(self):
-        queryset = super().get_queryset()
-        params = self.request.query_params
-        
-        # Date filtering
-        start_date = params.get('start_date')
-        end_date = params.get('end_date')
-        if start_date and end_date:
-            try:
-                queryset = queryset.filter(created_at__date__range=[start_date, end_date])
-            except ValueError as e:
-                logger.error(f"Invalid date format for filtering enquiries: {str(e)}")
-                return queryset.none()
-        
-        # Search functionality
-        search_query = params.get('search')
-        if search_query:
-            queryset = queryset.filter(
-                models.Q(fullName__icontains=search_query) |
-                models.Q(email__icontains=search_query) |
-                models.Q(phoneNumber__icontains=search_query) |
-                models.Q(serviceType__icontains=search_query) |
-                models.Q(message__icontains=search_query)
-            )
-        
-        return queryset.order_by('-created_at')
+        return filter_enquiries(super().get_queryset(), self.request.query_params)
+
+    def get_archived_queryset(self):
+        return filter_enquiries(ArchivedEnquiry.objects.all(), self.request.query_params)
+
+    def list(self, request, *args, **kwargs):
+        if not include_archived(request):
+            return super().list(request, *args, **kwargs)
+
+        def read():
+            reader = self.get_values_reader()
+            # Archived enquiries are all older than live ones, so appending
+            # them keeps the newest-first order.
+            return reader.read(self.get_queryset()) + reader.read(self.get_archived_queryset())
 
+        return self.versioned_response(lambda: self.cached_read(read))
+
+    @idempotent
     def create(self, request, *args, **kwargs):
+        if not isinstance(request.data, dict):
+            return Response({'error': 'Expected a JSON object.'}, status=status.HTTP_400_BAD_REQUEST)
+        # Cheap pre-filter before reCAPTCHA, the insert and the emails
+        enquiry_prefilter.record('checked')
+        reason = enquiry_prefilter.spam_reason(request.data)
+        if reason:
+            enquiry_prefilter.record('spam_' + reason)
+            logger.warning("Enquiry rejected by spam rule: %s", reason)
+            return Response(
+                {'error': 'Your enquiry could not be accepted.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        fingerprint = enquiry_prefilter.fingerprint(request.data)
+        original_id = enquiry_prefilter.claim(fingerprint)
+        if original_id == PENDING:
+            enquiry_prefilter.record('pending_duplicates')
+            return Response(
+                {'error': 'This enquiry is already being processed.'},
+                status=status.HTTP_409_CONFLICT
+            )
+        if original_id is not None:
+            original = Enquiry.objects.filter(pk=original_id).first()
+            if original is not None:
+                enquiry_prefilter.record('duplicates')
+                logger.info("Duplicate enquiry short-circuited to ID: %s", original_id)
+                if prefers_minimal(request):
+                    return minimal_response(original, status.HTTP_201_CREATED)
+                return Response(self.get_serializer(original).data, status=status.HTTP_201_CREATED)
+
+        try:
+            response = self.create_enquiry(request)
+        except BaseException:
+            enquiry_prefilter.release(fingerprint)
+            raise
+        if response.status_code == status.HTTP_201_CREATED:
+            enquiry_prefilter.complete(fingerprint, response.data['id'])
+            enquiry_prefilter.record('accepted')
+        else:
+            enquiry_prefilter.release(fingerprint)
+        return response
+
+    def create_enquiry(self, request):
+        # Only enquiry submissions need the HTTP client and the mail code.
+        import requests
+        from .notifications import enquiry_notifier
+
         # Validate reCAPTCHA
         recaptcha_token = request.data.get('recaptchaToken')
         if not recaptcha_token:
@@ -170,13 +157,13 @@ class EnquiryListCreate(generics.ListCreateAPIView):
             recaptcha_data = recaptcha_response.json()
             
             if not recaptcha_data.get('success') or recaptcha_data.get('score', 0) < 0.5:
-                logger.warning(f"reCAPTCHA verification failed: {recaptcha_data}")
+                logger.warning("reCAPTCHA verification failed: %s", recaptcha_data)
                 return Response(
                     {'error': 'reCAPTCHA verification failed. Please refresh the page.'},
                     status=status.HTTP_400_BAD_REQUEST
                 )
         except requests.RequestException as e:
-            logger.error(f"reCAPTCHA verification error: {str(e)}")
+            logger.error("reCAPTCHA verification error: %s", e)
             return Response(
                 {'error': 'Failed to verify reCAPTCHA. Please refresh the page.'},
                 status=status.HTTP_503_SERVICE_UNAVAILABLE
@@ -190,9 +177,12 @@ class EnquiryListCreate(generics.ListCreateAPIView):
             self.perform_create(serializer)
             enquiry_data = serializer.validated_data
             
-            # Send emails
-            send_enquiry_emails(enquiry_data)
+            # Send emails in the background
+            enquiry_notifier.notify(serializer.instance, enquiry_data)
             
+            if prefers_minimal(request):
+                return minimal_response(serializer.instance, status.HTTP_201_CREATED)
+
             headers = self.get_success_headers(serializer.data)
             return Response(
                 serializer.data,
@@ -201,23 +191,35 @@ class EnquiryListCreate(generics.ListCreateAPIView):
             )
             
         except Exception as e:
-            logger.error(f"Failed to process enquiry: {str(e)}", exc_info=True)
+            logger.error("Failed to process enquiry: %s", e, exc_info=True)
             return Response(
                 {'error': 'An error occurred while processing your enquiry. Please try again later.'},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
 class EnquiryDelete(generics.DestroyAPIView):
+    """
+    Delete a live or archived enquiry; archived enquiries keep their id, so
+    any id from the list (`include_archived` or not) can be deleted.
+    """
     queryset = Enquiry.objects.all()
     serializer_class = EnquirySerializer
     permission_classes = [IsAdmin]  
 
+    def get_object(self):
+        for queryset in (self.get_queryset(), ArchivedEnquiry.objects.all()):
+            instance = queryset.filter(pk=self.kwargs['pk']).first()
+            if instance is not None:
+                self.check_object_permissions(self.request, instance)
+                return instance
+        raise Http404
+
     def perform_destroy(self, instance):
         try:
             instance.delete()
-            logger.info(f"Deleted enquiry ID: {instance.id}")
+            logger.info("Deleted enquiry ID: %s", instance.id)
         except Exception as e:
-            logger.error(f"Failed to delete enquiry ID: {instance.id}: {str(e)}")
+            logger.error("Failed to delete enquiry ID: %s: %s", instance.id, e)
             raise
 
 class EnquiryDeleteAll(generics.GenericAPIView):
@@ -225,19 +227,63 @@ class EnquiryDeleteAll(generics.GenericAPIView):
 
     def delete(self, request, *args, **kwargs):
         try:
+            EnquiryDigestEntry.objects.all().delete()
             count, _ = Enquiry.objects.all().delete()
-            logger.info(f"Deleted all enquiries: {count} records removed")
+            archived_count, _ = ArchivedEnquiry.objects.all().delete()
+            count += archived_count
+            logger.info("Deleted all enquiries: %s records removed", count)
             return Response(
                 {'message': f'Successfully deleted {count} enquiries'},
                 status=status.HTTP_204_NO_CONTENT
             )
         except Exception as e:
-            logger.error(f"Failed to delete all enquiries: {str(e)}")
+            logger.error("Failed to delete all enquiries: %s", e)
             return Response(
                 {'error': 'Failed to delete enquiries'},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+class EnquiryFilterStats(APIView):
+    """Counts of enquiry pre-filter outcomes."""
+    permission_classes = [IsAdmin]
+
+    def get(self, request, *args, **kwargs):
+        return Response(enquiry_prefilter.stats())
+
+EXPORT_FIELDS = [name for name in EnquiryValuesReader.fields if name != 'recaptchaToken']
+
+def iter_enquiry_rows(querysets, chunk_size=1000):
+    """
+    Yield EXPORT_FIELDS rows (API representation) from each queryset in
+    turn, newest first, reading id-keyset chunks from a replica.
+    """
+    reader = EnquiryValuesReader(fields=EXPORT_FIELDS)
+    for queryset in querysets:
+        queryset = queryset.order_by('-id')
+        last_id = None
+        while True:
+            chunk = queryset if last_id is None else queryset.filter(id__lt=last_id)
+            with read_from_replica():
+                rows = reader.read(chunk[:chunk_size])
+            if not rows:
+                break
+            for row in rows:
+                yield [row[name] for name in EXPORT_FIELDS]
+            last_id = rows[-1]['id']
+
+class EnquiryExport(APIView):
+    """
+    Stream enquiries as CSV. Takes the list's filters, including
+    `include_archived`.
+    """
+    permission_classes = [IsAdmin]
+
+    def get(self, request, *args, **kwargs):
+        querysets = [filter_enquiries(Enquiry.objects.all(), request.query_params)]
+        if include_archived(request):
+            querysets.append(filter_enquiries(ArchivedEnquiry.objects.all(), request.query_params))
+        return streaming_csv_response(EXPORT_FIELDS, iter_enquiry_rows(querysets), 'enquiries.csv')
+
 from rest_framework.permissions import BasePermission
 
 class IsAdmin(BasePermission):
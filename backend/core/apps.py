@@ -0,0 +1,16 @@
+from django.apps import AppConfig
+
+
+class CoreConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'core'
+
+    def ready(self):
+        from add_customers.models import AddCustomer
+        from add_jobs.models import Job, RateBreak, RateCard, StatusUpdate
+        from contact.models import ArchivedEnquiry, Enquiry
+        from .cache import connect_invalidation_signals
+
+        connect_invalidation_signals(Job, StatusUpdate, AddCustomer, RateCard, RateBreak)
+        # Enquiries are deleted in bulk; their querysets bump the tag instead.
+        connect_invalidation_signals(Enquiry, ArchivedEnquiry, deletes=False)
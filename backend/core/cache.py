@@ -0,0 +1,354 @@
+"""
+Tiered cache with tag-based invalidation.
+
+Values live in the shared `default` cache (Redis in production, local
+memory when REDIS_URL is unset) with a small per-process LRU in front of it.
+
+Every entry records the versions of its tags when it was stored. A tag's
+version is bumped whenever a model it covers is saved or deleted (see
+`connect_invalidation_signals`), which makes all entries stored under the
+old version misses without having to know their keys. Inside a transaction
+the bump waits for the commit, so nothing can cache rows that are not yet
+visible under the new version, and happens once per tag however many rows
+changed. The local tier keeps
+entries and tag versions for at most CACHE_LOCAL_TTL seconds, which bounds
+how long another process's invalidation takes to be seen here; this
+process's own invalidations apply immediately.
+
+`get_or_set` protects hot keys from stampedes: one caller per key computes
+the value while the others wait briefly for it.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import models, transaction
+from django.db.models.signals import post_delete, post_save
+
+_MISSING = object()
+
+
+class LocalLRU:
+    """Thread-safe in-process LRU with a per-entry expiry."""
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return _MISSING
+            expires, value = item
+            if expires < time.monotonic():
+                del self._items[key]
+                return _MISSING
+            self._items.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        expires = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._items[key] = (expires, value)
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._items.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+
+class TieredCache:
+    def __init__(self, alias='default', local_size=1000, local_ttl=2, lock_timeout=10, wait_timeout=5,
+                 recent_window=60):
+        self.alias = alias
+        self.recent_window = recent_window
+        self.local = LocalLRU(local_size, local_ttl)
+        self.lock_timeout = lock_timeout
+        self.wait_timeout = wait_timeout
+        self._key_locks = {}
+        self._key_locks_lock = threading.Lock()
+        self._stats = dict.fromkeys(
+            ('local_hits', 'shared_hits', 'misses', 'sets', 'invalidations', 'lock_waits'), 0
+        )
+
+    @property
+    def shared(self):
+        return caches[self.alias]
+
+    # Tags
+
+    def tag_versions(self, tags):
+        """Return {tag: version}, reading through the local tier."""
+        versions, missing = {}, []
+        for tag in tags:
+            version = self.local.get(self._tag_key(tag))
+            if version is _MISSING:
+                missing.append(tag)
+            else:
+                versions[tag] = version
+        if missing:
+            stored = self.shared.get_many([self._tag_key(tag) for tag in missing])
+            for tag in missing:
+                key = self._tag_key(tag)
+                version = stored.get(key)
+                if version is None:
+                    # Seed from the clock rather than 1 so a tag evicted from
+                    # the shared cache can never come back at an old version.
+                    self.shared.add(key, self._new_version(), timeout=None)
+                    version = self.shared.get(key)
+                versions[tag] = version
+                self.local.set(key, version)
+        return versions
+
+    def invalidate_tags(self, *tags):
+        for tag in tags:
+            key = self._tag_key(tag)
+            try:
+                version = self.shared.incr(key)
+            except ValueError:
+                version = self._new_version()
+                self.shared.set(key, version, timeout=None)
+            self.local.set(key, version)
+            self.shared.set(self._invalidated_key(tag), time.time(), timeout=self.recent_window)
+            self._count('invalidations')
+
+    def invalidated_within(self, tags, seconds):
+        """Whether any of `tags` was invalidated in the last `seconds` seconds."""
+        stamps = self.shared.get_many([self._invalidated_key(tag) for tag in tags])
+        cutoff = time.time() - seconds
+        return any(stamp > cutoff for stamp in stamps.values())
+
+    # Values
+
+    def get(self, key, default=None):
+        value = self._get(key)
+        return default if value is _MISSING else value
+
+    def set(self, key, value, timeout=None, tags=(), versions=None):
+        """
+        Store a value under the current versions of `tags`. Pass `versions`
+        read before computing the value so an invalidation during the
+        computation is not masked.
+        """
+        timeout = settings.CACHE_DEFAULT_TIMEOUT if timeout is None else timeout
+        entry = (self.tag_versions(tags) if versions is None else versions, value)
+        self.shared.set(self._value_key(key), entry, timeout=timeout)
+        self.local.set(self._value_key(key), entry, ttl=min(self.local.ttl, timeout))
+        self._count('sets')
+
+    def get_many(self, keys):
+        """
+        Return {key: value} for the keys that are cached and fresh, reading
+        every local miss from the shared cache in one round trip.
+        """
+        entries = {}
+        shared_keys = []
+        for key in keys:
+            entry = self.local.get(self._value_key(key))
+            if entry is _MISSING:
+                shared_keys.append(key)
+            else:
+                entries[key] = (entry, 'local_hits')
+        if shared_keys:
+            stored = self.shared.get_many([self._value_key(key) for key in shared_keys])
+            for key in shared_keys:
+                entry = stored.get(self._value_key(key), _MISSING)
+                if entry is not _MISSING:
+                    entries[key] = (entry, 'shared_hits')
+        values = {}
+        for key in keys:
+            entry, tier = entries.get(key, (_MISSING, None))
+            if entry is _MISSING or not self._fresh(entry[0]):
+                self._count('misses')
+                continue
+            if tier == 'shared_hits':
+                self.local.set(self._value_key(key), entry)
+            self._count(tier)
+            values[key] = entry[1]
+        return values
+
+    def set_many(self, mapping, timeout=None, tags=(), versions=None):
+        """`set` for several values, written to the shared cache in one round trip."""
+        timeout = settings.CACHE_DEFAULT_TIMEOUT if timeout is None else timeout
+        versions = self.tag_versions(tags) if versions is None else versions
+        entries = {self._value_key(key): (versions, value) for key, value in mapping.items()}
+        self.shared.set_many(entries, timeout=timeout)
+        for value_key, entry in entries.items():
+            self.local.set(value_key, entry, ttl=min(self.local.ttl, timeout))
+        self._stats['sets'] += len(entries)
+
+    def delete(self, key):
+        self.shared.delete(self._value_key(key))
+        self.local.delete(self._value_key(key))
+
+    def get_or_set(self, key, compute, timeout=None, tags=()):
+        """
+        Return the cached value or compute and store it, letting only one
+        caller per key compute at a time (per process and across processes).
+        """
+        value = self._get(key)
+        if value is not _MISSING:
+            return value
+
+        with self._key_lock(key):
+            value = self._get(key, count=False)
+            if value is not _MISSING:
+                return value
+
+            lock_key = 'lock:' + self._value_key(key)
+            locked = self.shared.add(lock_key, 1, timeout=self.lock_timeout)
+            if not locked:
+                value = self._wait_for(key)
+                if value is not _MISSING:
+                    return value
+            try:
+                versions = self.tag_versions(tags)
+                value = compute()
+                self.set(key, value, timeout=timeout, versions=versions)
+            finally:
+                # The lock still belongs to the other process if we timed out waiting.
+                if locked:
+                    self.shared.delete(lock_key)
+        return value
+
+    def stats(self):
+        stats = dict(self._stats)
+        lookups = stats['local_hits'] + stats['shared_hits'] + stats['misses']
+        stats['hit_ratio'] = round((stats['local_hits'] + stats['shared_hits']) / lookups, 4) if lookups else None
+        return stats
+
+    def _get(self, key, count=True):
+        value_key = self._value_key(key)
+        entry = self.local.get(value_key)
+        tier = 'local_hits'
+        if entry is _MISSING:
+            entry = self.shared.get(value_key, _MISSING)
+            tier = 'shared_hits'
+        if entry is _MISSING or not self._fresh(entry[0]):
+            if count:
+                self._count('misses')
+            return _MISSING
+        if tier == 'shared_hits':
+            self.local.set(value_key, entry)
+        if count:
+            self._count(tier)
+        return entry[1]
+
+    def _fresh(self, stored_versions):
+        return not stored_versions or self.tag_versions(stored_versions) == stored_versions
+
+    def _wait_for(self, key):
+        """Poll for a value another process is computing."""
+        self._count('lock_waits')
+        deadline = time.monotonic() + self.wait_timeout
+        delay = 0.01
+        while time.monotonic() < deadline:
+            time.sleep(delay)
+            delay = min(delay * 2, 0.2)
+            value = self._get(key, count=False)
+            if value is not _MISSING:
+                return value
+        return _MISSING
+
+    def _key_lock(self, key):
+        with self._key_locks_lock:
+            lock = self._key_locks.get(key)
+            if lock is None:
+                if len(self._key_locks) > 10000:
+                    self._key_locks.clear()
+                lock = self._key_locks[key] = threading.Lock()
+            return lock
+
+    def _count(self, name):
+        self._stats[name] += 1
+
+    def _new_version(self):
+        return time.time_ns() // 1000
+
+    def _tag_key(self, tag):
+        return 'tag:' + tag
+
+    def _value_key(self, key):
+        return 'val:' + key
+
+    def _invalidated_key(self, tag):
+        return 'inval:' + tag
+
+
+cache = TieredCache(
+    local_size=getattr(settings, 'CACHE_LOCAL_SIZE', 1000),
+    local_ttl=getattr(settings, 'CACHE_LOCAL_TTL', 2),
+)
+
+
+def model_tag(model):
+    """Tag covering every row of a model, e.g. 'add_jobs.job'."""
+    return model._meta.label_lower
+
+
+class _TagBatch:
+    """on_commit callback bumping the tags collected during one transaction."""
+
+    def __init__(self):
+        self.tags = set()
+
+    def __call__(self):
+        cache.invalidate_tags(*sorted(self.tags))
+
+
+def invalidate_on_commit(tags, using=None):
+    """
+    Bump `tags` when the current transaction commits, once per tag per
+    transaction, or at once outside a transaction.
+    """
+    connection = transaction.get_connection(using)
+    if not connection.in_atomic_block:
+        cache.invalidate_tags(*tags)
+        return
+    # A batch registered in a savepoint that was rolled back is discarded
+    # with it, so later changes start a new one.
+    batch = next((func for sids, func, robust in connection.run_on_commit if isinstance(func, _TagBatch)), None)
+    if batch is None:
+        batch = _TagBatch()
+        transaction.on_commit(batch, using=using, robust=True)
+    batch.tags.update(tags)
+
+
+class InvalidatingQuerySet(models.QuerySet):
+    """
+    For models connected with `deletes=False`: bumps the model's tag once per
+    delete() instead of through per-row signals, which would stop Django
+    from deleting in bulk without loading the rows.
+    """
+
+    def delete(self):
+        result = super().delete()
+        invalidate_on_commit([model_tag(self.model)], using=self.db)
+        return result
+
+
+def connect_invalidation_signals(*models, deletes=True):
+    """
+    Bump a model's tag whenever one of its rows is saved or, with
+    `deletes`, deleted. Models connected without it must bump the tag on
+    their own delete paths (see InvalidatingQuerySet).
+    """
+    for model in models:
+        post_save.connect(_invalidate_model, sender=model, dispatch_uid=f'cache-{model_tag(model)}-save')
+        if deletes:
+            post_delete.connect(_invalidate_model, sender=model, dispatch_uid=f'cache-{model_tag(model)}-delete')
+
+
+def _invalidate_model(sender, using=None, **kwargs):
+    invalidate_on_commit([model_tag(sender)], using=using)
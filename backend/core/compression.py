@@ -0,0 +1,178 @@
+"""
+Negotiated gzip/brotli/zstd compression for API responses.
+
+Responses to anonymous GET requests (public tracking lookups, the API
+schema) are cacheable, so their compressed bodies are kept in a small
+in-process LRU keyed by a digest of the uncompressed body and reused
+instead of being recompressed.
+
+Responses to authenticated requests can carry secrets next to reflected
+input, which makes them BREACH targets. They are only gzip-compressed, with
+Django's random-length filename padding ("Heal The Breach"), and never
+cached.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.text import compress_string
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+def _gzip(content):
+    return compress_string(content)
+
+
+def _brotli(content):
+    return brotli.compress(content, quality=5)
+
+
+def _zstd(content):
+    return zstandard.ZstdCompressor(level=6).compress(content)
+
+
+CODECS = {'gzip': _gzip}
+if brotli is not None:
+    CODECS['br'] = _brotli
+if zstandard is not None:
+    CODECS['zstd'] = _zstd
+
+COMPRESSIBLE_TYPES = ('text/', 'application/json', 'application/javascript', 'application/xml')
+COMPRESSIBLE_SUFFIXES = ('+json', '+xml')
+
+
+def parse_accept_encoding(header):
+    """Return {coding: q} from an Accept-Encoding header value."""
+    accepted = {}
+    for item in header.split(','):
+        coding, _, params = item.strip().partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[coding] = q
+    return accepted
+
+
+def negotiate_encoding(header, available):
+    """
+    Pick the coding from `available` (in server preference order) with the
+    highest q-value in the Accept-Encoding header, or None.
+    """
+    accepted = parse_accept_encoding(header)
+    wildcard = accepted.get('*', 0.0)
+    best, best_q = None, 0.0
+    for coding in available:
+        q = accepted.get(coding, wildcard)
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+class CompressedBodyCache:
+    """Thread-safe LRU of compressed bodies keyed by (coding, body digest)."""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_compress(self, coding, content):
+        key = (coding, hashlib.blake2b(content, digest_size=16).digest())
+        with self._lock:
+            body = self._items.get(key)
+            if body is not None:
+                self._items.move_to_end(key)
+                return body
+        body = CODECS[coding](content)
+        with self._lock:
+            self._items[key] = body
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+        return body
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """
+    Compress non-streaming responses above COMPRESSION_MIN_SIZE using the best
+    coding the client accepts from COMPRESSION_ENCODINGS.
+    """
+    max_random_bytes = 100
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.min_size = getattr(settings, 'COMPRESSION_MIN_SIZE', 1024)
+        self.encodings = [
+            coding for coding in getattr(settings, 'COMPRESSION_ENCODINGS', ('br', 'zstd', 'gzip'))
+            if coding in CODECS
+        ]
+        self.cache = CompressedBodyCache(getattr(settings, 'COMPRESSION_CACHE_SIZE', 128))
+
+    def process_response(self, request, response):
+        if response.streaming or response.has_header('Content-Encoding'):
+            return response
+        if len(response.content) < self.min_size or not self.is_compressible(response):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+
+        authenticated = self.is_authenticated(request)
+        available = ['gzip'] if authenticated else self.encodings
+        coding = negotiate_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''), available)
+        if coding is None:
+            return response
+
+        if authenticated:
+            compressed = compress_string(response.content, max_random_bytes=self.max_random_bytes)
+        elif self.is_cacheable(request, response):
+            compressed = self.cache.get_or_compress(coding, response.content)
+        else:
+            compressed = CODECS[coding](response.content)
+
+        if len(compressed) >= len(response.content):
+            return response
+        response.content = compressed
+        response.headers['Content-Length'] = str(len(compressed))
+        response.headers['Content-Encoding'] = coding
+
+        # Compressed bodies are no longer byte-identical to the original, so
+        # a strong ETag must become weak (RFC 9110 8.8.1).
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        return response
+
+    def is_compressible(self, response):
+        content_type = response.get('Content-Type', '').split(';')[0].strip().lower()
+        return content_type.startswith(COMPRESSIBLE_TYPES) or content_type.endswith(COMPRESSIBLE_SUFFIXES)
+
+    def is_authenticated(self, request):
+        """JWT-authenticated API calls or a logged-in admin session."""
+        return bool(
+            request.META.get('HTTP_AUTHORIZATION')
+            or request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+        )
+
+    def is_cacheable(self, request, response):
+        if request.method not in ('GET', 'HEAD') or response.status_code != 200:
+            return False
+        cache_control = response.get('Cache-Control', '').lower()
+        return 'private' not in cache_control and 'no-store' not in cache_control
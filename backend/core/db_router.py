@@ -0,0 +1,180 @@
+"""
+Read-replica routing.
+
+Reads go to a replica only inside `read_from_replica()`, which the safe
+read paths (list/retrieve endpoints, tracking lookups, exports) opt into.
+Everything else, including any read after a write in the same request or,
+for REPLICA_PIN_SECONDS, from the same client, stays on the primary.
+
+Replicas whose replication lag exceeds REPLICA_MAX_LAG_SECONDS, or which
+cannot be reached, are skipped until the next lag check; when none are
+usable reads fall back to the primary.
+
+With no DB_REPLICA_HOSTS, settings define a 'replica_local' alias on the
+primary (a test mirror of 'default'), so all of this runs locally with two
+aliases.
+"""
+import contextvars
+import hashlib
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+logger = logging.getLogger(__name__)
+
+
+class RoutingState:
+    """Per-request routing flags."""
+
+    def __init__(self, pinned=False):
+        self.pinned = pinned
+        self.wrote = False
+        self.replica_reads = 0
+
+
+_state = contextvars.ContextVar('db_routing_state', default=None)
+_replica_allowed = contextvars.ContextVar('db_replica_allowed', default=False)
+
+
+@contextmanager
+def read_from_replica():
+    """Allow the reads inside the block to be served by a replica."""
+    token = _replica_allowed.set(True)
+    try:
+        yield
+    finally:
+        _replica_allowed.reset(token)
+
+
+# Replication status queries, newest first: MySQL 8.0.22 renamed SLAVE to
+# REPLICA and Master to Source, and older servers only know the old names.
+LAG_QUERIES = (
+    ('SHOW REPLICA STATUS', 'Seconds_Behind_Source'),
+    ('SHOW SLAVE STATUS', 'Seconds_Behind_Master'),
+)
+
+
+def mirrors_primary(alias):
+    """Whether `alias` connects to the primary itself, like 'replica_local'."""
+    primary = connections[DEFAULT_DB_ALIAS].settings_dict
+    replica = connections[alias].settings_dict
+    return all(replica.get(key) == primary.get(key) for key in ('HOST', 'PORT', 'NAME'))
+
+
+class ReplicaHealth:
+    """Caches per-replica lag checks for REPLICA_LAG_CHECK_INTERVAL seconds."""
+
+    def __init__(self):
+        self._checked = {}
+        self._lock = threading.Lock()
+
+    def is_usable(self, alias):
+        now = time.monotonic()
+        checked = self._checked.get(alias)
+        if checked is not None and now - checked[0] < settings.REPLICA_LAG_CHECK_INTERVAL:
+            return checked[1]
+        with self._lock:
+            usable = self._check(alias)
+            self._checked[alias] = (now, usable)
+        return usable
+
+    def _check(self, alias):
+        lag = self.replication_lag(alias)
+        if lag is None or lag > settings.REPLICA_MAX_LAG_SECONDS:
+            logger.warning("Replica %s skipped, replication lag: %s", alias, lag)
+            return False
+        return True
+
+    def replication_lag(self, alias):
+        """Seconds behind the primary, or None if unknown or unreachable."""
+        connection = connections[alias]
+        if connection.vendor != 'mysql' or mirrors_primary(alias):
+            return 0
+        error = None
+        for query, column in LAG_QUERIES:
+            try:
+                with connection.cursor() as cursor:
+                    cursor.execute(query)
+                    row = cursor.fetchone()
+                    columns = [description[0] for description in cursor.description or ()]
+            except DatabaseError as exc:
+                error = exc
+                continue
+            if row is None:
+                logger.warning("Replica %s lag unknown: %s returned no replication status", alias, query)
+                return None
+            lag = dict(zip(columns, row)).get(column)
+            if lag is None:
+                logger.warning("Replica %s lag unknown: replication is not running", alias)
+            return lag
+        logger.warning("Replica %s lag check failed: %s", alias, error)
+        return None
+
+
+replica_health = ReplicaHealth()
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        replicas = getattr(settings, 'DATABASE_REPLICAS', ())
+        state = _state.get()
+        if not replicas or not _replica_allowed.get():
+            return DEFAULT_DB_ALIAS
+        if state is not None and (state.pinned or state.wrote):
+            return DEFAULT_DB_ALIAS
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        usable = [alias for alias in replicas if replica_health.is_usable(alias)]
+        if not usable:
+            return DEFAULT_DB_ALIAS
+        if state is not None:
+            state.replica_reads += 1
+        return random.choice(usable)
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+class ReplicaPinningMiddleware:
+    """
+    Track writes per request and pin the client to the primary for
+    REPLICA_PIN_SECONDS after one, so it reads its own writes. Clients are
+    identified by their Authorization header or, failing that, their address.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'DATABASE_REPLICAS', ()):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        pin_key = self.pin_key(request)
+        state = RoutingState(pinned=bool(caches['default'].get(pin_key)))
+        token = _state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.reset(token)
+        if state.wrote:
+            caches['default'].set(pin_key, 1, timeout=settings.REPLICA_PIN_SECONDS)
+        return response
+
+    def pin_key(self, request):
+        client = request.META.get('HTTP_AUTHORIZATION') or request.META.get('REMOTE_ADDR', '')
+        return 'dbpin:' + hashlib.sha256(client.encode()).hexdigest()[:32]
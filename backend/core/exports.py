@@ -0,0 +1,26 @@
+"""
+Streaming CSV responses.
+"""
+import csv
+
+from django.http import StreamingHttpResponse
+
+
+class Echo:
+    """File-like object whose write() returns the value, for streaming csv.writer output."""
+    def write(self, value):
+        return value
+
+
+def streaming_csv_response(header, rows, filename):
+    """Stream `header` and then each row of the `rows` iterable as a CSV attachment."""
+    writer = csv.writer(Echo())
+
+    def lines():
+        yield writer.writerow(header)
+        for row in rows:
+            yield writer.writerow(row)
+
+    response = StreamingHttpResponse(lines(), content_type='text/csv')
+    response['Content-Disposition'] = 'attachment; filename="%s"' % filename
+    return response
@@ -0,0 +1,227 @@
+"""
+`Idempotency-Key` support for POST endpoints.
+
+A client that may retry a POST sends a unique `Idempotency-Key` header. The
+first request with a key claims it by inserting a pending IdempotencyRecord,
+runs the view and stores the final response; retries with the same key and
+the same body get that response back (with `Idempotent-Replayed: true`)
+without the view running again, so no second row, reCAPTCHA call or email.
+
+- A retry that arrives while the original is still running waits up to
+  IDEMPOTENCY_WAIT_SECONDS for its result, then gets 409 with Retry-After.
+- Reusing a key with a different body is rejected with 422.
+- Server errors, 409, 429 and errors raised as exceptions (such as
+  validation errors) are not stored: the claim is released so a retry runs
+  again. A pending claim whose worker died is taken over by the next retry
+  after IDEMPOTENCY_LOCK_SECONDS; the original then neither stores nor
+  releases it.
+- Records are kept for IDEMPOTENCY_KEY_TTL seconds; expired ones are
+  ignored and removed in batches by `manage.py purge_idempotency_keys`.
+
+Keys are scoped to the endpoint path and the authenticated user or, for
+anonymous requests, the client address (as used for throttling) and user
+agent.
+"""
+import functools
+import hashlib
+import json
+import logging
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.throttling import BaseThrottle
+
+from .models import IdempotencyRecord
+
+logger = logging.getLogger(__name__)
+
+HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+STORED_HEADERS = ('Location', 'Preference-Applied')
+
+
+def request_scope(request):
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        owner = user.pk
+    else:
+        # Anonymous clients must not replay each other's responses.
+        owner = 'anon:%s:%s' % (BaseThrottle().get_ident(request), request.META.get('HTTP_USER_AGENT', ''))
+    return hashlib.sha256(f'{request.method} {request.path} {owner}'.encode()).hexdigest()
+
+
+def request_fingerprint(request):
+    data = request.data
+    if hasattr(data, 'lists'):
+        data = dict(data.lists())
+    body = json.dumps(data, sort_keys=True, default=str)
+    return hashlib.sha256(body.encode()).hexdigest()
+
+
+def _error(message, status_code, **headers):
+    response = Response({'error': message}, status=status_code)
+    for name, value in headers.items():
+        response[name] = value
+    return response
+
+
+def claim(scope, key, fingerprint):
+    """
+    Claim `key` for this request. Returns (record, True) when the caller
+    should run the view, or (record, False) for an existing unexpired record.
+    """
+    now = timezone.now()
+    record = IdempotencyRecord(
+        scope=scope,
+        key=key,
+        fingerprint=fingerprint,
+        locked_until=now + timedelta(seconds=settings.IDEMPOTENCY_LOCK_SECONDS),
+        expires_at=now + timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL),
+    )
+    try:
+        with transaction.atomic():
+            record.save(force_insert=True)
+        return record, True
+    except IntegrityError:
+        pass
+
+    existing = IdempotencyRecord.objects.filter(scope=scope, key=key).first()
+    if existing is None:
+        # Deleted between the insert and the read (released or purged).
+        return claim(scope, key, fingerprint)
+    if existing.expires_at <= now or (existing.state == IdempotencyRecord.PENDING and existing.locked_until <= now):
+        # Take over an expired record or a stale claim, unless another
+        # request just did.
+        taken = IdempotencyRecord.objects.filter(
+            pk=existing.pk, state=existing.state, locked_until=existing.locked_until,
+        ).update(
+            fingerprint=fingerprint, state=IdempotencyRecord.PENDING, status_code=None,
+            response_data=None, response_headers={},
+            locked_until=record.locked_until, expires_at=record.expires_at,
+        )
+        try:
+            existing.refresh_from_db()
+        except IdempotencyRecord.DoesNotExist:
+            # Released or purged since the read.
+            return claim(scope, key, fingerprint)
+        return existing, bool(taken)
+    return existing, False
+
+
+def wait_for(record):
+    """Poll a pending record until it completes, is released or the wait runs out."""
+    deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT_SECONDS
+    delay = 0.05
+    while record is not None and record.state == IdempotencyRecord.PENDING and time.monotonic() < deadline:
+        time.sleep(delay)
+        delay = min(delay * 2, 0.5)
+        record = IdempotencyRecord.objects.filter(pk=record.pk).first()
+    return record
+
+
+def _claimed(record):
+    """The record, while this request's claim on it has not been taken over."""
+    return IdempotencyRecord.objects.filter(
+        pk=record.pk, state=IdempotencyRecord.PENDING, locked_until=record.locked_until,
+    )
+
+
+def store(record, response):
+    if response.status_code >= 500 or response.status_code in (status.HTTP_409_CONFLICT, status.HTTP_429_TOO_MANY_REQUESTS):
+        release(record)
+        return
+    headers = {name: response[name] for name in STORED_HEADERS if response.has_header(name)}
+    try:
+        stored = _claimed(record).update(
+            state=IdempotencyRecord.COMPLETE,
+            status_code=response.status_code,
+            response_data=response.data,
+            response_headers=headers,
+        )
+    except Exception:
+        # The view's work is done; a failure here only costs retries a rerun.
+        logger.error("Failed to store idempotent response for key %s", record.key, exc_info=True)
+        release(record)
+        return
+    if not stored:
+        # The claim outlived IDEMPOTENCY_LOCK_SECONDS and a retry took it over.
+        logger.warning("Idempotency key %s was taken over; response not stored", record.key)
+
+
+def release(record):
+    _claimed(record).delete()
+
+
+def replay(record):
+    response = Response(record.response_data, status=record.status_code)
+    for name, value in record.response_headers.items():
+        response[name] = value
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def idempotent(view_method):
+    """Honour the `Idempotency-Key` header on a DRF view's create/post method."""
+
+    @functools.wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if key is None:
+            return view_method(self, request, *args, **kwargs)
+        key = key.strip()
+        if not key or len(key) > MAX_KEY_LENGTH:
+            return _error(f'{HEADER} must be 1 to {MAX_KEY_LENGTH} characters.', status.HTTP_400_BAD_REQUEST)
+
+        fingerprint = request_fingerprint(request)
+        record, claimed = claim(request_scope(request), key, fingerprint)
+        if not claimed:
+            if record.fingerprint != fingerprint:
+                return _error(
+                    f'This {HEADER} was already used with a different request.',
+                    status.HTTP_422_UNPROCESSABLE_ENTITY,
+                )
+            record = wait_for(record)
+            if record is None:
+                # The original failed and released its claim: run again.
+                return wrapper(self, request, *args, **kwargs)
+            if record.state == IdempotencyRecord.PENDING:
+                return _error(
+                    'A request with this Idempotency-Key is still being processed.',
+                    status.HTTP_409_CONFLICT,
+                    **{'Retry-After': '1'},
+                )
+            return replay(record)
+
+        try:
+            response = view_method(self, request, *args, **kwargs)
+        except BaseException:
+            release(record)
+            raise
+        store(record, response)
+        return response
+
+    return wrapper
+
+
+def purge_expired(batch_size=1000, max_seconds=60):
+    """
+    Delete expired records in batches until none are left or `max_seconds`
+    has passed. Returns the number deleted.
+    """
+    now = timezone.now()
+    deadline = time.monotonic() + max_seconds
+    purged = 0
+    while time.monotonic() < deadline:
+        ids = list(
+            IdempotencyRecord.objects.filter(expires_at__lte=now)
+            .order_by('expires_at').values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            break
+        purged += IdempotencyRecord.objects.filter(id__in=ids).delete()[0]
+    return purged
@@ -0,0 +1,55 @@
+"""
+Pluggable JSON backend used by the API renderer and parser.
+
+orjson is used when it is installed and JSON_BACKEND is 'orjson', otherwise
+everything falls back to the stdlib json module with DRF's encoder.
+"""
+import json
+
+from django.conf import settings
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+ORJSON_OPTIONS = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS if orjson else 0
+
+_drf_encoder = JSONEncoder()
+
+
+def use_orjson():
+    """Return True when the orjson backend is available and enabled."""
+    return orjson is not None and getattr(settings, 'JSON_BACKEND', 'orjson') == 'orjson'
+
+
+def _default(obj):
+    """Hand types orjson does not know (Decimal, lazy strings, querysets...) to DRF's encoder."""
+    return _drf_encoder.default(obj)
+
+
+def dumps(data, indent=None):
+    """
+    Serialize data to UTF-8 bytes.
+
+    date, time and datetime values are written natively as ISO 8601, with
+    UTC datetimes using the 'Z' suffix like DRF's DateTimeField.
+    """
+    if use_orjson() and indent in (None, 2):
+        option = ORJSON_OPTIONS | (orjson.OPT_INDENT_2 if indent else 0)
+        return orjson.dumps(data, default=_default, option=option)
+    separators = (',', ':') if indent is None else None
+    return json.dumps(
+        data, cls=JSONEncoder, indent=indent, ensure_ascii=False,
+        separators=separators, allow_nan=False,
+    ).encode('utf-8')
+
+
+def loads(data):
+    """Parse JSON from bytes or str. Raises ValueError on invalid input."""
+    if use_orjson():
+        return orjson.loads(data)
+    if isinstance(data, bytes):
+        data = data.decode('utf-8')
+    return json.loads(data)
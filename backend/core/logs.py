@@ -0,0 +1,188 @@
+"""
+Non-blocking logging pipeline.
+
+Request threads only run the cheap filters (correlation id, sampling) and
+merge the message arguments, then put records on an in-memory queue. A
+single listener thread per process does the formatting, JSON structuring,
+file rotation and writing.
+
+Each process writes its own file (django.<pid>.log), so the size-based
+rotation done by one process's listener never renames a file another
+process is still writing to.
+"""
+import atexit
+import contextvars
+import copy
+import json
+import logging
+import os
+import queue
+import random
+import re
+import uuid
+import zlib
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+request_id_var = contextvars.ContextVar('request_id', default=None)
+
+REQUEST_ID_HEADER = 'X-Request-ID'
+VALID_REQUEST_ID = re.compile(r'^[A-Za-z0-9._-]{1,64}$')
+
+# Attributes every LogRecord has; anything else was passed via `extra=`.
+RESERVED_ATTRS = frozenset(vars(logging.makeLogRecord({}))) | {'message', 'asctime', 'request_id'}
+
+
+def get_request_id():
+    return request_id_var.get()
+
+
+class RequestIDMiddleware:
+    """
+    Bind a correlation id to the request for logging.
+
+    Reuses a well-formed X-Request-ID from the client or proxy, otherwise
+    generates one, and echoes it on the response.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request_id = request.headers.get(REQUEST_ID_HEADER, '')
+        if not VALID_REQUEST_ID.match(request_id):
+            request_id = uuid.uuid4().hex
+        request.request_id = request_id
+        token = request_id_var.set(request_id)
+        try:
+            response = self.get_response(request)
+        finally:
+            request_id_var.reset(token)
+        response[REQUEST_ID_HEADER] = request_id
+        return response
+
+
+class RequestIDFilter(logging.Filter):
+    """Stamp records with the current request's correlation id ('-' outside requests)."""
+
+    def filter(self, record):
+        request_id = request_id_var.get()
+        if request_id is None:
+            # django.request logs the response after the middleware chain has
+            # returned, but passes the request along.
+            request_id = getattr(getattr(record, 'request', None), 'request_id', None)
+        record.request_id = request_id or '-'
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keep only a fraction of records at or below `max_level`.
+
+    Sampling is keyed on the correlation id, so a request's info logs are
+    kept or dropped together. Warnings and errors always pass.
+    """
+
+    def __init__(self, rate=1.0, max_level='INFO'):
+        super().__init__()
+        self.rate = float(rate)
+        self.max_level = logging.getLevelName(max_level) if isinstance(max_level, str) else max_level
+
+    def filter(self, record):
+        if self.rate >= 1.0 or record.levelno > self.max_level:
+            return True
+        request_id = getattr(record, 'request_id', None) or request_id_var.get()
+        if request_id and request_id != '-':
+            return (zlib.crc32(request_id.encode()) % 10000) < self.rate * 10000
+        return random.random() < self.rate
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line, including any `extra=` fields."""
+
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'module': record.module,
+            'request_id': getattr(record, 'request_id', '-'),
+            'message': record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in RESERVED_ATTRS:
+                entry[key] = value
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        if record.stack_info:
+            entry['stack_info'] = self.formatStack(record.stack_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class QueueLogHandler(QueueHandler):
+    """
+    Queue front-end that owns its listener and target handlers.
+
+    Targets are a size-rotated JSON file, used only by the listener thread,
+    and optionally a text console stream. With `per_process`, the process id
+    is added to the file name. The listener is restarted, with its own file,
+    in forked children (e.g. Gunicorn workers of a --preload master) and
+    stopped at exit so queued records are flushed.
+    """
+
+    def __init__(self, filename, max_bytes=10 * 1024 * 1024, backup_count=5, per_process=True,
+                 console=True, console_format='{levelname} {asctime} {request_id} {module} {message}'):
+        super().__init__(queue.SimpleQueue())
+
+        self.filename = os.fspath(filename)
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.per_process = per_process
+        targets = [self._file_handler()]
+        if console:
+            console_handler = logging.StreamHandler()
+            console_handler.setFormatter(logging.Formatter(console_format, style='{'))
+            targets.append(console_handler)
+
+        self.listener = QueueListener(self.queue, *targets, respect_handler_level=True)
+        self.listener.start()
+        atexit.register(self._stop_listener)
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._restart_listener)
+
+    def _file_handler(self):
+        filename = self.filename
+        if self.per_process:
+            root, ext = os.path.splitext(filename)
+            filename = '%s.%d%s' % (root, os.getpid(), ext)
+        handler = RotatingFileHandler(
+            filename, maxBytes=self.max_bytes, backupCount=self.backup_count, encoding='utf-8', delay=True,
+        )
+        handler.setFormatter(JSONFormatter())
+        return handler
+
+    def _restart_listener(self):
+        self.queue = queue.SimpleQueue()
+        self.listener.queue = self.queue
+        if self.per_process:
+            self.listener.handlers = (self._file_handler(),) + self.listener.handlers[1:]
+        self.listener._thread = None
+        self.listener.start()
+
+    def _stop_listener(self):
+        if self.listener._thread is not None:
+            self.listener.stop()
+
+    def prepare(self, record):
+        """
+        Merge the message arguments in the logging thread, so the listener
+        sees them as they were when logged rather than after the caller has
+        changed them. Formatting and I/O are left to the listener.
+        """
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def close(self):
+        self._stop_listener()
+        super().close()
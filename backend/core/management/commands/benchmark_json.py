@@ -0,0 +1,103 @@
+import datetime
+import io
+import timeit
+
+from django.core.management.base import BaseCommand
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from core.parsers import FastJSONParser
+from core.renderers import FastJSONRenderer
+
+
+def build_job_rows(count):
+    """Rows shaped like JobSerializer output for a list of jobs."""
+    today = datetime.date(2025, 5, 22)
+    rows = []
+    for i in range(count):
+        rows.append({
+            'id': i,
+            'cargo_type': 'sea',
+            'customer': {'id': i % 50, 'name': f'Customer {i % 50}'},
+            'receiver_name': f'Receiver {i}',
+            'contact_number': '+97444355663',
+            'email': f'receiver{i}@example.com',
+            'recipient_address': 'Building 12, Street 340, Doha, Qatar',
+            'recipient_country': 'Qatar',
+            'commodity': 'Household goods',
+            'number_of_packages': 12,
+            'weight': 1250.5,
+            'volume': 18.75,
+            'origin': 'Doha',
+            'destination': 'Kochi',
+            'cargo_ref_number': f'REF{i:06d}',
+            'tracking_id': f'AMI{i:06d}',
+            'collection_date': today,
+            'date_of_departure': today + datetime.timedelta(days=2),
+            'date_of_arrival': None,
+            'created_at': datetime.datetime(2025, 5, 22, 11, 23, 45, 123456, tzinfo=datetime.timezone.utc),
+            'status_updates': [
+                {
+                    'id': i * 3 + n,
+                    'job': i,
+                    'status_content': 'Cargo loaded and in transit',
+                    'status_date': today,
+                    'status_time': datetime.time(9, 30),
+                    'created_at': datetime.datetime(2025, 5, 22, 9, 30, tzinfo=datetime.timezone.utc),
+                }
+                for n in range(3)
+            ],
+        })
+    return rows
+
+
+def build_enquiry_rows(count):
+    """Rows shaped like EnquirySerializer output for a list of enquiries."""
+    return [
+        {
+            'id': i,
+            'fullName': f'Enquirer {i}',
+            'phoneNumber': '+97450136999',
+            'email': f'enquirer{i}@example.com',
+            'serviceType': 'internationalMove',
+            'message': 'We are relocating a three bedroom apartment and need a quote. ' * 4,
+            'recaptchaToken': 'x' * 400,
+            'refererUrl': 'https://www.alameinmovers.com/',
+            'submittedUrl': 'https://www.alameinmovers.com/contact-us',
+            'created_at': '2025-05-22T11:23:45.123456Z',
+        }
+        for i in range(count)
+    ]
+
+
+class Command(BaseCommand):
+    help = 'Benchmark DRF JSON rendering/parsing against the orjson-backed renderer and parser.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000, help='Rows per list payload.')
+        parser.add_argument('--repeat', type=int, default=20, help='Iterations per measurement.')
+
+    def handle(self, *args, **options):
+        rows, repeat = options['rows'], options['repeat']
+        payloads = {
+            'jobs': build_job_rows(rows),
+            'enquiries': build_enquiry_rows(rows),
+        }
+        # DRF's stdlib renderer needs the dates as strings, the way serializers return them.
+        stdlib, fast = JSONRenderer(), FastJSONRenderer()
+
+        for name, data in payloads.items():
+            body = fast.render(data)
+            stdlib_data = JSONParser().parse(io.BytesIO(body))
+
+            render_std = self._time(lambda: stdlib.render(stdlib_data), repeat)
+            render_fast = self._time(lambda: fast.render(data), repeat)
+            parse_std = self._time(lambda: JSONParser().parse(io.BytesIO(body)), repeat)
+            parse_fast = self._time(lambda: FastJSONParser().parse(io.BytesIO(body)), repeat)
+
+            self.stdout.write(f'{name}: {rows} rows, {len(body) / 1024:.1f} KiB')
+            self.stdout.write(f'  render  stdlib {render_std:8.2f} ms  fast {render_fast:8.2f} ms  ({render_std / render_fast:.1f}x)')
+            self.stdout.write(f'  parse   stdlib {parse_std:8.2f} ms  fast {parse_fast:8.2f} ms  ({parse_std / parse_fast:.1f}x)')
+
+    def _time(self, func, repeat):
+        """Best-of-three average in milliseconds."""
+        return min(timeit.repeat(func, number=repeat, repeat=3)) / repeat * 1000
@@ -0,0 +1,93 @@
+import datetime
+import timeit
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+from add_customers.models import AddCustomer
+from add_customers.serializers import AddCustomerSerializer, AddCustomerValuesReader
+from add_jobs.models import Job, StatusUpdate
+from add_jobs.serializers import JobSerializer, JobValuesReader
+from contact.models import Enquiry, ServiceType, SiteURL
+from contact.serializers import EnquirySerializer, EnquiryValuesReader
+
+
+class Command(BaseCommand):
+    help = (
+        'Check that the values()-based readers render byte-for-byte the same JSON as the '
+        'serializers and compare their speed. Sample rows are created in a transaction '
+        'that is rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000, help='Sample rows per model.')
+        parser.add_argument('--repeat', type=int, default=5, help='Iterations per measurement.')
+
+    def handle(self, *args, **options):
+        rows, repeat = options['rows'], options['repeat']
+        with transaction.atomic():
+            self.create_sample_data(rows)
+            cases = [
+                ('customers', AddCustomer.objects.all(), AddCustomerSerializer, AddCustomerValuesReader),
+                ('jobs', Job.objects.all(), JobSerializer, JobValuesReader),
+                ('enquiries', Enquiry.objects.order_by('-created_at'), EnquirySerializer, EnquiryValuesReader),
+            ]
+            failed = False
+            for name, queryset, serializer_class, reader_class in cases:
+                renderer = JSONRenderer()
+                serialize = lambda: renderer.render(serializer_class(queryset.all(), many=True).data)
+                read = lambda: renderer.render(reader_class().read(queryset.all()))
+
+                identical = serialize() == read()
+                failed = failed or not identical
+                slow = min(timeit.repeat(serialize, number=repeat, repeat=3)) / repeat * 1000
+                fast = min(timeit.repeat(read, number=repeat, repeat=3)) / repeat * 1000
+                self.stdout.write(
+                    f'{name}: serializer {slow:8.2f} ms  reader {fast:8.2f} ms  '
+                    f'({slow / fast:.1f}x)  identical={identical}'
+                )
+            transaction.set_rollback(True)
+
+        if failed:
+            raise CommandError('Reader output differs from serializer output.')
+
+    def create_sample_data(self, count):
+        # bulk_create does not return primary keys on MySQL, so rows are re-read by marker.
+        AddCustomer.objects.bulk_create([
+            AddCustomer(
+                name=f'Customer {i}', phone_number='+97444355663', email=f'customer{i}@benchmark.invalid',
+                address='Building 12, Street 340, Doha', country='Qatar',
+            )
+            for i in range(count)
+        ])
+        customers = list(AddCustomer.objects.filter(email__endswith='@benchmark.invalid').order_by('id'))
+        jobs = []
+        for i in range(count):
+            job = Job(
+                cargo_type='sea', customer=customers[i], receiver_name=f'Receiver {i}',
+                email=f'receiver{i}@example.com', recipient_address='Kochi, Kerala',
+                recipient_country='India', commodity='Household goods', number_of_packages=12,
+                weight=1250.5, volume=18.75, origin='Doha', destination='Kochi',
+                cargo_ref_number=f'BENCH{i:06d}', tracking_id=f'BENCH{i:06d}',
+                collection_date=datetime.date(2025, 5, 22),
+                date_of_departure=datetime.date(2025, 5, 24) if i % 2 else None,
+            )
+            jobs.append(job)
+        Job.objects.bulk_create(jobs)
+        jobs = Job.objects.filter(tracking_id__startswith='BENCH')
+        StatusUpdate.objects.bulk_create([
+            StatusUpdate(
+                job=job, status_content='Cargo loaded and in transit',
+                status_date=datetime.date(2025, 5, 24), status_time=datetime.time(9, 30, n),
+            )
+            for job in jobs for n in range(3)
+        ])
+        Enquiry.objects.bulk_create([
+            Enquiry(
+                fullName=f'Enquirer {i}', phoneNumber='+97450136999', email=f'enquirer{i}@example.com',
+                serviceType=ServiceType.INTERNATIONAL_MOVE, message='Relocating a three bedroom apartment.',
+                refererUrl=SiteURL.objects.intern('https://www.alameinmovers.com/'),
+                submittedUrl=SiteURL.objects.intern('https://www.alameinmovers.com/contact-us'),
+            )
+            for i in range(count)
+        ])
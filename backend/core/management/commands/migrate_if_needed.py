@@ -0,0 +1,74 @@
+import time
+from contextlib import contextmanager
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.migrations.executor import MigrationExecutor
+
+LOCK_NAME = 'alameinmovers_migrate'
+
+
+class Command(BaseCommand):
+    help = (
+        'Apply migrations only when some are unapplied, holding a database lock so that '
+        'a single replica migrates while the others wait. Reports phase timings.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+        parser.add_argument(
+            '--lock-timeout', type=int, default=300,
+            help='Seconds to wait for another replica to finish migrating.',
+        )
+
+    def handle(self, *args, **options):
+        self.timings = []
+        connection = connections[options['database']]
+
+        with self.phase('connect'):
+            connection.ensure_connection()
+
+        with self.phase('plan'):
+            pending = self.pending_migrations(connection)
+
+        if pending:
+            with self.migration_lock(connection, options['lock_timeout']):
+                # Another replica may have migrated while we waited for the lock.
+                with self.phase('replan'):
+                    pending = self.pending_migrations(connection)
+                if pending:
+                    with self.phase('migrate'):
+                        call_command('migrate', database=options['database'], interactive=False, verbosity=1)
+
+        summary = ', '.join(f'{name} {elapsed * 1000:.0f} ms' for name, elapsed in self.timings)
+        state = f'{len(pending)} migration(s) applied' if pending else 'no unapplied migrations'
+        self.stdout.write(f'Startup migrations: {state} ({summary})')
+
+    def pending_migrations(self, connection):
+        executor = MigrationExecutor(connection)
+        return executor.migration_plan(executor.loader.graph.leaf_nodes())
+
+    @contextmanager
+    def phase(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings.append((name, time.perf_counter() - started))
+
+    @contextmanager
+    def migration_lock(self, connection, timeout):
+        """MySQL named lock; other backends run without one."""
+        if connection.vendor != 'mysql':
+            yield
+            return
+        with self.phase('lock'), connection.cursor() as cursor:
+            cursor.execute('SELECT GET_LOCK(%s, %s)', [LOCK_NAME, timeout])
+            if cursor.fetchone()[0] != 1:
+                raise CommandError(f'Timed out after {timeout}s waiting for the migration lock.')
+        try:
+            yield
+        finally:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT RELEASE_LOCK(%s)', [LOCK_NAME])
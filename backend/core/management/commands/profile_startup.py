@@ -0,0 +1,126 @@
+import json
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Runs in a fresh interpreter started with -X importtime, loading what a
+# Gunicorn worker loads, phase by phase, and printing the measurements as
+# JSON on the last line of stdout.
+CHILD_SCRIPT = r'''
+import importlib, importlib.util, json, os, resource, sys, time
+
+def rss_kb():
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') // 1024
+    except OSError:
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return maxrss // 1024 if sys.platform == 'darwin' else maxrss
+
+phases = []
+
+def phase(name, func):
+    rss, started = rss_kb(), time.perf_counter()
+    func()
+    phases.append({
+        'name': name,
+        'ms': (time.perf_counter() - started) * 1000,
+        'rss_kb': rss_kb(),
+        'delta_kb': rss_kb() - rss,
+    })
+
+phases.append({'name': 'interpreter', 'ms': 0.0, 'rss_kb': rss_kb(), 'delta_kb': 0})
+
+import django
+phase('django.setup()', django.setup)
+
+from django.apps import apps
+from django.conf import settings
+for app_config in apps.get_app_configs():
+    if not app_config.path.startswith(str(settings.BASE_DIR)):
+        continue
+    for submodule in ('views', 'urls'):
+        name = '%s.%s' % (app_config.name, submodule)
+        if name not in sys.modules and importlib.util.find_spec(name) is not None:
+            phase('import ' + name, lambda name=name: importlib.import_module(name))
+
+from django.urls import get_resolver
+phase('URLconf', lambda: get_resolver().url_patterns)
+
+from django.core.wsgi import get_wsgi_application
+phase('WSGI application', get_wsgi_application)
+
+request_path = os.environ.get('PROFILE_STARTUP_REQUEST')
+if request_path:
+    from django.test import Client
+    phase('first request ' + request_path, lambda: Client().get(request_path, SERVER_NAME='localhost'))
+
+print(json.dumps({'phases': phases}))
+'''
+
+
+def parse_importtime(stderr):
+    """Return [(module, self_us, cumulative_us, depth)] from -X importtime output."""
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len('import time:'):].split('|', 2)
+            depth = (len(name) - len(name.lstrip())) // 2
+            modules.append((name.strip(), int(self_us), int(cumulative_us), depth))
+        except ValueError:
+            continue
+    return modules
+
+
+class Command(BaseCommand):
+    help = (
+        'Profile what a Gunicorn worker loads: time and RSS growth per startup phase and '
+        'per project views/urls module, plus import time per module and package.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=15, help='Number of modules and packages to list.')
+        parser.add_argument('--request', help='Also measure a first GET request to this path.')
+        parser.add_argument('--json', action='store_true', help='Print raw measurements as JSON.')
+
+    def handle(self, *args, **options):
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, sys.path)))
+        env.setdefault('DJANGO_SETTINGS_MODULE', os.environ.get('DJANGO_SETTINGS_MODULE', 'backend.settings'))
+        if options['request']:
+            env['PROFILE_STARTUP_REQUEST'] = options['request']
+        child = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', CHILD_SCRIPT],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+        )
+        if child.returncode != 0:
+            raise CommandError('Startup profile failed:\n' + child.stderr[-4000:])
+
+        phases = json.loads(child.stdout.strip().splitlines()[-1])['phases']
+        modules = parse_importtime(child.stderr)
+        packages = {}
+        for name, self_us, _, _ in modules:
+            package = name.split('.')[0]
+            packages[package] = packages.get(package, 0) + self_us
+
+        if options['json']:
+            self.stdout.write(json.dumps({'phases': phases, 'modules': modules, 'packages': packages}))
+            return
+
+        top = options['top']
+        self.stdout.write('Startup phases:')
+        for item in phases:
+            self.stdout.write(
+                f"  {item['name']:<40} {item['ms']:8.1f} ms  rss {item['rss_kb'] / 1024:7.1f} MiB"
+                f"  (+{item['delta_kb'] / 1024:.1f} MiB)"
+            )
+        self.stdout.write(f'\nSlowest packages (self import time, {len(modules)} modules):')
+        for package, total in sorted(packages.items(), key=lambda item: -item[1])[:top]:
+            self.stdout.write(f'  {package:<40} {total / 1000:8.1f} ms')
+        self.stdout.write('\nSlowest top-level imports (cumulative):')
+        for name, _, cumulative_us, _ in sorted((m for m in modules if m[3] == 0), key=lambda m: -m[2])[:top]:
+            self.stdout.write(f'  {name:<40} {cumulative_us / 1000:8.1f} ms')
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from core.idempotency import purge_expired
+
+
+class Command(BaseCommand):
+    help = 'Delete expired Idempotency-Key records in batches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--max-seconds', type=int, default=60, help='Stop after this long; rerun to continue.')
+
+    def handle(self, *args, **options):
+        purged = purge_expired(batch_size=options['batch_size'], max_seconds=options['max_seconds'])
+        self.stdout.write(f'Purged {purged} idempotency records')
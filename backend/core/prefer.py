@@ -0,0 +1,44 @@
+"""
+Support for the `Prefer: return=minimal` request header (RFC 7240) on writes.
+
+A minimal response carries only the primary key of the written object, so
+the view skips serializing the full representation (and its nested queries).
+"""
+from rest_framework import status
+from rest_framework.response import Response
+
+
+def prefers_minimal(request):
+    """Return True when the request asks for `Prefer: return=minimal`."""
+    for preference in request.headers.get('Prefer', '').split(','):
+        if preference.split(';')[0].strip().lower() == 'return=minimal':
+            return True
+    return False
+
+
+def minimal_response(instance, status_code=status.HTTP_200_OK):
+    response = Response({'id': instance.pk}, status=status_code)
+    response['Preference-Applied'] = 'return=minimal'
+    return response
+
+
+class ReturnMinimalMixin:
+    """Honour `Prefer: return=minimal` on create and update of a ModelViewSet."""
+
+    def create(self, request, *args, **kwargs):
+        if not prefers_minimal(request):
+            return super().create(request, *args, **kwargs)
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        self.perform_create(serializer)
+        return minimal_response(serializer.instance, status.HTTP_201_CREATED)
+
+    def update(self, request, *args, **kwargs):
+        if not prefers_minimal(request):
+            return super().update(request, *args, **kwargs)
+        partial = kwargs.pop('partial', False)
+        instance = self.get_object()
+        serializer = self.get_serializer(instance, data=request.data, partial=partial)
+        serializer.is_valid(raise_exception=True)
+        self.perform_update(serializer)
+        return minimal_response(serializer.instance)
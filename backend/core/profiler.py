@@ -0,0 +1,200 @@
+"""
+Opt-in profiling of single requests, for admins.
+
+An admin fetches a short-lived signed token from `api/core/profile-token/`
+and sends it back on the request to investigate, in the X-Profile-Token
+header (or `?_profile=<token>`, which also changes cache keys, so prefer
+the header). That request then runs under:
+
+- a sampling profiler: a background thread records the request thread's
+  stack every PROFILE_SAMPLE_INTERVAL_MS, written as folded stacks
+  (`frame;frame;frame count`), the input format of flamegraph.pl,
+  speedscope and inferno;
+- SQL capture: every query on every connection with its duration.
+
+Both go to PROFILE_DIR (logs/profiles/) under a server-generated name, and
+the response carries an X-Profile-Summary header with that name. Requests
+without a token only pay for one header lookup; with PROFILING_ENABLED off
+(the default) the middleware is not installed at all.
+"""
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from authapp.permissions import is_admin
+
+logger = logging.getLogger(__name__)
+
+TOKEN_HEADER = 'X-Profile-Token'
+TOKEN_PARAM = '_profile'
+SUMMARY_HEADER = 'X-Profile-Summary'
+SALT = 'core.profiler'
+
+
+def issue_token(user):
+    return signing.dumps({'user': user.pk}, salt=SALT)
+
+
+def token_user_id(token):
+    """The id of the admin a valid, unexpired token was issued to, or None."""
+    try:
+        payload = signing.loads(token, salt=SALT, max_age=settings.PROFILE_TOKEN_MAX_AGE)
+    except signing.BadSignature:
+        return None
+    user = get_user_model().objects.filter(pk=payload.get('user'), is_active=True).first()
+    # Revoked with the role or the account.
+    if user is None or not is_admin(user):
+        return None
+    return user.pk
+
+
+def frame_label(code):
+    filename = code.co_filename
+    for prefix in sorted((p for p in sys.path if p), key=len, reverse=True):
+        if filename.startswith(prefix):
+            filename = filename[len(prefix):].lstrip(os.sep)
+            break
+    return '%s (%s:%d)' % (code.co_qualname, filename, code.co_firstlineno)
+
+
+class SamplingProfiler:
+    """Samples one thread's stack from a background thread."""
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='request-profiler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        labels = {}
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                label = labels.get(code)
+                if label is None:
+                    label = labels[code] = frame_label(code)
+                stack.append(label)
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+                self.samples += 1
+
+    def folded(self):
+        return ''.join('%s %d\n' % (stack, count) for stack, count in self.stacks.most_common())
+
+
+class QueryRecorder:
+    """execute_wrapper that records each query's SQL, database and duration."""
+
+    def __init__(self):
+        self.queries = []
+
+    def wrapper(self, alias):
+        def record(execute, sql, params, many, context):
+            started = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                self.queries.append({
+                    'alias': alias,
+                    'sql': sql,
+                    'many': many,
+                    'ms': round((time.perf_counter() - started) * 1000, 3),
+                })
+        return record
+
+    def total_ms(self):
+        return sum(query['ms'] for query in self.queries)
+
+    def duplicates(self):
+        counts = Counter(query['sql'] for query in self.queries)
+        return sum(count - 1 for count in counts.values())
+
+
+class RequestProfilerMiddleware:
+    """Profile requests that carry a valid admin profile token."""
+
+    def __init__(self, get_response):
+        if not settings.PROFILING_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = request.headers.get(TOKEN_HEADER) or request.GET.get(TOKEN_PARAM)
+        if not token:
+            return self.get_response(request)
+        if token_user_id(token) is None:
+            logger.warning("Ignored invalid or expired profile token for %s", request.path)
+            response = self.get_response(request)
+            response[SUMMARY_HEADER] = 'invalid-token'
+            return response
+        return self.profile(request)
+
+    def profile(self, request):
+        profiler = SamplingProfiler(threading.get_ident(), settings.PROFILE_SAMPLE_INTERVAL_MS / 1000)
+        recorder = QueryRecorder()
+        started = time.perf_counter()
+        profiler.start()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(recorder.wrapper(connection.alias)))
+                response = self.get_response(request)
+        finally:
+            profiler.stop()
+        total_ms = (time.perf_counter() - started) * 1000
+
+        # Never named after client input such as the request id.
+        name = '%d-%s' % (time.time_ns(), uuid.uuid4().hex[:8])
+        try:
+            self.write(name, request, response, profiler, recorder, total_ms)
+        except OSError as exc:
+            logger.error("Failed to write request profile %s: %s", name, exc)
+        response[SUMMARY_HEADER] = (
+            f'total={total_ms:.1f}ms; samples={profiler.samples}; sql={len(recorder.queries)}; '
+            f'sql_ms={recorder.total_ms():.1f}; duplicate_sql={recorder.duplicates()}; id={name}'
+        )
+        return response
+
+    def write(self, name, request, response, profiler, recorder, total_ms):
+        directory = settings.PROFILE_DIR
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, name + '.folded'), 'w') as folded:
+            folded.write(profiler.folded())
+        with open(os.path.join(directory, name + '.sql.json'), 'w') as queries:
+            json.dump({
+                'method': request.method,
+                'path': request.path,
+                'request_id': getattr(request, 'request_id', None),
+                'status': response.status_code,
+                'total_ms': round(total_ms, 3),
+                'samples': profiler.samples,
+                'sample_interval_ms': settings.PROFILE_SAMPLE_INTERVAL_MS,
+                'sql_ms': round(recorder.total_ms(), 3),
+                'queries': recorder.queries,
+            }, queries, indent=2)
+        logger.info("Request profile for %s %s written to %s", request.method, request.path, name)
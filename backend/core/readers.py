@@ -0,0 +1,252 @@
+"""
+values()-based read path for list and retrieve endpoints.
+
+A reader projects only the columns an API response needs with
+values_list() and builds plain dicts in bulk, producing the same output as
+the equivalent ModelSerializer without instantiating model objects or
+running per-field to_representation for every row.
+"""
+import hashlib
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.http import Http404
+from django.utils import timezone
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from .cache import cache
+from .db_router import read_from_replica
+
+
+def date_repr(value):
+    """Match DRF DateField/TimeField ISO 8601 output."""
+    if value is None:
+        return None
+    return value.isoformat()
+
+
+def datetime_repr(value):
+    """Match DRF DateTimeField ISO 8601 output, including the 'Z' suffix for UTC."""
+    if not value:
+        return None
+    if settings.USE_TZ:
+        if timezone.is_aware(value):
+            value = value.astimezone(timezone.get_current_timezone())
+        else:
+            value = timezone.make_aware(value)
+    value = value.isoformat()
+    if value.endswith('+00:00'):
+        value = value[:-6] + 'Z'
+    return value
+
+
+def decimal_repr(value):
+    """Match DRF DecimalField output, a string by default (COERCE_DECIMAL_TO_STRING)."""
+    if value is None:
+        return None
+    return str(value)
+
+
+def chunked(items, size=1000):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+class ValuesReader:
+    """
+    Project a queryset to API dicts with values_list().
+
+    `fields` lists the output keys in serializer order. `columns` maps an
+    output key to its values() column when the two differ, and `converters`
+    maps a key to a function turning the raw column value into its API
+    representation.
+
+    `constants` maps keys that are no longer stored to the value to output.
+
+    `relations` maps nested output keys to the column that identifies them;
+    the reader collects those values and calls `expand_<key>(values)` once,
+    which returns a dict of value -> nested representation.
+
+    Pass `fields` to read only a subset; unselected relations are never queried.
+    """
+    fields = ()
+    columns = {}
+    converters = {}
+    constants = {}
+    relations = {}
+
+    def __init__(self, fields=None):
+        self.selected = [name for name in self.fields if fields is None or name in fields]
+
+    def read(self, queryset):
+        selected = self.selected
+        queried = [name for name in selected if name not in self.constants]
+        columns = [self.relations.get(name) or self.columns.get(name, name) for name in queried]
+        converters = [
+            (index, self.converters[name]) for index, name in enumerate(queried)
+            if name in self.converters
+        ]
+        rows = []
+        for values in queryset.values_list(*columns):
+            if converters:
+                values = list(values)
+                for index, func in converters:
+                    values[index] = func(values[index])
+            rows.append(dict(zip(queried, values)))
+        if len(queried) < len(selected):
+            rows = [
+                {name: row[name] if name in row else self.constants[name] for name in selected}
+                for row in rows
+            ]
+
+        for name in selected:
+            if name in self.relations:
+                nested = getattr(self, 'expand_%s' % name)({row[name] for row in rows})
+                for row in rows:
+                    row[name] = nested[row[name]]
+        return rows
+
+
+def etag_matches(if_none_match, etag):
+    """Weak comparison of an If-None-Match header against `etag` (RFC 9110 13.1.2)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    opaque = etag.removeprefix('W/')
+    return any(candidate.removeprefix('W/') == opaque for candidate in parse_etags(if_none_match))
+
+
+class ValuesReadMixin:
+    """
+    Serve list and retrieve through `values_reader_class` instead of the serializer.
+
+    Supports sparse fieldsets: `?fields=id,name` limits the selected columns,
+    and when `fields` is given nested relations are left out (and not
+    queried) unless named in `fields` or `?expand=`. Without either parameter
+    the response has the full serializer shape.
+
+    Results are cached when `cache_tags` is set (see `cached_read`), and
+    may be read from a replica (see core.db_router). Those views also send
+    an ETag and answer a matching `If-None-Match` with 304 before querying
+    (see `versioned_response`).
+
+    Falls back to the serializer when pagination is configured. Retrieve
+    does not run object-level permission checks, so only use this on views
+    whose permissions are request-level.
+    """
+    values_reader_class = None
+    cache_tags = ()
+
+    def get_values_reader(self):
+        reader_class = self.values_reader_class
+        fields = self._split_param('fields')
+        expand = self._split_param('expand')
+
+        unknown = [name for name in fields if name not in reader_class.fields]
+        unknown += [name for name in expand if name not in reader_class.relations]
+        if unknown:
+            raise ValidationError({'fields': ['Unknown or non-expandable field(s): %s' % ', '.join(unknown)]})
+
+        if not fields:
+            return reader_class()
+        return reader_class(fields=set(fields) | set(expand))
+
+    def _split_param(self, name):
+        value = self.request.query_params.get(name, '')
+        return [item.strip() for item in value.split(',') if item.strip()]
+
+    def list(self, request, *args, **kwargs):
+        if self.values_reader_class is None or self.paginator is not None:
+            return super().list(request, *args, **kwargs)
+
+        def read():
+            return self.get_values_reader().read(self.filter_queryset(self.get_queryset()))
+
+        return self.versioned_response(lambda: self.cached_read(read))
+
+    def retrieve(self, request, *args, **kwargs):
+        if self.values_reader_class is None:
+            return super().retrieve(request, *args, **kwargs)
+
+        def read():
+            lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+            queryset = self.filter_queryset(self.get_queryset())
+            try:
+                queryset = queryset.filter(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+            except (TypeError, ValueError, DjangoValidationError):
+                raise Http404
+            rows = self.get_values_reader().read(queryset[:1])
+            return rows[0] if rows else None
+
+        def cached_retrieve():
+            data = self.cached_read(read)
+            if data is None:
+                raise Http404('No %s matches the given query.' % self.get_queryset().model._meta.object_name)
+            return data
+
+        return self.versioned_response(cached_retrieve)
+
+    def collection_etag(self):
+        """
+        Weak ETag for this request's result: the current versions of
+        `cache_tags`, which every write to those models bumps, plus the path,
+        query string and response format. None when the view has no tags.
+        """
+        if not self.cache_tags:
+            return None
+        request = self.request
+        versions = cache.tag_versions(self.cache_tags)
+        renderer = getattr(request, 'accepted_media_type', '')
+        stamp = '%s?%s|%s|%s' % (
+            request.path,
+            urlencode(sorted(request.query_params.lists()), doseq=True),
+            renderer,
+            ','.join('%s=%s' % (tag, versions[tag]) for tag in sorted(versions)),
+        )
+        return 'W/"%s"' % hashlib.sha256(stamp.encode()).hexdigest()[:32]
+
+    def versioned_response(self, read):
+        """
+        Return 304 Not Modified when `If-None-Match` carries the current
+        ETag, without calling `read`; otherwise a response with read()'s data
+        and the ETag.
+        """
+        # Taken before reading, so a write during the read can only make the
+        # ETag older than the data, never newer.
+        etag = self.collection_etag()
+        if etag is None:
+            return Response(read())
+        if etag_matches(self.request.headers.get('If-None-Match', ''), etag):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = Response(read())
+        response['ETag'] = etag
+        response['Cache-Control'] = 'private, no-cache'
+        return response
+
+    def cached_read(self, read):
+        """
+        Run `read` through the tiered cache when the view declares
+        `cache_tags`, keyed by path and normalised query string. Writes to
+        any model in `cache_tags` invalidate the entry.
+        """
+        if not self.cache_tags:
+            with read_from_replica():
+                return read()
+
+        def replica_read():
+            # A replica may not have caught up with a write that just bumped
+            # a tag; reading it now would cache stale rows under the new
+            # version, so read the primary until the lag window has passed.
+            if cache.invalidated_within(self.cache_tags, settings.REPLICA_MAX_LAG_SECONDS):
+                return read()
+            with read_from_replica():
+                return read()
+
+        request = self.request
+        key = 'reads:%s?%s' % (request.path, urlencode(sorted(request.query_params.lists()), doseq=True))
+        return cache.get_or_set(key, replica_read, tags=self.cache_tags)
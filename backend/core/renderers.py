@@ -0,0 +1,29 @@
+from rest_framework.renderers import JSONRenderer
+from . import jsonlib
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer backed by orjson.
+
+    Produces the same compact UTF-8 output as DRF's renderer and falls back
+    to it whenever orjson is unavailable or the requested options (ASCII
+    escaping, an indent other than 2) are not supported by orjson.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        renderer_context = renderer_context or {}
+        indent = self.get_indent(accepted_media_type, renderer_context)
+
+        if not jsonlib.use_orjson() or self.ensure_ascii or not self.compact or indent not in (None, 2):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        ret = jsonlib.dumps(data, indent=indent)
+
+        # Keep the output a strict javascript subset, as DRF does.
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
@@ -0,0 +1,608 @@
+import gzip
+import json
+import logging
+import os
+import shutil
+import tempfile
+import uuid
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from io import BytesIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.mail import EmailMessage
+from django.db import OperationalError, connections, router, transaction
+from django.db.models.deletion import Collector
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.test import APIClient
+import requests
+from requests.adapters import BaseAdapter
+
+from add_customers.models import AddCustomer
+from contact.models import ArchivedEnquiry, Enquiry
+from .admin_tools import EstimatedCountPaginator
+from .cache import cache, model_tag
+from .compression import CODECS, CompressedBodyCache, CompressionMiddleware, negotiate_encoding
+from .db_router import ReplicaPinningMiddleware, read_from_replica, replica_health
+from .idempotency import claim, release, request_scope, store
+from .logs import QueueLogHandler
+from .models import IdempotencyRecord
+from .parsers import FastJSONParser
+from .profiler import RequestProfilerMiddleware
+from .renderers import FastJSONRenderer
+from . import tracing
+
+
+class TagInvalidationTests(TestCase):
+    def version(self, model):
+        return cache.tag_versions([model_tag(model)])[model_tag(model)]
+
+    def invalidations(self):
+        return cache.stats()['invalidations']
+
+    def test_bump_waits_for_commit_and_happens_once(self):
+        before_version, before_count = self.version(AddCustomer), self.invalidations()
+        with self.captureOnCommitCallbacks(execute=True):
+            for index in range(5):
+                AddCustomer.objects.create(name='Customer %d' % index, phone_number='1', email='c@example.com',
+                                           address='Street', country='Qatar')
+            self.assertEqual(self.version(AddCustomer), before_version)
+        self.assertNotEqual(self.version(AddCustomer), before_version)
+        self.assertEqual(self.invalidations() - before_count, 1)
+
+    def test_rolled_back_changes_do_not_bump(self):
+        before = self.version(AddCustomer)
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            try:
+                with transaction.atomic():
+                    AddCustomer.objects.create(name='Gone', phone_number='1', email='c@example.com',
+                                               address='Street', country='Qatar')
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+        self.assertEqual(callbacks, [])
+        self.assertEqual(self.version(AddCustomer), before)
+
+    def test_enquiry_deletes_stay_fast_and_bump_once(self):
+        for model in (Enquiry, ArchivedEnquiry):
+            self.assertTrue(Collector(using='default').can_fast_delete(model.objects.all()), model)
+        before = self.invalidations()
+        with self.captureOnCommitCallbacks(execute=True):
+            Enquiry.objects.all().delete()
+            ArchivedEnquiry.objects.all().delete()
+        self.assertEqual(self.invalidations() - before, 2)
+
+
+class GetOrSetLockTests(TestCase):
+    def test_waiter_does_not_release_another_process_lock(self):
+        lock_key = 'lock:' + cache._value_key('test:locked')
+        cache.shared.add(lock_key, 1, timeout=30)
+        self.addCleanup(cache.shared.delete, lock_key)
+        wait_timeout, cache.wait_timeout = cache.wait_timeout, 0.05
+        self.addCleanup(setattr, cache, 'wait_timeout', wait_timeout)
+
+        self.assertEqual(cache.get_or_set('test:locked', lambda: 'computed'), 'computed')
+        self.assertEqual(cache.shared.get(lock_key), 1)
+
+    def test_owner_releases_its_lock(self):
+        cache.get_or_set('test:owned', lambda: 'computed')
+        self.assertIsNone(cache.shared.get('lock:' + cache._value_key('test:owned')))
+
+
+@override_settings(DATABASE_REPLICAS=['replica_local'])
+class ReplicaRoutingTests(TransactionTestCase):
+    """
+    Routing against 'replica_local', the primary's test mirror. Outside a
+    TestCase transaction, since reads in one always stay on the primary.
+    """
+    databases = {'default', 'replica_local'}
+
+    def setUp(self):
+        replica_health._checked.clear()
+        self.addCleanup(replica_health._checked.clear)
+        self.customer = AddCustomer.objects.create(name='Replica', phone_number='1', email='r@example.com',
+                                                   address='Street', country='Qatar')
+
+    def read_alias(self):
+        with read_from_replica():
+            return router.db_for_read(AddCustomer)
+
+    def test_reads_go_to_the_replica_only_when_allowed(self):
+        self.assertEqual(router.db_for_read(AddCustomer), 'default')
+        self.assertEqual(self.read_alias(), 'replica_local')
+        with read_from_replica():
+            queryset = AddCustomer.objects.filter(pk=self.customer.pk)
+            self.assertEqual(queryset.db, 'replica_local')
+            self.assertEqual(list(queryset.values_list('name', flat=True)), ['Replica'])
+        self.assertEqual(router.db_for_write(AddCustomer), 'default')
+
+    def test_reads_inside_a_transaction_stay_on_the_primary(self):
+        with transaction.atomic():
+            self.assertEqual(self.read_alias(), 'default')
+
+    def test_client_is_pinned_to_the_primary_after_a_write(self):
+        seen = []
+
+        def view(request):
+            if request.method == 'POST':
+                AddCustomer.objects.create(name='Written', phone_number='2', email='w@example.com',
+                                           address='Street', country='UK')
+            seen.append(self.read_alias())
+            return HttpResponse()
+
+        middleware = ReplicaPinningMiddleware(view)
+        factory = RequestFactory()
+        middleware(factory.get('/', HTTP_AUTHORIZATION='Bearer one'))
+        middleware(factory.post('/', HTTP_AUTHORIZATION='Bearer one'))
+        middleware(factory.get('/', HTTP_AUTHORIZATION='Bearer one'))
+        middleware(factory.get('/', HTTP_AUTHORIZATION='Bearer two'))
+        self.assertEqual(seen, ['replica_local', 'default', 'default', 'replica_local'])
+
+    def test_lagging_or_unreachable_replica_falls_back_to_the_primary(self):
+        for lag in (60, None):
+            replica_health._checked.clear()
+            with mock.patch.object(replica_health, 'replication_lag', return_value=lag), \
+                    self.assertLogs('core.db_router', 'WARNING'):
+                self.assertEqual(self.read_alias(), 'default', lag)
+                with read_from_replica():
+                    self.assertEqual(AddCustomer.objects.get(pk=self.customer.pk).name, 'Replica')
+        replica_health._checked.clear()
+        self.assertEqual(replica_health.replication_lag('replica_local'), 0)
+        self.assertEqual(self.read_alias(), 'replica_local')
+
+    def mysql_replica(self, results):
+        """A fake MySQL connection answering each status query from `results`."""
+        cursor = mock.MagicMock()
+        cursor.__enter__.return_value = cursor
+
+        def execute(query):
+            result = results[query]
+            if isinstance(result, Exception):
+                raise result
+            cursor.description, cursor.fetchone.return_value = result
+
+        cursor.execute.side_effect = execute
+        connection = mock.Mock(vendor='mysql', settings_dict={'HOST': 'replica.example', 'NAME': 'almas'})
+        connection.cursor.return_value = cursor
+        return mock.patch('core.db_router.connections',
+                          {'default': connections['default'], 'replica_local': connection})
+
+    def test_lag_query_falls_back_for_mysql_before_8_0_22(self):
+        old_server = {
+            'SHOW REPLICA STATUS': OperationalError(1064, 'You have an error in your SQL syntax'),
+            'SHOW SLAVE STATUS': ((('Slave_IO_State',), ('Seconds_Behind_Master',)), ('Waiting', 3)),
+        }
+        with self.mysql_replica(old_server):
+            self.assertEqual(replica_health.replication_lag('replica_local'), 3)
+        new_server = {'SHOW REPLICA STATUS': ((('Seconds_Behind_Source',),), (1,))}
+        with self.mysql_replica(new_server):
+            self.assertEqual(replica_health.replication_lag('replica_local'), 1)
+
+    def test_unmeasurable_lag_is_logged(self):
+        cases = [
+            {'SHOW REPLICA STATUS': OperationalError('gone'), 'SHOW SLAVE STATUS': OperationalError('gone')},
+            {'SHOW REPLICA STATUS': ((('Seconds_Behind_Source',),), None)},
+            {'SHOW REPLICA STATUS': ((('Seconds_Behind_Source',),), (None,))},
+        ]
+        for results in cases:
+            with self.mysql_replica(results), self.assertLogs('core.db_router', 'WARNING'):
+                self.assertIsNone(replica_health.replication_lag('replica_local'))
+
+    def test_replica_health_is_cached_between_checks(self):
+        with mock.patch.object(replica_health, 'replication_lag', return_value=0) as lag:
+            self.read_alias()
+            self.read_alias()
+        self.assertEqual(lag.call_count, 1)
+
+
+class QueueLogHandlerTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        self.handler = QueueLogHandler(os.path.join(self.directory, 'django.log'), max_bytes=2000,
+                                       backup_count=2, console=False)
+        self.filename = os.path.join(self.directory, 'django.%d.log' % os.getpid())
+        self.addCleanup(self.handler.close)
+        self.logger = logging.getLogger('core.tests.queue')
+        self.logger.addHandler(self.handler)
+        self.addCleanup(self.logger.removeHandler, self.handler)
+        self.logger.propagate = False
+        self.addCleanup(setattr, self.logger, 'propagate', True)
+
+    def read(self, filename):
+        with open(filename, encoding='utf-8') as f:
+            return [json.loads(line) for line in f]
+
+    def test_message_is_merged_when_logged(self):
+        items = ['first']
+        self.logger.warning('Items: %s', items, extra={'job_id': 7})
+        items.append('second')
+        self.handler.close()
+        [entry] = self.read(self.filename)
+        self.assertEqual(entry['message'], "Items: ['first']")
+        self.assertEqual(entry['job_id'], 7)
+
+    def test_listener_rotates_this_process_file(self):
+        for index in range(40):
+            self.logger.warning('Record %d %s', index, 'x' * 50)
+        self.handler.close()
+        self.assertEqual(sorted(os.listdir(self.directory)), [
+            os.path.basename(self.filename), os.path.basename(self.filename) + '.1',
+            os.path.basename(self.filename) + '.2',
+        ])
+        self.assertEqual(self.read(self.filename)[-1]['message'], 'Record 39 ' + 'x' * 50)
+        for name in os.listdir(self.directory):
+            self.assertLessEqual(os.path.getsize(os.path.join(self.directory, name)), 2000)
+
+
+class IdempotencyClaimTests(TestCase):
+    def test_anonymous_clients_get_separate_scopes(self):
+        factory = RequestFactory()
+
+        def scope(address, agent):
+            return request_scope(Request(factory.post('/api/contacts/enquiries/', REMOTE_ADDR=address,
+                                                      HTTP_USER_AGENT=agent)))
+
+        self.assertEqual(scope('10.0.0.1', 'Browser'), scope('10.0.0.1', 'Browser'))
+        self.assertNotEqual(scope('10.0.0.1', 'Browser'), scope('10.0.0.2', 'Browser'))
+        self.assertNotEqual(scope('10.0.0.1', 'Browser'), scope('10.0.0.1', 'Other'))
+
+    def take_over(self, record):
+        IdempotencyRecord.objects.filter(pk=record.pk).update(locked_until=record.locked_until + timedelta(seconds=30))
+
+    def test_store_and_release_leave_a_taken_over_claim_alone(self):
+        record, claimed = claim('scope', 'key', 'fingerprint')
+        self.assertTrue(claimed)
+        self.take_over(record)
+        with self.assertLogs('core.idempotency', 'WARNING'):
+            store(record, Response({'id': 1}, status=201))
+        release(record)
+        current = IdempotencyRecord.objects.get(pk=record.pk)
+        self.assertEqual(current.state, IdempotencyRecord.PENDING)
+        self.assertIsNone(current.response_data)
+
+    def test_store_completes_its_own_claim(self):
+        record, claimed = claim('scope', 'key', 'fingerprint')
+        store(record, Response({'id': 1}, status=201))
+        current = IdempotencyRecord.objects.get(pk=record.pk)
+        self.assertEqual((current.state, current.status_code, current.response_data),
+                         (IdempotencyRecord.COMPLETE, 201, {'id': 1}))
+
+    def test_record_deleted_during_a_takeover_is_claimed_again(self):
+        stale, claimed = claim('scope', 'key', 'fingerprint')
+        IdempotencyRecord.objects.filter(pk=stale.pk).update(locked_until=stale.locked_until - timedelta(days=1))
+        refresh_from_db = IdempotencyRecord.refresh_from_db
+
+        def purged(instance, *args, **kwargs):
+            IdempotencyRecord.objects.filter(pk=instance.pk).delete()
+            return refresh_from_db(instance, *args, **kwargs)
+
+        with mock.patch.object(IdempotencyRecord, 'refresh_from_db', autospec=True, side_effect=purged):
+            record, claimed = claim('scope', 'key', 'fingerprint')
+        self.assertTrue(claimed)
+        self.assertNotEqual(record.pk, stale.pk)
+        self.assertTrue(IdempotencyRecord.objects.filter(pk=record.pk, state=IdempotencyRecord.PENDING).exists())
+
+
+class RequestProfilerTests(TestCase):
+    def setUp(self):
+        self.profile_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.profile_dir, ignore_errors=True)
+        override = override_settings(PROFILING_ENABLED=True, PROFILE_DIR=self.profile_dir)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.admin = get_user_model().objects.create_user('admin@example.com', 'password', role='admin')
+
+    def token_for(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client.post('/api/core/profile-token/')
+
+    def test_disabled_by_default(self):
+        with override_settings(PROFILING_ENABLED=False):
+            with self.assertRaises(MiddlewareNotUsed):
+                RequestProfilerMiddleware(lambda request: HttpResponse())
+
+    def test_profile_is_named_by_the_server(self):
+        token = self.token_for(self.admin).json()['token']
+        response = self.client.get('/api/jobs/jobs/', HTTP_X_PROFILE_TOKEN=token,
+                                   HTTP_X_REQUEST_ID='existing-profile')
+        self.assertEqual(response.status_code, 200)
+        summary = dict(part.split('=', 1) for part in response['X-Profile-Summary'].split('; '))
+        self.assertNotEqual(summary['id'], 'existing-profile')
+        self.assertEqual(sorted(os.listdir(self.profile_dir)),
+                         [summary['id'] + '.folded', summary['id'] + '.sql.json'])
+        with open(os.path.join(self.profile_dir, summary['id'] + '.sql.json')) as f:
+            profile = json.load(f)
+        self.assertEqual((profile['path'], profile['request_id']), ('/api/jobs/jobs/', 'existing-profile'))
+
+    def test_token_needs_a_current_admin(self):
+        user = get_user_model().objects.create_user('staff@example.com', 'password', role='user')
+        self.assertEqual(self.token_for(user).status_code, 403)
+        token = self.token_for(self.admin).json()['token']
+        self.admin.role = 'user'
+        self.admin.save()
+        response = self.client.get('/api/jobs/jobs/', HTTP_X_PROFILE_TOKEN=token)
+        self.assertEqual(response['X-Profile-Summary'], 'invalid-token')
+        self.assertEqual(os.listdir(self.profile_dir), [])
+
+
+class EstimatedCountPaginatorTests(TestCase):
+    def setUp(self):
+        for index in range(3):
+            AddCustomer.objects.create(name='Customer %d' % index, phone_number='1', email='c@example.com',
+                                       address='Street', country='Qatar')
+
+    def mysql(self, table_rows):
+        cursor = mock.MagicMock()
+        cursor.__enter__.return_value = cursor
+        cursor.fetchone.return_value = (table_rows,)
+        connection = mock.Mock(vendor='mysql')
+        connection.cursor.return_value = cursor
+        return mock.patch('core.admin_tools.connections', {'default': connection}), cursor
+
+    def count(self, queryset):
+        return EstimatedCountPaginator(queryset, 50).count
+
+    def test_exact_count_off_mysql(self):
+        self.assertEqual(self.count(AddCustomer.objects.all()), 3)
+
+    def test_large_unfiltered_table_uses_the_estimate(self):
+        patch, cursor = self.mysql(50000)
+        with patch:
+            self.assertEqual(self.count(AddCustomer.objects.order_by('-id')), 50000)
+        self.assertEqual(cursor.execute.call_args.args[1], [AddCustomer._meta.db_table])
+
+    def test_small_or_filtered_tables_are_counted_exactly(self):
+        patch, cursor = self.mysql(500)
+        with patch:
+            self.assertEqual(self.count(AddCustomer.objects.all()), 3)
+        patch, cursor = self.mysql(50000)
+        with patch:
+            self.assertEqual(self.count(AddCustomer.objects.filter(name='Customer 1')), 1)
+            self.assertEqual(self.count(AddCustomer.objects.values('country').distinct()), 1)
+        cursor.execute.assert_not_called()
+
+
+class CompressionMiddlewareTests(TestCase):
+    body = json.dumps([{'id': index, 'status': 'In transit'} for index in range(200)]).encode()
+
+    def respond(self, accept_encoding='gzip', **extra):
+        middleware = CompressionMiddleware(lambda request: HttpResponse(self.body, content_type='application/json'))
+        middleware.encodings = ['gzip']
+        request = RequestFactory().get('/api/jobs/track/', HTTP_ACCEPT_ENCODING=accept_encoding, **extra)
+        return middleware, middleware(request)
+
+    def test_negotiation(self):
+        available = ['br', 'zstd', 'gzip']
+        self.assertEqual(negotiate_encoding('gzip, br', available), 'br')
+        self.assertEqual(negotiate_encoding('br;q=0.5, gzip', available), 'gzip')
+        self.assertEqual(negotiate_encoding('*;q=0.1', ['gzip']), 'gzip')
+        self.assertIsNone(negotiate_encoding('gzip;q=0', available))
+        self.assertIsNone(negotiate_encoding('identity', available))
+        self.assertIsNone(negotiate_encoding('', available))
+
+    def test_gzip_when_accepted(self):
+        middleware, response = self.respond('gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Content-Length'], str(len(response.content)))
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(gzip.decompress(response.content), self.body)
+        self.assertEqual(len(middleware.cache._items), 1)
+
+    def test_identity_when_nothing_acceptable(self):
+        for accept_encoding in ('identity', 'gzip;q=0', ''):
+            middleware, response = self.respond(accept_encoding)
+            self.assertFalse(response.has_header('Content-Encoding'))
+            self.assertEqual(response.content, self.body)
+
+    def test_padding_only_for_authenticated_responses(self):
+        anonymous = {len(self.respond()[1].content) for _ in range(10)}
+        self.assertEqual(len(anonymous), 1)
+        authenticated = [self.respond(HTTP_AUTHORIZATION='Bearer token')[1] for _ in range(10)]
+        self.assertGreater(len({len(response.content) for response in authenticated}), 1)
+        for response in authenticated:
+            self.assertEqual(response['Content-Encoding'], 'gzip')
+            self.assertEqual(gzip.decompress(response.content), self.body)
+
+    def test_authenticated_responses_bypass_the_cache(self):
+        middleware, response = self.respond(HTTP_AUTHORIZATION='Bearer token')
+        self.assertEqual(len(middleware.cache._items), 0)
+        middleware, response = self.respond(HTTP_COOKIE='sessionid=abc')
+        self.assertEqual(len(middleware.cache._items), 0)
+
+
+class CompressedBodyCacheTests(TestCase):
+    def test_reuses_bodies_by_digest_and_evicts_least_recent(self):
+        codec = mock.Mock(side_effect=lambda content: b'z' + content)
+        cache = CompressedBodyCache(maxsize=2)
+        with mock.patch.dict(CODECS, {'gzip': codec}):
+            self.assertEqual(cache.get_or_compress('gzip', b'a'), b'za')
+            self.assertEqual(cache.get_or_compress('gzip', b'a'), b'za')
+            self.assertEqual(codec.call_count, 1)
+
+            cache.get_or_compress('gzip', b'b')
+            cache.get_or_compress('gzip', b'a')
+            cache.get_or_compress('gzip', b'c')
+            self.assertEqual(codec.call_count, 3)
+            self.assertEqual(len(cache._items), 2)
+
+            cache.get_or_compress('gzip', b'a')
+            self.assertEqual(codec.call_count, 3)
+            cache.get_or_compress('gzip', b'b')
+            self.assertEqual(codec.call_count, 4)
+
+
+class VersionedResponseTests(TestCase):
+    url = '/api/customers/add-customers/'
+
+    def setUp(self):
+        # bulk_create sends no post_save, so no tag batch is left registered
+        # in the test transaction to absorb the write in the last test.
+        [self.customer] = AddCustomer.objects.bulk_create([
+            AddCustomer(name='Customer', phone_number='1', email='c@example.com', address='Street', country='Qatar'),
+        ])
+
+    def test_matching_if_none_match_returns_304_without_reading(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        self.assertTrue(etag.startswith('W/"'))
+
+        with mock.patch('add_customers.views.AddCustomerValuesReader.read') as read:
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(response['ETag'], etag)
+            # Weak comparison: the strong form of the tag matches too.
+            self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag[2:]).status_code, 304)
+            self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH='*').status_code, 304)
+        read.assert_not_called()
+        self.assertEqual(response.content, b'')
+
+    def test_etag_depends_on_path_and_query(self):
+        etag = self.client.get(self.url)['ETag']
+        self.assertNotEqual(self.client.get(self.url + '?fields=id')['ETag'], etag)
+        self.assertNotEqual(self.client.get('%s%d/' % (self.url, self.customer.pk))['ETag'], etag)
+        self.assertEqual(self.client.get(self.url + '?fields=id', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_write_bumps_the_tag_and_changes_the_etag(self):
+        etag = self.client.get(self.url)['ETag']
+        before = cache.tag_versions([model_tag(AddCustomer)])[model_tag(AddCustomer)]
+        with self.captureOnCommitCallbacks(execute=True):
+            AddCustomer.objects.create(name='Second', phone_number='2', email='d@example.com', address='Road',
+                                       country='UK')
+        self.assertNotEqual(cache.tag_versions([model_tag(AddCustomer)])[model_tag(AddCustomer)], before)
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(len(response.json()), 2)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+
+class StubAdapter(BaseAdapter):
+    def send(self, request, **kwargs):
+        response = requests.Response()
+        response.status_code = 201
+        response.request = request
+        response.url = request.url
+        response._content = b'stubbed'
+        return response
+
+    def close(self):
+        pass
+
+
+@override_settings(TRACING_ENABLED=True, TRACE_SAMPLE_RATE=1.0)
+class TracingInstrumentationTests(TestCase):
+    def setUp(self):
+        self.addCleanup(tracing.uninstrument)
+        self.spans = []
+        patcher = mock.patch.object(tracing.processor, 'enqueue', self.spans.append)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.session = requests.Session()
+        self.session.mount('http://tracing.test/', StubAdapter())
+
+    def test_gated_by_setting(self):
+        original = requests.Session.send
+        with override_settings(TRACING_ENABLED=False):
+            tracing.instrument()
+            with self.assertRaises(MiddlewareNotUsed):
+                tracing.TracingMiddleware(lambda request: HttpResponse())
+        self.assertIs(requests.Session.send, original)
+
+    def test_idempotent_and_undone(self):
+        original_send, original_email = requests.Session.send, EmailMessage.send
+        tracing.instrument()
+        traced = requests.Session.send
+        tracing.instrument()
+        self.assertIs(requests.Session.send, traced)
+        self.assertIs(traced.__wrapped__, original_send)
+        self.assertIs(EmailMessage.send.__wrapped__, original_email)
+
+        tracing.uninstrument()
+        self.assertIs(requests.Session.send, original_send)
+        self.assertIs(EmailMessage.send, original_email)
+
+    def test_patched_calls_record_spans_and_return_original_results(self):
+        def view(request):
+            response = self.session.get('http://tracing.test/lookup?q=1')
+            sent = EmailMessage('Subject', 'Body', 'from@example.com', ['to@example.com']).send()
+            AddCustomer.objects.count()
+            return HttpResponse('%s %s %s' % (response.status_code, response.content.decode(), sent))
+
+        middleware = tracing.TracingMiddleware(view)
+        response = middleware(RequestFactory().get('/api/jobs/track/'))
+        self.assertEqual(response.content, b'201 stubbed 1')
+        self.assertEqual(len(mail.outbox), 1)
+
+        spans = {span.name: span for span in self.spans}
+        server = spans['GET /api/jobs/track/']
+        http = spans['HTTP GET tracing.test']
+        self.assertEqual(http.parent_id, server.span_id)
+        self.assertEqual(http.attributes['http.url'], 'http://tracing.test/lookup')
+        self.assertEqual(http.attributes['http.status_code'], 201)
+        self.assertEqual(spans['email.send'].attributes['email.recipients'], 1)
+        self.assertEqual(spans['db.query'].trace_id, server.trace_id)
+        self.assertEqual(server.attributes['http.status_code'], 200)
+
+    def test_unsampled_requests_propagate_without_recording(self):
+        tracing.instrument()
+        parent = '00-%s-%s-00' % ('a' * 32, 'b' * 16)
+        token = tracing._current.set(tracing.parse_traceparent(parent))
+        try:
+            response = self.session.get('http://tracing.test/')
+        finally:
+            tracing._current.reset(token)
+        self.assertEqual(response.request.headers['traceparent'], parent)
+        self.assertEqual(self.spans, [])
+
+
+class FastJSONTests(TestCase):
+    data = {
+        'aware': datetime(2025, 1, 2, 3, 4, 5, 123456, tzinfo=dt_timezone.utc),
+        'offset': datetime(2025, 1, 2, 3, 4, 5, tzinfo=dt_timezone(timedelta(hours=3))),
+        'naive': datetime(2025, 1, 2, 3, 4, 5),
+        'date': date(2025, 1, 2),
+        'time': time(3, 4, 5, 123456),
+        'whole_time': time(3, 4, 5),
+        'decimal': Decimal('12.50'),
+        'uuid': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+        'duration': timedelta(minutes=90),
+        'text': 'Ünïcode \u2028 line separator',
+        'nested': [1, 2.5, None, True, {'id': 3}],
+        7: 'non-string key',
+    }
+
+    def test_output_matches_drf_renderer(self):
+        self.assertEqual(FastJSONRenderer().render(self.data), JSONRenderer().render(self.data))
+
+    def test_indented_output_matches_drf_renderer(self):
+        media_type = 'application/json; indent=2'
+        self.assertEqual(FastJSONRenderer().render(self.data, media_type), JSONRenderer().render(self.data, media_type))
+
+    def test_stdlib_backend_matches_too(self):
+        with override_settings(JSON_BACKEND='json'):
+            self.assertEqual(FastJSONRenderer().render(self.data), JSONRenderer().render(self.data))
+
+    def test_parser_matches_drf_parser(self):
+        body = '{"name": "Ünïcode", "weight": 1.5, "items": [1, null, true]}'.encode()
+        expected = JSONParser().parse(BytesIO(body))
+        self.assertEqual(FastJSONParser().parse(BytesIO(body)), expected)
+        latin1 = {'encoding': 'latin-1'}
+        self.assertEqual(FastJSONParser().parse(BytesIO(b'{"a": "\xe9"}'), parser_context=latin1), {'a': 'é'})
+
+    def test_parser_rejects_invalid_json(self):
+        for body in (b'{"a": ', b"{'a': 1}", b'\xff'):
+            with self.assertRaises(ParseError):
+                FastJSONParser().parse(BytesIO(body))
@@ -0,0 +1,446 @@
+"""
+Span-level request tracing.
+
+TracingMiddleware starts a server span per sampled request and a nested
+span for the view; inside them, ORM queries, outbound `requests` calls and
+email sends each get a child span. Trace context follows W3C Trace Context:
+an incoming `traceparent` header continues the caller's trace and decides
+sampling, and outbound `requests` calls carry `traceparent`/`tracestate` on.
+Work submitted through `EnquiryNotifier` keeps the request's trace.
+
+Requests without a sampled parent are sampled at TRACE_SAMPLE_RATE.
+Unsampled requests still propagate their trace id but record nothing.
+
+Finished spans are queued and exported in batches by a background thread
+through TRACING_EXPORTER: `JSONFileExporter` (the default, one JSON span per
+line in TRACING_FILE, no collector needed) or `OTLPHTTPExporter` (OTLP/HTTP
+JSON to TRACING_OTLP_ENDPOINT). Any SpanExporter subclass can be plugged in.
+"""
+import atexit
+import contextvars
+import json
+import logging
+import os
+import queue
+import random
+import re
+import secrets
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from functools import wraps
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+TRACEPARENT = re.compile(r'^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$')
+MAX_STATEMENT_LENGTH = 2000
+
+_current = contextvars.ContextVar('trace_span', default=None)
+
+
+class SpanContext:
+    """A remote parent or an unsampled request: propagated, never recorded."""
+    sampled = False
+
+    def __init__(self, trace_id, span_id, sampled=False, tracestate=''):
+        self.trace_id = trace_id
+        self.span_id = span_id
+        self.sampled = sampled
+        self.tracestate = tracestate
+
+    @property
+    def traceparent(self):
+        return '00-%s-%s-%s' % (self.trace_id, self.span_id, '01' if self.sampled else '00')
+
+
+class Span(SpanContext):
+    KINDS = {'internal': 1, 'server': 2, 'client': 3}
+
+    def __init__(self, name, trace_id, parent_id=None, kind='internal', attributes=None, tracestate=''):
+        super().__init__(trace_id, secrets.token_hex(8), sampled=True, tracestate=tracestate)
+        self.name = name
+        self.parent_id = parent_id
+        self.kind = kind
+        self.attributes = attributes or {}
+        self.status = 'ok'
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def record_exception(self, exc):
+        self.status = 'error'
+        self.attributes['exception.type'] = type(exc).__name__
+        self.attributes['exception.message'] = str(exc)[:500]
+
+    def end(self):
+        if self.end_ns is None:
+            self.end_ns = time.time_ns()
+            processor.enqueue(self)
+
+    def to_dict(self):
+        return {
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_span_id': self.parent_id,
+            'name': self.name,
+            'kind': self.kind,
+            'start_unix_nano': self.start_ns,
+            'duration_ms': round((self.end_ns - self.start_ns) / 1e6, 3),
+            'status': self.status,
+            'attributes': self.attributes,
+        }
+
+
+def current_span():
+    return _current.get()
+
+
+def parse_traceparent(header, tracestate=''):
+    match = TRACEPARENT.match(header.strip().lower())
+    if not match or set(match.group(1)) == {'0'} or set(match.group(2)) == {'0'}:
+        return None
+    return SpanContext(match.group(1), match.group(2), bool(int(match.group(3), 16) & 1), tracestate)
+
+
+def propagation_headers():
+    """traceparent/tracestate headers for an outbound call, or {} outside a trace."""
+    context = _current.get()
+    if context is None:
+        return {}
+    headers = {'traceparent': context.traceparent}
+    if context.tracestate:
+        headers['tracestate'] = context.tracestate
+    return headers
+
+
+@contextmanager
+def start_span(name, kind='internal', **attributes):
+    """
+    Record a child of the current span. Yields the span, or None when the
+    current request is not sampled (or there is no request).
+    """
+    parent = _current.get()
+    if parent is None or not parent.sampled:
+        yield None
+        return
+    span = Span(name, parent.trace_id, parent.span_id, kind, attributes, parent.tracestate)
+    token = _current.set(span)
+    try:
+        yield span
+    except BaseException as exc:
+        span.record_exception(exc)
+        raise
+    finally:
+        _current.reset(token)
+        span.end()
+
+
+# Exporters
+
+class SpanExporter:
+    def export(self, spans):
+        raise NotImplementedError
+
+    def shutdown(self):
+        pass
+
+
+class JSONFileExporter(SpanExporter):
+    """Append spans as JSON lines to TRACING_FILE."""
+
+    def __init__(self, path=None):
+        self.path = path or settings.TRACING_FILE
+
+    def export(self, spans):
+        lines = ''.join(json.dumps(span.to_dict(), default=str) + '\n' for span in spans)
+        # One O_APPEND write per batch keeps lines from several workers intact.
+        with open(self.path, 'a', encoding='utf-8') as output:
+            output.write(lines)
+
+
+class OTLPHTTPExporter(SpanExporter):
+    """Send spans to an OpenTelemetry collector with OTLP/HTTP JSON."""
+
+    def __init__(self, endpoint=None, timeout=5):
+        self.endpoint = endpoint or settings.TRACING_OTLP_ENDPOINT
+        self.timeout = timeout
+
+    def export(self, spans):
+        import requests
+
+        requests.post(self.endpoint, json=self.encode(spans), timeout=self.timeout).raise_for_status()
+
+    def encode(self, spans):
+        return {'resourceSpans': [{
+            'resource': {'attributes': self._attributes({'service.name': settings.TRACING_SERVICE_NAME})},
+            'scopeSpans': [{
+                'scope': {'name': __name__},
+                'spans': [{
+                    'traceId': span.trace_id,
+                    'spanId': span.span_id,
+                    'parentSpanId': span.parent_id or '',
+                    'name': span.name,
+                    'kind': Span.KINDS[span.kind],
+                    'startTimeUnixNano': str(span.start_ns),
+                    'endTimeUnixNano': str(span.end_ns),
+                    'attributes': self._attributes(span.attributes),
+                    'status': {'code': 2 if span.status == 'error' else 1},
+                } for span in spans],
+            }],
+        }]}
+
+    def _attributes(self, attributes):
+        encoded = []
+        for key, value in attributes.items():
+            if isinstance(value, bool):
+                value = {'boolValue': value}
+            elif isinstance(value, int):
+                value = {'intValue': str(value)}
+            elif isinstance(value, float):
+                value = {'doubleValue': value}
+            else:
+                value = {'stringValue': str(value)}
+            encoded.append({'key': key, 'value': value})
+        return encoded
+
+
+class BatchSpanProcessor:
+    """
+    Hand finished spans to the exporter from a background thread, in
+    batches of up to `batch_size` or every `interval` seconds. Spans are
+    dropped, and counted, when the queue is full.
+    """
+
+    def __init__(self, max_queue_size=2048, batch_size=512, interval=1.0):
+        self.batch_size = batch_size
+        self.interval = interval
+        self.max_queue_size = max_queue_size
+        self.dropped = 0
+        self._exporter = None
+        self._queue = None
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+        atexit.register(self.shutdown)
+
+    @property
+    def exporter(self):
+        if self._exporter is None:
+            self._exporter = import_string(settings.TRACING_EXPORTER)()
+        return self._exporter
+
+    def enqueue(self, span):
+        if self._pid != os.getpid():
+            self._start()
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+
+    def _start(self):
+        # Also restarts the thread in forked worker processes.
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._queue = queue.Queue(self.max_queue_size)
+            self._thread = threading.Thread(target=self._run, name='span-exporter', daemon=True)
+            self._thread.start()
+            self._pid = os.getpid()
+
+    def _run(self):
+        while True:
+            try:
+                batch = [self._queue.get(timeout=self.interval)]
+            except queue.Empty:
+                continue
+            if batch[0] is None:
+                return
+            stop = False
+            while len(batch) < self.batch_size:
+                try:
+                    span = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if span is None:
+                    stop = True
+                    break
+                batch.append(span)
+            self._export(batch)
+            if stop:
+                return
+
+    def _export(self, batch):
+        try:
+            self.exporter.export(batch)
+        except Exception as exc:
+            logger.warning("Failed to export %d spans: %s", len(batch), exc)
+
+    def shutdown(self):
+        if self._thread is not None and self._pid == os.getpid():
+            self._queue.put(None)
+            self._thread.join(timeout=5)
+            self._pid = None
+
+
+processor = BatchSpanProcessor()
+
+
+# Instrumentation
+
+def _query_span(alias, vendor):
+    def wrapper(execute, sql, params, many, context):
+        with start_span('db.query', kind='client', **{
+            'db.system': vendor,
+            'db.alias': alias,
+            'db.statement': sql[:MAX_STATEMENT_LENGTH],
+        }):
+            return execute(sql, params, many, context)
+    return wrapper
+
+
+_patched = []
+_instrument_lock = threading.Lock()
+
+
+def instrument():
+    """
+    Wrap outbound `requests` calls and email sends when TRACING_ENABLED.
+    Safe to call repeatedly; uninstrument() restores the originals.
+    """
+    if not settings.TRACING_ENABLED:
+        return
+    with _instrument_lock:
+        if _patched:
+            return
+
+        from django.core.mail import EmailMessage
+        from requests.sessions import Session
+
+        send_request = Session.send
+
+        @wraps(send_request)
+        def traced_send(session, request, **kwargs):
+            url = urlsplit(request.url)
+            with start_span('HTTP %s %s' % (request.method, url.hostname), kind='client', **{
+                'http.method': request.method,
+                'http.url': '%s://%s%s' % (url.scheme, url.netloc, url.path),
+            }) as span:
+                # The client span when sampled, otherwise the request's context.
+                request.headers.update(propagation_headers())
+                response = send_request(session, request, **kwargs)
+                if span is not None:
+                    span.set_attribute('http.status_code', response.status_code)
+                    if response.status_code >= 500:
+                        span.status = 'error'
+                return response
+
+        send_email = EmailMessage.send
+
+        @wraps(send_email)
+        def traced_email_send(message, fail_silently=False):
+            with start_span('email.send', kind='client', **{
+                'email.recipients': len(message.recipients()),
+            }):
+                return send_email(message, fail_silently=fail_silently)
+
+        for owner, name, traced in ((Session, 'send', traced_send), (EmailMessage, 'send', traced_email_send)):
+            _patched.append((owner, name, owner.__dict__[name]))
+            setattr(owner, name, traced)
+
+
+def uninstrument():
+    """Restore the methods wrapped by instrument()."""
+    with _instrument_lock:
+        while _patched:
+            owner, name, original = _patched.pop()
+            setattr(owner, name, original)
+
+
+class TracingMiddleware:
+    """Start the server span for sampled requests and time the view inside it."""
+
+    def __init__(self, get_response):
+        if not settings.TRACING_ENABLED:
+            raise MiddlewareNotUsed
+        instrument()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        parent = parse_traceparent(request.headers.get('traceparent', ''), request.headers.get('tracestate', ''))
+        sampled = parent.sampled if parent is not None else random.random() < settings.TRACE_SAMPLE_RATE
+        if not sampled:
+            context = parent or SpanContext(secrets.token_hex(16), secrets.token_hex(8))
+            token = _current.set(context)
+            try:
+                return self.get_response(request)
+            finally:
+                _current.reset(token)
+
+        span = Span(
+            '%s %s' % (request.method, request.path),
+            parent.trace_id if parent is not None else secrets.token_hex(16),
+            parent.span_id if parent is not None else None,
+            kind='server',
+            attributes={'http.method': request.method, 'http.target': request.path},
+            tracestate=parent.tracestate if parent is not None else '',
+        )
+        token = _current.set(span)
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(_query_span(connection.alias, connection.vendor)))
+                try:
+                    response = self.get_response(request)
+                finally:
+                    self._end_view_span(request)
+            span.set_attribute('http.status_code', response.status_code)
+            if response.status_code >= 500:
+                span.status = 'error'
+            return response
+        except BaseException as exc:
+            span.record_exception(exc)
+            raise
+        finally:
+            _current.reset(token)
+            span.end()
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        server_span = _current.get()
+        if server_span is None or not server_span.sampled:
+            return None
+        match = request.resolver_match
+        view_name = getattr(getattr(view_func, 'cls', None) or getattr(view_func, 'view_class', None),
+                            '__name__', None) or getattr(view_func, '__name__', 'view')
+        if match is not None:
+            # Router-generated routes are regexes: drop their anchors.
+            route = '/' + match.route.replace('^', '').rstrip('$')
+            server_span.name = '%s %s' % (request.method, route)
+            server_span.set_attribute('http.route', route)
+        view_span = Span('view %s' % view_name, server_span.trace_id, server_span.span_id,
+                         tracestate=server_span.tracestate)
+        # Ended when the response comes back through this middleware, so it
+        # also covers the response phase of the middleware listed below.
+        request._trace_view = (view_span, _current.set(view_span))
+        return None
+
+    def process_exception(self, request, exception):
+        view = getattr(request, '_trace_view', None)
+        if view is not None:
+            view[0].record_exception(exception)
+        return None
+
+    def _end_view_span(self, request):
+        view = getattr(request, '_trace_view', None)
+        if view is not None:
+            span, token = view
+            _current.reset(token)
+            span.end()
+            del request._trace_view
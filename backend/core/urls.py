@@ -0,0 +1,7 @@
+from django.urls import path
+from .views import CacheStatsView, ProfileTokenView
+
+urlpatterns = [
+    path('cache-stats/', CacheStatsView.as_view(), name='cache-stats'),
+    path('profile-token/', ProfileTokenView.as_view(), name='profile-token'),
+]
@@ -0,0 +1,26 @@
+from django.conf import settings
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from authapp.permissions import IsAdmin
+from .cache import cache
+from .profiler import TOKEN_HEADER, issue_token
+
+
+class CacheStatsView(APIView):
+    """Hit/miss counters of the tiered cache for the worker serving the request."""
+    permission_classes = [IsAdmin]
+
+    def get(self, request):
+        return Response(cache.stats())
+
+
+class ProfileTokenView(APIView):
+    """Issue a token that turns on profiling for requests carrying it (see core.profiler)."""
+    permission_classes = [IsAdmin]
+
+    def post(self, request):
+        return Response({
+            'token': issue_token(request.user),
+            'header': TOKEN_HEADER,
+            'expires_in': settings.PROFILE_TOKEN_MAX_AGE,
+        })
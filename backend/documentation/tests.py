@@ -1,3 +1,64 @@
-from django.test import TestCase
+import importlib
 
-# Create your tests here.
+from django.conf import settings
+from django.test import TestCase, override_settings
+from django.urls import Resolver404, clear_url_caches, resolve
+
+import backend.urls
+from . import views
+
+
+def reload_urls():
+    clear_url_caches()
+    importlib.reload(backend.urls)
+
+
+class OptionalURLTests(TestCase):
+    def setUp(self):
+        self.addCleanup(reload_urls)
+
+    def test_enabled_by_default(self):
+        self.assertEqual(resolve('/admin/').url_name, 'index')
+        self.assertEqual(resolve('/documentation/redoc/').url_name, 'schema-redoc')
+
+    def test_flags_remove_the_urls(self):
+        with self.settings(ADMIN_ENABLED=False, API_DOCS_ENABLED=False):
+            reload_urls()
+            for url in ('/admin/', '/documentation/swagger/', '/documentation/swagger.json/'):
+                with self.assertRaises(Resolver404):
+                    resolve(url)
+                self.assertEqual(self.client.get(url).status_code, 404)
+            self.assertEqual(resolve('/api/jobs/jobs/').url_name, 'job-list')
+
+    def test_flags_are_independent(self):
+        with self.settings(ADMIN_ENABLED=False):
+            reload_urls()
+            with self.assertRaises(Resolver404):
+                resolve('/admin/')
+            self.assertEqual(resolve('/documentation/swagger/').url_name, 'schema-swagger-ui')
+
+
+class LazySchemaViewTests(TestCase):
+    def setUp(self):
+        views.get_api_schema_view.cache_clear()
+        views._schema_view.cache_clear()
+
+    def test_schema_view_is_built_on_first_request(self):
+        self.assertEqual(views.get_api_schema_view.cache_info().currsize, 0)
+        response = self.client.get('/documentation/swagger.json/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(views.get_api_schema_view.cache_info().currsize, 1)
+        schema = response.json()
+        self.assertEqual(schema['info']['title'], 'Snippets API')
+        self.assertIn('/jobs/jobs/', schema['paths'])
+
+    # The manifest only exists after collectstatic.
+    @override_settings(STORAGES={
+        **settings.STORAGES,
+        'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+    })
+    def test_ui_pages_render(self):
+        for url in ('/documentation/swagger/', '/documentation/redoc/'):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertIn('text/html', response['Content-Type'])
@@ -1,24 +1,8 @@
-...
 from django.urls import path
-from rest_framework import permissions
-from drf_yasg.views import get_schema_view
-from drf_yasg import openapi
-
-schema_view = get_schema_view(
-   openapi.Info(
-      title="Snippets API",
-      default_version='v1',
-      description="Test description",
-      terms_of_service="https://www.google.com/policies/terms/",
-      contact=openapi.Contact(email="contact@snippets.local"),
-      license=openapi.License(name="BSD License"),
-   ),
-   public=True,
-   permission_classes=(permissions.AllowAny,),
-)
+from .views import lazy_schema_view
 
 urlpatterns = [
-   path('swagger.<format>/', schema_view.without_ui(cache_timeout=0), name='schema-json'),
-   path('swagger/', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
-   path('redoc/', schema_view.with_ui('redoc', cache_timeout=0), name='schema-redoc'),
-]
\ No newline at end of file
+   path('swagger.<format>/', lazy_schema_view('without_ui'), name='schema-json'),
+   path('swagger/', lazy_schema_view('with_ui', 'swagger'), name='schema-swagger-ui'),
+   path('redoc/', lazy_schema_view('with_ui', 'redoc'), name='schema-redoc'),
+]
@@ -1,3 +1,39 @@
-from django.shortcuts import render
+from functools import lru_cache
 
-# Create your views here.
+from rest_framework import permissions
+
+
+@lru_cache(maxsize=None)
+def get_api_schema_view():
+    """
+    Build the drf_yasg schema view on first use, so workers that never serve
+    the docs do not import drf_yasg's inspectors and renderers.
+    """
+    from drf_yasg import openapi
+    from drf_yasg.views import get_schema_view
+
+    return get_schema_view(
+       openapi.Info(
+          title="Snippets API",
+          default_version='v1',
+          description="Test description",
+          terms_of_service="https://www.google.com/policies/terms/",
+          contact=openapi.Contact(email="contact@snippets.local"),
+          license=openapi.License(name="BSD License"),
+       ),
+       public=True,
+       permission_classes=(permissions.AllowAny,),
+    )
+
+
+@lru_cache(maxsize=None)
+def _schema_view(method, *args):
+    return getattr(get_api_schema_view(), method)(*args, cache_timeout=0)
+
+
+def lazy_schema_view(method, *args):
+    """URLconf entry for `schema_view.<method>(*args, cache_timeout=0)`, built when first requested."""
+    def view(request, *view_args, **view_kwargs):
+        return _schema_view(method, *args)(request, *view_args, **view_kwargs)
+    view.csrf_exempt = True
+    return view
@@ -2,17 +2,26 @@
 
 set -e  # Exit immediately if a command exits with a non-zero status
 
+START=$(date +%s%N)
+elapsed() { echo "$(( ($(date +%s%N) - START) / 1000000 )) ms"; }
+
 echo "Waiting for MySQL at $DB_HOST:$DB_PORT..."
 until nc -z "$DB_HOST" "$DB_PORT"; do
   sleep 1
 done
-echo "MySQL is up!"
+echo "MySQL is up! ($(elapsed))"
 
-echo "Applying Django migrations..."
-python manage.py migrate --noinput
+echo "Checking for unapplied migrations..."
+python manage.py migrate_if_needed
+echo "Migrations done ($(elapsed))"
 
-echo "Collecting static files..."
-python manage.py collectstatic --noinput
+# Static files are collected at image build time. Only collect here when the
+# source is bind-mounted over the image (see docker-compose.dev.yaml).
+if [ "$STARTUP_COLLECTSTATIC" = "1" ]; then
+  echo "Collecting static files..."
+  python manage.py collectstatic --noinput
+  echo "Static files collected ($(elapsed))"
+fi
 
-echo "Starting Gunicorn server..."
-exec gunicorn backend.wsgi:application --bind 0.0.0.0:8000
\ No newline at end of file
+echo "Starting Gunicorn server... ($(elapsed) since container start)"
+exec gunicorn backend.wsgi:application --bind 0.0.0.0:8000